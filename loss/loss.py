@@ -25,6 +25,21 @@ from pelicun.assessment import Assessment
 import warnings
 warnings.filterwarnings('ignore')
 
+# P58 databases are read once per process and shared by every run
+P58_cache = {}
+
+def get_P58_data(PAL, db_name):
+    key = ('data', db_name)
+    if key not in P58_cache:
+        P58_cache[key] = PAL.get_default_data(db_name)
+    return(P58_cache[key])
+
+def get_P58_metadata(PAL, db_name):
+    key = ('metadata', db_name)
+    if key not in P58_cache:
+        P58_cache[key] = PAL.get_default_metadata(db_name)
+    return(P58_cache[key])
+
 ###########################################################################
 # ASSEMBLE STRUCTURAL COMPONENTS
 ###########################################################################
@@ -238,7 +253,7 @@ def estimate_damage(raw_demands, run_data, cmp_marginals, mode='generate'):
     ###########################################################################
     
     # generate structural components and join with NSCs
-    P58_metadata = PAL.get_default_metadata('fragility_DB_FEMA_P58_2nd')
+    P58_metadata = get_P58_metadata(PAL, 'fragility_DB_FEMA_P58_2nd')
     cmp_structural = get_structural_cmp_MF(run_data, P58_metadata)
     cmp_marginals = pd.concat([cmp_structural, cmp_marginals], axis=0)
     
@@ -256,7 +271,7 @@ def estimate_damage(raw_demands, run_data, cmp_marginals, mode='generate'):
     cmp_sample = PAL.asset.save_cmp_sample()
     
     # review the damage model - in this example: fragility functions
-    P58_data = PAL.get_default_data('fragility_DB_FEMA_P58_2nd')
+    P58_data = get_P58_data(PAL, 'fragility_DB_FEMA_P58_2nd')
 
     # note that we drop the last three components here (excessiveRID, irreparable, and collapse) 
     # because they are not part of P58
@@ -347,7 +362,7 @@ def estimate_damage(raw_demands, run_data, cmp_marginals, mode='generate'):
     # load fragility data
     PAL.damage.load_damage_model([
         additional_fragility_db,  # This is the extra fragility data we've just created
-        'PelicunDefault/fragility_DB_FEMA_P58_2nd.csv' # and this is a table with the default P58 data    
+        get_P58_data(PAL, 'fragility_DB_FEMA_P58_2nd').copy() # and this is a table with the default P58 data    
     ])
     
     ### 3.3.5 Damage Process
@@ -406,7 +421,7 @@ def estimate_damage(raw_demands, run_data, cmp_marginals, mode='generate'):
     loss_map = pd.DataFrame(loss_models, columns=['BldgRepair'], index=drivers)
     
     # load the consequence models
-    P58_data = PAL.get_default_data('bldg_repair_DB_FEMA_P58_2nd')
+    P58_data = get_P58_data(PAL, 'bldg_repair_DB_FEMA_P58_2nd')
 
     # group E
     incomplete_cmp = pd.DataFrame(
@@ -469,7 +484,7 @@ def estimate_damage(raw_demands, run_data, cmp_marginals, mode='generate'):
     # Load the loss model to pelicun
     PAL.bldg_repair.load_model(
         [additional_consequences, incomplete_cmp,
-          "PelicunDefault/bldg_repair_DB_FEMA_P58_2nd.csv"], 
+          P58_data.copy()], 
         loss_map)
     
     # and run the calculations
@@ -0,0 +1,100 @@
+############################################################################
+#               GP backend benchmark
+
+# Date created: October 2026
+
+# Description:  Compares fit/predict time and accuracy of the exact GP and
+#               the sparse (inducing point) GP backend on the TFP database
+
+# Open issues:
+
+############################################################################
+import sys
+# caution: path[0] is reserved for script path (or '' in REPL)
+sys.path.insert(1, '../')
+
+import pickle
+import time
+import pandas as pd
+import numpy as np
+from doe import GP
+
+
+with open("../../data/tfp_mf_db.pickle", 'rb') as picklefile:
+    main_obj = pickle.load(picklefile)
+
+main_obj.calculate_collapse()
+
+#%% prepare covariates and outcomes
+
+df_raw = main_obj.ops_analysis
+
+# remove the singular outlier point
+from scipy import stats
+df = df_raw[np.abs(stats.zscore(df_raw['collapse_prob'])) < 10].copy()
+
+df['T_ratio'] = df['T_m'] / df['T_fb']
+pi = 3.14159
+g = 386.4
+
+zetaRef = [0.02, 0.05, 0.10, 0.20, 0.30, 0.40, 0.50]
+BmRef   = [0.8, 1.0, 1.2, 1.5, 1.7, 1.9, 2.0]
+df['Bm'] = np.interp(df['zeta_e'], zetaRef, BmRef)
+
+df['gap_ratio'] = (df['constructed_moat']*4*pi**2)/ \
+    (g*(df['sa_tm']/df['Bm'])*df['T_m']**2)
+
+covariate_list = ['gap_ratio', 'RI', 'T_ratio', 'zeta_e']
+outcome = 'collapse_prob'
+
+from sklearn.model_selection import train_test_split
+df_train, df_test = train_test_split(df, test_size=0.2, random_state=985)
+
+X_test = df_test[covariate_list]
+y_test = df_test[outcome].to_numpy(dtype=float)
+
+#%% run benchmark
+
+kernel_name = 'rbf_ard'
+inducing_list = [50, 100, 200, 500, 1000]
+
+def time_backend(backend, n_inducing=500):
+    mdl = GP(df_train)
+    mdl.set_covariates(covariate_list)
+    mdl.set_outcome(outcome)
+
+    t0 = time.time()
+    mdl.fit_gpr(kernel_name=kernel_name, backend=backend,
+                n_inducing=n_inducing)
+    t_fit = time.time() - t0
+
+    t0 = time.time()
+    y_hat, y_std = mdl.gpr.predict(X_test, return_std=True)
+    t_predict = time.time() - t0
+
+    return(np.ravel(y_hat), np.ravel(y_std), t_fit, t_predict)
+
+exact_mean, exact_std, exact_fit, exact_pred = time_backend('exact')
+
+bench_rows = [{'backend':'exact', 'n_inducing':len(df_train),
+               'fit_time':exact_fit, 'predict_time':exact_pred,
+               'rmse':np.sqrt(np.mean((exact_mean - y_test)**2)),
+               'mean_diff':0.0, 'std_diff':0.0}]
+
+for n_ind in inducing_list:
+    if n_ind >= len(df_train):
+        continue
+    sp_mean, sp_std, sp_fit, sp_pred = time_backend('sparse', n_ind)
+    bench_rows.append({'backend':'sparse', 'n_inducing':n_ind,
+                       'fit_time':sp_fit, 'predict_time':sp_pred,
+                       'rmse':np.sqrt(np.mean((sp_mean - y_test)**2)),
+                       'mean_diff':np.sqrt(np.mean((sp_mean - exact_mean)**2)),
+                       'std_diff':np.sqrt(np.mean((sp_std - exact_std)**2))})
+
+bench_df = pd.DataFrame(bench_rows)
+bench_df['fit_speedup'] = exact_fit/bench_df['fit_time']
+
+print('Training points: %d, test points: %d' % (len(df_train), len(df_test)))
+print(bench_df.to_string(index=False, float_format='%.4f'))
+
+# bench_df.to_csv('../../data/gp_backend_benchmark.csv', index=False)
@@ -25,20 +25,12 @@ def run_pelicun(database_path, results_path,
     # warnings.filterwarnings('ignore')
     
     # and import pelicun classes and methods
-    from loss import Loss_Analysis
-    
-    from pelicun.assessment import Assessment
-    # get database
-    # initialize, no printing outputs, offset fixed with current components
-    PAL = Assessment({
-        "PrintLog": False, 
-        "Seed": 985,
-        "Verbose": False,
-        "DemandOffset": {"PFA": 0, "PFV": 0}
-    })
+    from loss import Loss_Analysis, get_P58_metadata, get_custom_fragilities
 
     # generate structural components and join with NSCs
-    P58_metadata = PAL.get_default_metadata('fragility_DB_FEMA_P58_2nd')
+    # (P58 data and NQE sheets come from the shared loss model cache)
+    P58_metadata = get_P58_metadata('fragility_DB_FEMA_P58_2nd')
+    additional_frag_db = get_custom_fragilities('../../resource/loss/')
     
     full_isolation_data = pd.read_csv(database_path+database_file)
     
@@ -63,7 +55,8 @@ def run_pelicun(database_path, results_path,
         print('========================================')
         print('Estimating loss for run index', run_idx)
         
-        run_loss.estimate_damage(mode='generate')
+        run_loss.estimate_damage(mode='generate', 
+                                 custom_fragility_db=additional_frag_db)
         
         # [cmp, dmg, loss, loss_cmp, agg, 
         #  collapse_rate, irr_rate] = estimate_damage(raw_demands,
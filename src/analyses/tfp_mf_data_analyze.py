@@ -305,7 +305,7 @@ X_space = pd.DataFrame({'gap_ratio':xx.ravel(),
 
 t0 = time.time()
 
-fmu_train, fs1_train = mdl.gpr.predict(X_space, return_std=True)
+fmu_train, fs1_train = mdl.predict_gpr_chunked(X_space, return_std=True)
 fs2_train = fs1_train**2
 
 tp = time.time() - t0
@@ -615,7 +615,7 @@ X_space = pd.DataFrame({'gap_ratio':xx.ravel(),
 
 t0 = time.time()
 
-fmu_train, fs1_train = mdl.gpr.predict(X_space, return_std=True)
+fmu_train, fs1_train = mdl.predict_gpr_chunked(X_space, return_std=True)
 fs2_train = fs1_train**2
 
 tp = time.time() - t0
@@ -45,6 +45,14 @@ class Building:
         # larger than 8 bays is not supported
         assert n_bays < 9
         
+        # numbering depends only on the frame layout, so reuse it if another
+        # building (or a retry of this one) already generated it
+        topology_key = (frame_type, self.isolator_system, n_stories, n_bays)
+        if topology_key in topology_cache:
+            (self.node_tags, self.elem_tags,
+             self.elem_ids) = unpack_topology(topology_cache[topology_key])
+            return
+        
         ###### Main node system ######
         # Fixed nodes are 8xx, with xx being sequential from leftmost base
         #   898 and 899 are reserved for wall
@@ -343,6 +351,10 @@ class Building:
             self.elem_ids['brace_spring'] = brace_spr_id
             self.elem_ids['brace_beam'] = brace_beams_id
             
+        topology_cache[topology_key] = pack_topology(self.node_tags,
+                                                     self.elem_tags,
+                                                     self.elem_ids)
+            
 
     def model_frame(self, convergence_mode=False):
         print('=========== Constructing model ===========')
@@ -423,6 +435,10 @@ class Building:
         col_list = self.column
         beam_list = self.beam
         
+        # per-floor (properties, MIK parameters), shared by springs and elements
+        col_sections = [get_section(col, 'column', L_col) for col in col_list]
+        beam_sections = [get_section(beam, 'beam', L_beam) for beam in beam_list]
+        
         # base nodes
         base_nodes = self.node_tags['base']
         for idx, nd in enumerate(base_nodes):
@@ -581,7 +597,7 @@ class Building:
         
         for fl_col, col in enumerate(col_list):
             
-            current_col = get_shape(col, 'column')
+            col_props, col_mik = col_sections[fl_col]
             
             # column section
             # match the tag number with the floor's node number
@@ -593,12 +609,12 @@ class Building:
             # Iz is the stronger axis
             (Ag_col, Iz_col, Iy_col,
              Zx_col, Sx_col, d_col,
-             bf_col, tf_col, tw_col) = get_properties(current_col)
+             bf_col, tf_col, tw_col) = col_props
             
             # Ibarra formulation places PH at hinge, so all values calculated for full beam
             (Ke_col, My_col, lam_col,
              thp_col, thpc_col,
-             kappa_col, thu_col) = modified_IK_params(current_col, L_col)
+             kappa_col, thu_col) = col_mik
             
 
             ops.uniaxialMaterial('IMKBilin', current_col_sec, Ke_col,
@@ -610,7 +626,7 @@ class Building:
 
             
         for fl_beam, beam in enumerate(beam_list):
-            current_beam = get_shape(beam, 'beam')
+            beam_props, beam_mik = beam_sections[fl_beam]
             
             # beam section: fiber wide flange section
             # match the tag number with the floor's node number
@@ -621,13 +637,13 @@ class Building:
             # Iz is the stronger axis
             (Ag_beam, Iz_beam, Iy_beam,
              Zx_beam, Sx_beam, d_beam,
-             bf_beam, tf_beam, tw_beam) = get_properties(current_beam)
+             bf_beam, tf_beam, tw_beam) = beam_props
             
             # Modified IK steel
             # Ibarra formulation places PH at hinge, so all values calculated for full beam
             (Ke_beam, My_beam, lam_beam,
              thp_beam, thpc_beam,
-             kappa_beam, thu_beam) = modified_IK_params(current_beam, L_beam)
+             kappa_beam, thu_beam) = beam_mik
             
 
             ops.uniaxialMaterial('IMKBilin', current_beam_sec, Ke_beam,
@@ -716,13 +732,12 @@ class Building:
             
             # determine which floor's column to use
             cur_floor_idx = (elem_tag//10)%10 - 1
-            col_name = col_list[cur_floor_idx]
-            current_col = get_shape(col_name, 'column')
+            col_props = col_sections[cur_floor_idx][0]
             
             # Iz is the stronger axis
             (Ag_col, Iz_col, Iy_col,
              Zx_col, Sx_col, d_col,
-             bf_col, tf_col, tw_col) = get_properties(current_col)
+             bf_col, tf_col, tw_col) = col_props
             
             # calculate modified section properties to account for spring stiffness 
             # being in series with the elastic element stiffness
@@ -744,13 +759,12 @@ class Building:
             
             # determine which floor's column to use
             cur_floor_idx = (elem_tag//10)%10 - 2
-            beam_name = beam_list[cur_floor_idx]
-            current_beam = get_shape(beam_name, 'beam')
+            beam_props = beam_sections[cur_floor_idx][0]
             
             # Iz is the stronger axis
             (Ag_beam, Iz_beam, Iy_beam,
              Zx_beam, Sx_beam, d_beam,
-             bf_beam, tf_beam, tw_beam) = get_properties(current_beam)
+             bf_beam, tf_beam, tw_beam) = beam_props
             
             # calculate modified section properties to account for spring stiffness 
             # being in series with the elastic element stiffness
@@ -1052,21 +1066,21 @@ class Building:
         L_beam = L_bay
         L_col = h_story
         
-        self.number_nodes()
-        
         col_list = self.column
-        sample_column = get_shape(col_list[0], 'column')
-        
         beam_list = self.beam
-        sample_beam = get_shape(beam_list[0], 'beam')
+        
+        # per-floor (properties, MIK parameters), shared by springs and elements
+        col_sections = [get_section(col, 'column', L_col) for col in col_list]
+        beam_sections = [get_section(beam, 'beam', L_beam) for beam in beam_list]
+        
         (Ag_beam, Iz_beam, Iy_beam,
          Zx_beam, Sx_beam, d_beam,
-         bf_beam, tf_beam, tw_beam) = get_properties(sample_beam)
+         bf_beam, tf_beam, tw_beam) = beam_sections[0][0]
         
         
         (Ag_col, Iz_col, Iy_col,
          Zx_col, Sx_col, d_col,
-         bf_col, tf_col, tw_col) = get_properties(sample_column)
+         bf_col, tf_col, tw_col) = col_sections[0][0]
         
         # base nodes
         base_nodes = self.node_tags['base']
@@ -1479,7 +1493,7 @@ class Building:
         
         for fl_col, col in enumerate(col_list):
             
-            current_col = get_shape(col, 'column')
+            col_props, col_mik = col_sections[fl_col]
             
             # column section
             # match the tag number with the floor's node number
@@ -1491,12 +1505,12 @@ class Building:
             # Iz is the stronger axis
             (Ag_col, Iz_col, Iy_col,
              Zx_col, Sx_col, d_col,
-             bf_col, tf_col, tw_col) = get_properties(current_col)
+             bf_col, tf_col, tw_col) = col_props
             
             # Ibarra formulation places PH at hinge, so all values calculated for full beam
             (Ke_col, My_col, lam_col,
              thp_col, thpc_col,
-             kappa_col, thu_col) = modified_IK_params(current_col, L_col)
+             kappa_col, thu_col) = col_mik
             
             
             ops.uniaxialMaterial('IMKBilin', current_col_sec, Ke_col,
@@ -1508,7 +1522,7 @@ class Building:
             
             
         for fl_beam, beam in enumerate(beam_list):
-            current_beam = get_shape(beam, 'beam')
+            beam_props, beam_mik = beam_sections[fl_beam]
             
             # beam section: fiber wide flange section
             # match the tag number with the floor's node number
@@ -1519,12 +1533,12 @@ class Building:
             # Iz is the stronger axis
             (Ag_beam, Iz_beam, Iy_beam,
              Zx_beam, Sx_beam, d_beam,
-             bf_beam, tf_beam, tw_beam) = get_properties(current_beam)
+             bf_beam, tf_beam, tw_beam) = beam_props
             
             # Ibarra formulation places PH at hinge, so all values calculated for full beam
             (Ke_beam, My_beam, lam_beam,
              thp_beam, thpc_beam,
-             kappa_beam, thu_beam) = modified_IK_params(current_beam, L_beam)
+             kappa_beam, thu_beam) = beam_mik
             
 
             ops.uniaxialMaterial('IMKBilin', current_beam_sec, Ke_beam,
@@ -1624,13 +1638,12 @@ class Building:
             
             # determine which floor's column to use
             cur_floor_idx = (elem_tag//10)%10 - 1
-            col_name = col_list[cur_floor_idx]
-            current_col = get_shape(col_name, 'column')
+            col_props = col_sections[cur_floor_idx][0]
             
             # Iz is the stronger axis
             (Ag_col, Iz_col, Iy_col,
              Zx_col, Sx_col, d_col,
-             bf_col, tf_col, tw_col) = get_properties(current_col)
+             bf_col, tf_col, tw_col) = col_props
             
             # calculate modified section properties to account for spring stiffness 
             # being in series with the elastic element stiffness
@@ -1665,13 +1678,12 @@ class Building:
                 
             # determine which floor's beam to use
             cur_floor_idx = beam_floor - 2
-            beam_name = beam_list[cur_floor_idx]
-            current_beam = get_shape(beam_name, 'beam')
+            beam_props = beam_sections[cur_floor_idx][0]
             
             # Iz is the stronger axis
             (Ag_beam, Iz_beam, Iy_beam,
              Zx_beam, Sx_beam, d_beam,
-             bf_beam, tf_beam, tw_beam) = get_properties(current_beam)
+             bf_beam, tf_beam, tw_beam) = beam_props
             
             # calculate modified section properties to account for spring stiffness 
             # being in series with the elastic element stiffness
@@ -2778,7 +2790,7 @@ class Building:
 
     def run_ground_motion(self, gm_name, scale_factor, dt_transient, T_end=60.0,
                           gm_dir='../resource/ground_motions/PEERNGARecords_Unscaled/',
-                          data_dir='./outputs/'):
+                          data_dir='./outputs/', analysis_profile=None):
         
         # Recorders
         import openseespy.opensees as ops
@@ -2965,63 +2977,22 @@ class Building:
         
         print('Current ground motion: %s at scale %.2f' % (gm_name, scale_factor))
 
-        ops.constraints('Plain')
-        ops.numberer('RCM')
-
-        ops.system('UmfPack')
-
-        if superstructure_system == 'CBF':
-            
-            # Convergence Test: maximum number of iterations that will be performed
-            maxIterDynamic      = 1000
-            
-            # Convergence Test: flag used to print information on convergence
-            printFlagDynamic    = 0  
-            
-            # algorithmTypeDynamic    = 'Broyden'
-            # ops.algorithm(algorithmTypeDynamic, 8)
-            algorithmTypeDynamic    = 'Newton'
-            ops.algorithm(algorithmTypeDynamic)
-            
-            # # Convergence Test: tolerance
-            # testTypeDynamic = 'EnergyIncr'
-            # tolDynamic = 1e-6
-            
-            # # TRBDF2 integrator, best with energy
-            # ops.integrator('TRBDF2')
-            
-            # Convergence Test: tolerance
-            testTypeDynamic     = 'NormDispIncr'
-            tolDynamic = 1e-6
-            
-            # Newmark-integrator gamma parameter (also HHT)
-            newmarkGamma = 0.5
-            newmarkBeta = 0.25
-            ops.integrator('Newmark', newmarkGamma, newmarkBeta)
-            
-        else:
-            # Convergence Test: maximum number of iterations that will be performed
-            maxIterDynamic      = 100
-            
-            # Convergence Test: flag used to print information on convergence
-            printFlagDynamic    = 0  
-            
-            # algorithmTypeDynamic    = 'Broyden'
-            # ops.algorithm(algorithmTypeDynamic, 8)
-            algorithmTypeDynamic    = 'Newton'
-            ops.algorithm(algorithmTypeDynamic)
-            
-            # Convergence Test: tolerance
-            testTypeDynamic     = 'NormDispIncr'
-            tolDynamic = 1e-5
-            
-            # Newmark-integrator gamma parameter (also HHT)
-            newmarkGamma = 0.5
-            newmarkBeta = 0.25
-            ops.integrator('Newmark', newmarkGamma, newmarkBeta)
-            # ops.integrator('CentralDifference')
+        # solver, numberer, test, algorithm and integrator come from a profile
+        # default profile is selected by superstructure system
+        if analysis_profile is None:
+            analysis_profile = superstructure_system
+        profile = get_analysis_profile(analysis_profile)
+        print('Analysis profile: %s' % profile['name'])
         
-        ops.test(testTypeDynamic, tolDynamic, maxIterDynamic, printFlagDynamic)
+        ops.constraints(*profile['constraints'])
+        ops.numberer(*profile['numberer'])
+        ops.system(*profile['system'])
+        ops.algorithm(*profile['algorithm'])
+        ops.integrator(*profile['integrator'])
+        ops.test(*profile['test'])
+        
+        # fallback loops below return to this algorithm after a successful step
+        base_algo = profile['algorithm']
             
         ops.analysis('Transient')
 
@@ -3063,9 +3034,27 @@ class Building:
         import time
         t0 = time.time()
         
+        # convergence bookkeeping: successful steps per algorithm, failed attempts
+        algo_counts = {base_algo[0]: 0, 'NewtonLineSearch': 0,
+                       'Broyden': 0, 'BFGS': 0}
+        step_fails = {'n': 0}
+        
+        def log_step(ok, algo):
+            if ok == 0:
+                algo_counts[algo] += 1
+            else:
+                step_fails['n'] += 1
+        
         # Convergence loop, careful with Broyden/BFGS with energy
         ok = ops.analyze(n_steps, dt_transient)   
         
+        # steps completed by the initial Newton call
+        if ok == 0:
+            algo_counts[base_algo[0]] += n_steps
+        else:
+            algo_counts[base_algo[0]] += int(round(ops.getTime()/dt_transient))
+            step_fails['n'] += 1
+        
         if ok != 0:
             ops.analysis('Transient')
             curr_time = ops.getTime()
@@ -3074,7 +3063,9 @@ class Building:
             # # print nodes to see constraints
             node_log = ops.getNodeTags()
                 
-            with open('../data/logs/nodes.log', 'w') as f:
+            # next to run.log in this run's output directory, so DoE
+            # workers (one directory each) do not overwrite each other
+            with open(data_dir+'nodes.log', 'w') as f:
                 for nd in node_log:
                     f.write(f'Node {nd}: {ops.nodeDOFs(nd)}\n')
             # for nd in ops.getNodeTags():
@@ -3085,56 +3076,64 @@ class Building:
                 while (curr_time < T_end) and (ok == 0):
                     curr_time     = ops.getTime()
                     ok = ops.analyze(1, dt_transient)
+                    log_step(ok, base_algo[0])
                     if ok != 0:
                         print("Trying Newton with line search ...")
                         ops.algorithm('NewtonLineSearch')
                         ok = ops.analyze(1, dt_transient)
+                        log_step(ok, 'NewtonLineSearch')
                         if ok == 0:
-                            print("That worked. Back to Newton")
-                            ops.algorithm('Newton')
+                            print("That worked. Back to %s" % base_algo[0])
+                            ops.algorithm(*base_algo)
                     if ok != 0:
                         print('Trying Broyden ... ')
                         algorithmTypeDynamic = 'Broyden'
                         ops.algorithm(algorithmTypeDynamic)
                         ok = ops.analyze(1, dt_transient)
+                        log_step(ok, 'Broyden')
                         if ok == 0:
-                            print("That worked. Back to Newton")
-                            ops.algorithm('Newton')
+                            print("That worked. Back to %s" % base_algo[0])
+                            ops.algorithm(*base_algo)
                     if ok != 0:
                         print('Trying BFGS ... ')
                         algorithmTypeDynamic = 'BFGS'
                         ops.algorithm(algorithmTypeDynamic)
                         ok = ops.analyze(1, dt_transient)
+                        log_step(ok, 'BFGS')
                         if ok == 0:
-                            print("That worked. Back to Newton")
-                            ops.algorithm('Newton')
+                            print("That worked. Back to %s" % base_algo[0])
+                            ops.algorithm(*base_algo)
                           
             else:
                 ok = 0
                 while (curr_time < T_end) and (ok == 0):
                     curr_time     = ops.getTime()
                     ok = ops.analyze(1, dt_transient)
+                    log_step(ok, base_algo[0])
                     if ok != 0:
                         print("Trying Newton with line search ...")
                         ops.algorithm('NewtonLineSearch')
                         ok = ops.analyze(1, dt_transient)
+                        log_step(ok, 'NewtonLineSearch')
                         if ok == 0:
-                            print("That worked. Back to Newton")
-                            ops.algorithm('Newton')
+                            print("That worked. Back to %s" % base_algo[0])
+                            ops.algorithm(*base_algo)
                     if ok != 0:
                         print('Trying Broyden ... ')
                         ops.algorithm('Broyden')
                         ok = ops.analyze(1, dt_transient)
+                        log_step(ok, 'Broyden')
                         if ok == 0:
-                            print("That worked. Back to Newton")
-                            ops.algorithm('Newton')
+                            print("That worked. Back to %s" % base_algo[0])
+                            ops.algorithm(*base_algo)
                     if ok != 0:
                         print('Trying BFGS ... ')
                         ops.algorithm('BFGS')
                         ok = ops.analyze(1, dt_transient)
+                        log_step(ok, 'BFGS')
                         if ok == 0:
-                            print("That worked. Back to Newton")
-                            ops.algorithm('Newton')
+                            print("That worked. Back to %s" % base_algo[0])
+                            ops.algorithm(*base_algo)
                     if ok != 0:
                         print('CBF convergence loop exhausted. Ending run...')
                  
@@ -3163,29 +3162,188 @@ class Building:
         print('Ground motion done. End time: %.4f s' % t_final)
         print('Analysis time elapsed %dm %ds.' % (minutes, seconds))
         
+        # performance metadata of this transient run, picked up by run_nlth
+        # (successful steps per algorithm as flat n_steps_<algorithm> columns)
+        self.run_stats = {
+            'transient_time': tp,
+            'n_steps': sum(algo_counts.values()),
+            'n_failed_steps': step_fails['n'],
+            'dt_final': dt_transient,
+            'end_time': t_final,
+            'analysis_profile': profile['name']
+            }
+        for algo, algo_steps in algo_counts.items():
+            self.run_stats['n_steps_'+algo] = algo_steps
+        
         ops.wipe()
         
         return(ok)
+
+###############################################################################
+#              Transient analysis profiles
+###############################################################################
+
+# each entry holds the argument list passed to the matching OpenSees command
+# 'MF' and 'CBF' reproduce the original hardcoded settings for each system
+analysis_profiles = {
+    'MF': {
+        'constraints': ['Plain'],
+        'numberer': ['RCM'],
+        'system': ['UmfPack'],
+        'test': ['NormDispIncr', 1e-5, 100, 0],
+        'algorithm': ['Newton'],
+        'integrator': ['Newmark', 0.5, 0.25]
+        },
+    'CBF': {
+        'constraints': ['Plain'],
+        'numberer': ['RCM'],
+        'system': ['UmfPack'],
+        'test': ['NormDispIncr', 1e-6, 1000, 0],
+        'algorithm': ['Newton'],
+        'integrator': ['Newmark', 0.5, 0.25]
+        },
+
+    # banded solver, cheaper for short frames with narrow bandwidth after RCM
+    'band_general': {
+        'constraints': ['Plain'],
+        'numberer': ['RCM'],
+        'system': ['BandGeneral'],
+        'test': ['NormDispIncr', 1e-5, 100, 0],
+        'algorithm': ['Newton'],
+        'integrator': ['Newmark', 0.5, 0.25]
+        },
+
+    # symmetric sparse solver, only valid if all tangents stay symmetric
+    'sparse_sym': {
+        'constraints': ['Plain'],
+        'numberer': ['RCM'],
+        'system': ['SparseSYM'],
+        'test': ['NormDispIncr', 1e-5, 100, 0],
+        'algorithm': ['Newton'],
+        'integrator': ['Newmark', 0.5, 0.25]
+        },
+
+    # numerical damping of spurious high modes (e.g. brace subdivisions)
+    'hht': {
+        'constraints': ['Plain'],
+        'numberer': ['RCM'],
+        'system': ['UmfPack'],
+        'test': ['NormDispIncr', 1e-6, 1000, 0],
+        'algorithm': ['Newton'],
+        'integrator': ['HHT', 0.9]
+        },
+
+    # TRBDF2 integrator, best with energy test
+    'trbdf2': {
+        'constraints': ['Plain'],
+        'numberer': ['RCM'],
+        'system': ['UmfPack'],
+        'test': ['EnergyIncr', 1e-6, 1000, 0],
+        'algorithm': ['Newton'],
+        'integrator': ['TRBDF2']
+        },
+
+    # Krylov-accelerated Newton, fewer tangent formations per step
+    'krylov': {
+        'constraints': ['Plain'],
+        'numberer': ['RCM'],
+        'system': ['UmfPack'],
+        'test': ['NormDispIncr', 1e-6, 1000, 0],
+        'algorithm': ['KrylovNewton'],
+        'integrator': ['Newmark', 0.5, 0.25]
+        }
+    }
+
+# returns a copy of the named profile, or a custom profile dict filled with
+# the MF defaults for any missing command
+def get_analysis_profile(profile):
+    import copy
+
+    if isinstance(profile, dict):
+        full_profile = copy.deepcopy(analysis_profiles['MF'])
+        full_profile.update(copy.deepcopy(profile))
+        full_profile.setdefault('name', 'custom')
+        return(full_profile)
+
+    if profile not in analysis_profiles:
+        raise ValueError('Unknown analysis profile: %s. Available: %s' %
+                         (profile, ', '.join(analysis_profiles.keys())))
+
+    full_profile = copy.deepcopy(analysis_profiles[profile])
+    full_profile['name'] = profile
+    return(full_profile)
+
+###############################################################################
+#              Node numbering cache
+###############################################################################
+
+# tag sets keyed by (superstructure_system, isolator_system, num_stories,
+# num_bays), stored as integer arrays and shared by all buildings in the process
+topology_cache = {}
+
+def pack_topology(node_tags, elem_tags, elem_ids):
+    import numpy as np
+    
+    node_arrays = {key: np.array(tags, dtype=np.int64)
+                   for key, tags in node_tags.items()}
+    elem_arrays = {key: np.array(tags, dtype=np.int64)
+                   for key, tags in elem_tags.items()}
+    return(node_arrays, elem_arrays, dict(elem_ids))
+
+# hand out fresh lists so callers can never modify the cached arrays
+def unpack_topology(topology):
+    node_arrays, elem_arrays, elem_ids = topology
+    node_tags = {key: tags.tolist() for key, tags in node_arrays.items()}
+    elem_tags = {key: tags.tolist() for key, tags in elem_arrays.items()}
+    return(node_tags, elem_tags, dict(elem_ids))
+
 ###############################################################################
 #              Steel dimensions and parameters
 ###############################################################################
 
-def get_shape(shape_name, member, csv_dir='../resource/'):
+# shape databases are read once per process and reused for every lookup
+shape_db_cache = {}
+
+shape_db_files = {
+    'beam': 'beamShapes.csv',
+    'column': 'colShapes.csv',
+    'brace': 'braceShapes.csv'
+    }
+
+def get_shape_db(member, csv_dir='../resource/'):
     import pandas as pd
     
-    if member == 'beam':
-        shape_db = pd.read_csv(csv_dir+'beamShapes.csv',
-                               index_col=None, header=0)
-    elif member == 'column':
-        shape_db = pd.read_csv(csv_dir+'colShapes.csv',
-                               index_col=None, header=0)
-    elif member == 'brace':
-        shape_db = pd.read_csv(csv_dir+'braceShapes.csv',
-                               index_col=None, header=0)  
+    key = (member, csv_dir)
+    if key not in shape_db_cache:
+        shape_db_cache[key] = pd.read_csv(csv_dir+shape_db_files[member],
+                                          index_col=None, header=0)
+    return(shape_db_cache[key])
+
+def get_shape(shape_name, member, csv_dir='../resource/'):
+    shape_db = get_shape_db(member, csv_dir)
     shape = shape_db.loc[shape_db['AISC_Manual_Label'] == shape_name]
     return(shape)
 
-    
+# memoized section lookup: properties and MIK spring parameters of one shape
+# at member length L (L=None skips the MIK parameters, e.g. for braces)
+section_cache = {}
+
+def get_section(shape_name, member, L=None, csv_dir='../resource/'):
+    key = (shape_name, member, L, csv_dir)
+    if key not in section_cache:
+        shape = get_shape(shape_name, member, csv_dir)
+        if member == 'brace':
+            props = None
+        else:
+            props = get_properties(shape)
+        if L is None:
+            mik = None
+        else:
+            mik_row = get_mik_table(member, L, csv_dir).loc[shape_name]
+            mik = tuple(float(mik_row[col]) for col in mik_columns)
+        section_cache[key] = (props, mik)
+    return(section_cache[key])
+
 # get shape properties
 def get_properties(shape):
     Ag      = float(shape.iloc[0]['A'])
@@ -3204,10 +3362,6 @@ def get_properties(shape):
 ###############################################################################
 
 def modified_IK_params(shape, L):
-    # reference Lignos & Krawinkler (2011)
-    Fy = 50 # ksi
-    Es = 29000 # ksi
-    
     Zx = float(shape.iloc[0]['Zx'])
     # Sx = float(shape['Sx'])
     Iz = float(shape.iloc[0]['Ix'])
@@ -3215,6 +3369,20 @@ def modified_IK_params(shape, L):
     htw = float(shape.iloc[0]['h/tw'])
     bftf = float(shape.iloc[0]['bf/2tf'])
     ry = float(shape.iloc[0]['ry'])
+    
+    mik = modified_IK_regression(Zx, Iz, d, htw, bftf, ry, L)
+    return(tuple(float(param) for param in mik))
+
+# Lignos & Krawinkler regressions on scalars or arrays of section properties
+def modified_IK_regression(Zx, Iz, d, htw, bftf, ry, L):
+    # reference Lignos & Krawinkler (2011)
+    import numpy as np
+    
+    Fy = 50 # ksi
+    Es = 29000 # ksi
+    
+    Zx, Iz, d, htw, bftf, ry = (np.asarray(prop, dtype=float) 
+                                for prop in (Zx, Iz, d, htw, bftf, ry))
     c1 = 25.4
     c2 = 6.895
 
@@ -3228,29 +3396,57 @@ def modified_IK_params(shape, L):
     Ke = n*My/thy
     # consider using Lb = 0 for beams bc of slab?
     Lb = L
-    kappa = 0.4
-
-    if d > 21.0:
-        lam = (536*(htw)**(-1.26)*(bftf)**(-0.525)
-            *(Lb/ry)**(-0.130)*(c2*Fy/355)**(-0.291))
-        thp = (0.318*(htw)**(-0.550)*(bftf)**(-0.345)
-            *(Lb/ry)**(-0.0230)*(L/d)**(0.090)*(c1*d/533)**(-0.330)*
-            (c2*Fy/355)**(-0.130))
-        thpc = (7.50*(htw)**(-0.610)*(bftf)**(-0.710)
-            *(Lb/ry)**(-0.110)*(c1*d/533)**(-0.161)*
-            (c2*Fy/355)**(-0.320))
-    else:
-        lam = 495*(htw)**(-1.34)*(bftf)**(-0.595)*(c2*Fy/355)**(-0.360)
-        thp = (0.0865*(htw)**(-0.365)*(bftf)**(-0.140)
-            *(L/d)**(0.340)*(c1*d/533)**(-0.721)*
-            (c2*Fy/355)**(-0.230))
-        thpc = (5.63*(htw)**(-0.565)*(bftf)**(-0.800)
-            *(c1*d/533)**(-0.280)*(c2*Fy/355)**(-0.430))
-        
-    thu = 0.2
+    kappa = np.full(Zx.shape, 0.4)
+
+    # deep sections (d > 21 in.)
+    lam_deep = (536*(htw)**(-1.26)*(bftf)**(-0.525)
+        *(Lb/ry)**(-0.130)*(c2*Fy/355)**(-0.291))
+    thp_deep = (0.318*(htw)**(-0.550)*(bftf)**(-0.345)
+        *(Lb/ry)**(-0.0230)*(L/d)**(0.090)*(c1*d/533)**(-0.330)*
+        (c2*Fy/355)**(-0.130))
+    thpc_deep = (7.50*(htw)**(-0.610)*(bftf)**(-0.710)
+        *(Lb/ry)**(-0.110)*(c1*d/533)**(-0.161)*
+        (c2*Fy/355)**(-0.320))
+    
+    # shallow sections
+    lam_shallow = 495*(htw)**(-1.34)*(bftf)**(-0.595)*(c2*Fy/355)**(-0.360)
+    thp_shallow = (0.0865*(htw)**(-0.365)*(bftf)**(-0.140)
+        *(L/d)**(0.340)*(c1*d/533)**(-0.721)*
+        (c2*Fy/355)**(-0.230))
+    thpc_shallow = (5.63*(htw)**(-0.565)*(bftf)**(-0.800)
+        *(c1*d/533)**(-0.280)*(c2*Fy/355)**(-0.430))
+    
+    is_deep = d > 21.0
+    lam = np.where(is_deep, lam_deep, lam_shallow)
+    thp = np.where(is_deep, thp_deep, thp_shallow)
+    thpc = np.where(is_deep, thpc_deep, thpc_shallow)
+        
+    thu = np.full(Zx.shape, 0.2)
 
     return(Ke, My, lam, thp, thpc, kappa, thu)
 
+# MIK parameters for every shape in a member catalog at member length L,
+# indexed by AISC_Manual_Label; computed once per (member, L) and reused
+mik_table_cache = {}
+
+mik_columns = ['Ke', 'My', 'lam', 'thp', 'thpc', 'kappa', 'thu']
+
+def get_mik_table(member, L, csv_dir='../resource/'):
+    import pandas as pd
+    
+    key = (member, L, csv_dir)
+    if key not in mik_table_cache:
+        shape_db = get_shape_db(member, csv_dir)
+        props = shape_db[['Zx', 'Ix', 'd', 'h/tw', 'bf/2tf', 'ry']].apply(
+            pd.to_numeric, errors='coerce')
+        mik = modified_IK_regression(props['Zx'], props['Ix'], props['d'],
+                                     props['h/tw'], props['bf/2tf'],
+                                     props['ry'], L)
+        mik_df = pd.DataFrame(dict(zip(mik_columns, mik)))
+        mik_df.index = shape_db['AISC_Manual_Label'].values
+        mik_table_cache[key] = mik_df
+    return(mik_table_cache[key])
+
 ###############################################################################
 #              Brace geometry
 ###############################################################################
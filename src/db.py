@@ -413,18 +413,46 @@ class Database:
     def calculate_collapse(self, drift_mu_plus_std=0.1):
         df = self.ops_analysis
         
-        from experiment import collapse_fragility
-        df[['max_drift',
-           'collapse_prob']] = df.apply(lambda row: collapse_fragility(row, drift_at_mu_plus_std=drift_mu_plus_std),
-                                                axis='columns', result_type='expand')
-                               
-        from numpy import log
-        df['log_collapse_prob'] = log(df['collapse_prob'])
+        from experiment import collapse_fragility_df
+        df[['max_drift', 'collapse_prob', 
+            'log_collapse_prob']] = collapse_fragility_df(
+                df, drift_at_mu_plus_std=drift_mu_plus_std)
         
         self.ops_analysis = df
-                
+
+    # aggregate run_nlth performance metadata by system to find expensive designs
+    def run_cost_summary(self, group_cols=['superstructure_system',
+                                           'isolator_system']):
+        import pandas as pd
+
+        df = self.ops_analysis
+        perf_cols = ['build_time', 'gravity_time', 'eigen_time',
+                     'transient_time', 'total_run_time', 'n_steps',
+                     'n_failed_steps', 'n_attempts', 'dt_final',
+                     'process_peak_memory_mb']
+        perf_cols = [col for col in perf_cols if col in df.columns]
+        perf_cols += [col for col in df.columns if col.startswith('n_steps_')]
+
+        if len(perf_cols) == 0:
+            print('No performance metadata found in analysis results.')
+            return None
+
+        perf_df = df[group_cols + perf_cols].copy()
+        perf_df[perf_cols] = perf_df[perf_cols].apply(pd.to_numeric,
+                                                      errors='coerce')
+
+        # per-step cost helps compare systems run with different time steps
+        if ('transient_time' in perf_cols) and ('n_steps' in perf_cols):
+            perf_df['time_per_step'] = (perf_df['transient_time'] /
+                                        perf_df['n_steps'].clip(lower=1))
+
+        summary = perf_df.groupby(group_cols).agg(['mean', 'max'])
+        summary[('n_runs', '')] = perf_df.groupby(group_cols).size()
+        return summary
+
     def perform_doe(self, target_prob=0.5, n_set=200, max_iters=1000,
-                    batch_size=10, kernel='rbf_iso', strategy='balanced'):
+                    batch_size=10, kernel='rbf_iso', strategy='balanced',
+                    fit_jobs=1):
         
         try:
             whole_set = self.ops_analysis
@@ -445,7 +473,8 @@ class Database:
         
         df_doe, rmse_hist, mae_hist, nrmse_hist, hyperparam_list = run_doe(
             target_prob, df_train, df_test, batch_size=batch_size, error_tol=1e-2, 
-            maxIter=max_iters, conv_tol=1e-4, kernel=kernel, doe_strat=strategy)
+            maxIter=max_iters, conv_tol=1e-4, kernel=kernel, doe_strat=strategy,
+            fit_jobs=fit_jobs)
         
         self.doe_analysis = df_doe
         self.rmse_hist = rmse_hist
@@ -715,294 +744,129 @@ class Database:
         # TODO: store ida depending on target
         self.ida_results = db_results
         
-    def run_pelicun(self, db, mode='generate',
-                    cmp_dir='../resource/loss/'):
-        # run info
-        import pandas as pd
+    # Pelicun loss estimation of every run in db, returned in db order as a
+    # DataFrame with one flat summary record per run (loss.loss_summary_header)
+    # n_workers > 1 splits db into partitions handled by a process pool; each
+    # partition has its own Assessment and all runs share the fixed seed, so
+    # the result does not depend on n_workers
+    # adaptive=True sizes each run's Monte Carlo sample by convergence of the
+    # loss statistics instead of the fixed 1000 realizations
+    # batch=True assesses up to batch_size runs with identical component
+    # models together in one Pelicun assessment (loss.estimate_damage_batch);
+    # partitions then hold whole batches, so batch membership is the same for
+    # any n_workers
+    # analytic=True replaces the Monte Carlo assessment by the analytic
+    # expected loss and quantiles (Loss_Analysis.estimate_loss_analytic),
+    # generate mode only
+    def estimate_run_losses(self, db, mode='generate', 
+                            cmp_dir='../resource/loss/', n_workers=1, seed=985,
+                            adaptive=False, batch=False, batch_size=20,
+                            analytic=False):
         import numpy as np
-
-        # and import pelicun classes and methods
-        from pelicun.assessment import Assessment
-        from loss import Loss_Analysis
-
-        # get database
-        # initialize, no printing outputs, offset fixed with current components
-        PAL = Assessment({
-            "PrintLog": False, 
-            "Seed": 985,
-            "Verbose": False,
-            "DemandOffset": {"PFA": 0, "PFV": 0}
-        })
-
-        # generate structural components and join with NSCs
-        P58_metadata = PAL.get_default_metadata('loss_repair_DB_FEMA_P58_2nd')
-        
-        additional_frag_db = pd.read_csv(cmp_dir+'custom_component_fragilities.csv',
-                                          header=[0,1], index_col=0)
-        
-        # lab, health, ed, res, office, retail, warehouse, hotel
-        fl_usage = [0., 0., 0., 0., 1.0, 0., 0., 0.]
+        import pandas as pd
+        from loss import estimate_loss_partition, loss_summary_header
         
         db = db.reset_index(drop=True)
         
-        # estimate loss for set
-        all_losses = []
-        loss_cmp_group = []
-        col_list = []
-        irr_list = []
-        
-        for run_idx in db.index:
-            print('========================================')
-            print('Estimating loss for run index', run_idx+1)
-            
-            run_data = db.loc[run_idx]
+        if n_workers == 1 or len(db) < 2:
+            results = estimate_loss_partition(db, mode, cmp_dir, seed, adaptive,
+                                              batch, batch_size, 
+                                              analytic=analytic)
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            from loss import preload_loss_models
             
-            floors = run_data.num_stories
+            # fill the loss model cache once, forked workers inherit it
+            preload_loss_models(nqe_dir=cmp_dir, cmp_dir=cmp_dir)
             
-            bldg_usage = [fl_usage]*floors
-
-            loss = Loss_Analysis(run_data)
-            loss.nqe_sheets()
-            loss.normative_quantity_estimation(bldg_usage, P58_metadata)
-
-            loss.process_EDP()
-            
-            [cmp, dmg, loss, loss_cmp, agg, 
-             collapse_rate, irr_rate] = loss.estimate_damage(
-                 custom_fragility_db=additional_frag_db, mode=mode)
-            
-            loss_summary = agg.describe([0.1, 0.5, 0.9])
-            cost = loss_summary['repair_cost']['50%']
-            time_l = loss_summary[('repair_time', 'parallel')]['50%']
-            time_u = loss_summary[('repair_time', 'sequential')]['50%']
-            
-            print('Median repair cost: ', 
-                  f'${cost:,.2f}')
-            print('Median lower bound repair time: ', 
-                  f'{time_l:,.2f}', 'worker-days')
-            print('Median upper bound repair time: ', 
-                  f'{time_u:,.2f}', 'worker-days')
-            print('Collapse frequency: ', 
-                  f'{collapse_rate:.2%}')
-            print('Irreparable RID frequency: ', 
-                  f'{irr_rate:.2%}')
-            print('Replacement frequency: ', 
-                  f'{collapse_rate+irr_rate:.2%}')
-            
-            all_losses.append(loss_summary)
-            loss_cmp_group.append(loss_cmp)
-            col_list.append(collapse_rate)
-            irr_list.append(irr_rate)
-                 
-        
-        # concat list of df into one df
-        loss_df = pd.concat(all_losses)
-        group_df = pd.concat(loss_cmp_group)
-        
-        loss_header = ['cost_mean', 'cost_std', 'cost_min',
-                       'cost_10%', 'cost_50%', 'cost_90%', 'cost_max',
-                       'time_l_mean', 'time_l_std', 'time_l_min',
-                       'time_l_10%', 'time_l_50%', 'time_l_90%', 'time_l_max',
-                       'time_u_mean', 'time_u_std', 'time_u_min',
-                       'time_u_10%', 'time_u_50%', 'time_u_90%', 'time_u_max']
-        
-        
-        
-        all_rows = []
-        
-        for row_idx in range(len(loss_df)):
-            if row_idx % 8 == 0:
-                # get the block with current run, drop the 'Count'
-                run_df = loss_df[row_idx:row_idx+8]
-                run_df = run_df.transpose()
-                run_df = run_df.drop(columns=['count'])
-                new_row = pd.concat([run_df.iloc[0], 
-                                     run_df.iloc[1], 
-                                     run_df.iloc[2]])
-                
-                all_rows.append(new_row)
-                
-        loss_df_data = pd.concat(all_rows, axis=1).T
-        loss_df_data.columns = loss_header
-        
-        loss_df_data['collapse_freq'] = col_list
-        loss_df_data['irreparable_freq'] = irr_list
-        loss_df_data['replacement_freq'] = [x + y for x, y
-                                            in zip(col_list, irr_list)]
-        
-        
-        # clean loss_by_group results=
-        group_header = ['B_mean', 'B_std', 'B_min',
-                       'B_25%', 'B_50%', 'B_75%', 'B_max',
-                       'C_mean', 'C_std', 'C_min',
-                       'C_25%', 'C_50%', 'C_75%', 'C_max',
-                       'D_mean', 'D_std', 'D_min',
-                       'D_25%', 'D_50%', 'D_75%', 'D_max',
-                       'E_mean', 'E_std', 'E_min',
-                       'E_25%', 'E_50%', 'E_75%', 'E_max']
-        
-        all_rows = []
-        
-        for row_idx in range(len(group_df)):
-            if row_idx % 8 == 0:
-                # get the block with current run, drop the 'Count'
-                run_df = group_df[row_idx:row_idx+8]
-                run_df = run_df.transpose()
-                run_df = run_df.drop(columns=['count'])
-                new_row = pd.concat([run_df.iloc[0], 
-                                     run_df.iloc[1], run_df.iloc[2], 
-                                     run_df.iloc[3]])
+            # a few partitions per worker to even out building sizes
+            if batch and not adaptive and not analytic:
+                from loss import cmp_batches, run_cmp_keys
                 
-                all_rows.append(new_row)
-                
-        group_df_data = pd.concat(all_rows, axis=1).T
-        group_df_data.columns = group_header
-        
-        self.loss_data = pd.concat([loss_df_data, group_df_data], axis=1)
+                # split on whole batches, as formed in a serial run
+                run_batches = cmp_batches(db.index, run_cmp_keys(db), 
+                                          batch_size)
+                n_parts = min(len(run_batches), n_workers*4)
+                partitions = [db.loc[[run_idx for batch_idx in part_batches 
+                                      for run_idx in run_batches[batch_idx]]]
+                              for part_batches in np.array_split(
+                                      np.arange(len(run_batches)), n_parts)]
+            else:
+                n_parts = min(len(db), n_workers*4)
+                partitions = [db.loc[part_idx] for part_idx 
+                              in np.array_split(db.index, n_parts)]
+            
+            results = []
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = [executor.submit(estimate_loss_partition, db_part,
+                                           mode, cmp_dir, seed, adaptive, 
+                                           batch, batch_size, 
+                                           analytic=analytic)
+                           for db_part in partitions]
+                for future in futures:
+                    results += future.result()
+        
+        loss_records = np.empty((len(db), len(loss_summary_header)))
+        for run_idx, loss_record in results:
+            loss_records[run_idx] = loss_record
+        
+        return(pd.DataFrame(loss_records, columns=loss_summary_header))
+        
+    # n_workers > 1 partitions the runs across a process pool (see
+    # estimate_run_losses); loss_data is the same as the serial result
+    def run_pelicun(self, db, mode='generate',
+                    cmp_dir='../resource/loss/', n_workers=1, seed=985,
+                    adaptive=False, batch=False, batch_size=20, 
+                    analytic=False):
         
-    def calc_cmp_max(self, db,
-                    cmp_dir='../resource/loss/'):
-        # run info
-        import pandas as pd
+        # estimate loss for set
+        self.loss_data = self.estimate_run_losses(
+            db, mode=mode, cmp_dir=cmp_dir, n_workers=n_workers, seed=seed,
+            adaptive=adaptive, batch=batch, batch_size=batch_size, 
+            analytic=analytic)
+        
+    # surrogate screening of run losses (doe.Loss_Surrogate): runs whose
+    # calibrated interval contains a decision threshold, e.g. {'cost_50%':
+    # 1e6, 'replacement_freq': 0.1}, are assessed with full Pelicun, the others
+    # keep the surrogate prediction (only the surrogate outcomes are filled)
+    # returns the loss records (loss.loss_summary_header) in db order and a
+    # boolean mask of the runs sent to Pelicun
+    def screen_run_losses(self, db, surrogate, thresholds, mode='generate',
+                          cmp_dir='../resource/loss/', n_workers=1, seed=985,
+                          batch=False, batch_size=20):
         import numpy as np
-
-        # and import pelicun classes and methods
-        from pelicun.assessment import Assessment
-        from loss import Loss_Analysis
-
-        # get database
-        # initialize, no printing outputs, offset fixed with current components
-        PAL = Assessment({
-            "PrintLog": False, 
-            "Seed": 985,
-            "Verbose": False,
-            "DemandOffset": {"PFA": 0, "PFV": 0}
-        })
-
-        # generate structural components and join with NSCs
-        P58_metadata = PAL.get_default_metadata('loss_repair_DB_FEMA_P58_2nd')
+        import pandas as pd
+        from loss import loss_summary_header
         
-        additional_frag_db = pd.read_csv(cmp_dir+'custom_component_fragilities.csv',
-                                          header=[0,1], index_col=0)
+        db = db.reset_index(drop=True)
         
-        # lab, health, ed, res, office, retail, warehouse, hotel
-        fl_usage = [0., 0., 0., 0., 1.0, 0., 0., 0.]
+        pred_df = surrogate.predict(db)
+        pelicun_mask = surrogate.near_boundary(pred_df, thresholds)
         
-        db = db.reset_index(drop=True)
+        loss_records = pd.DataFrame(np.nan, index=db.index, 
+                                    columns=loss_summary_header)
+        for outcome in surrogate.outcome_list:
+            loss_records[outcome] = pred_df[outcome]
         
-        # estimate loss for set
-        all_losses = []
-        loss_cmp_group = []
-        col_list = []
-        irr_list = []
+        print('Surrogate screening: %d of %d runs sent to Pelicun' % 
+              (pelicun_mask.sum(), len(db)))
         
-        for run_idx in db.index:
-            print('========================================')
-            print('Estimating maximum loss for run index', run_idx+1)
-            
-            run_data = db.loc[run_idx]
-            
-            floors = run_data.num_stories
-            
-            bldg_usage = [fl_usage]*floors
-
-            loss = Loss_Analysis(run_data)
-            loss.nqe_sheets()
-            loss.normative_quantity_estimation(bldg_usage, P58_metadata)
-
-            loss.process_EDP()
-            
-            [cmp, dmg, loss, loss_cmp, agg, 
-             collapse_rate, irr_rate] = loss.estimate_damage(
-                 custom_fragility_db=additional_frag_db, mode='maximize')
-            
-            loss_summary = agg.describe([0.1, 0.5, 0.9])
-            cost = loss_summary['repair_cost']['50%']
-            time_l = loss_summary[('repair_time', 'parallel')]['50%']
-            time_u = loss_summary[('repair_time', 'sequential')]['50%']
-            
-            print('Median repair cost: ', 
-                  f'${cost:,.2f}')
-            print('Median lower bound repair time: ', 
-                  f'{time_l:,.2f}', 'worker-days')
-            print('Median upper bound repair time: ', 
-                  f'{time_u:,.2f}', 'worker-days')
-            print('Collapse frequency: ', 
-                  f'{collapse_rate:.2%}')
-            print('Irreparable RID frequency: ', 
-                  f'{irr_rate:.2%}')
-            print('Replacement frequency: ', 
-                  f'{collapse_rate+irr_rate:.2%}')
-            
-            all_losses.append(loss_summary)
-            loss_cmp_group.append(loss_cmp)
-            col_list.append(collapse_rate)
-            irr_list.append(irr_rate)
-                 
-        
-        # concat list of df into one df
-        loss_df = pd.concat(all_losses)
-        group_df = pd.concat(loss_cmp_group)
-        
-        loss_header = ['cost_mean', 'cost_std', 'cost_min',
-                       'cost_10%', 'cost_50%', 'cost_90%', 'cost_max',
-                       'time_l_mean', 'time_l_std', 'time_l_min',
-                       'time_l_10%', 'time_l_50%', 'time_l_90%', 'time_l_max',
-                       'time_u_mean', 'time_u_std', 'time_u_min',
-                       'time_u_10%', 'time_u_50%', 'time_u_90%', 'time_u_max']
-        
-        
-        
-        all_rows = []
-        
-        for row_idx in range(len(loss_df)):
-            if row_idx % 8 == 0:
-                # get the block with current run, drop the 'Count'
-                run_df = loss_df[row_idx:row_idx+8]
-                run_df = run_df.transpose()
-                run_df = run_df.drop(columns=['count'])
-                new_row = pd.concat([run_df.iloc[0], 
-                                     run_df.iloc[1], 
-                                     run_df.iloc[2]])
-                
-                all_rows.append(new_row)
-                
-        loss_df_data = pd.concat(all_rows, axis=1).T
-        loss_df_data.columns = loss_header
-        
-        loss_df_data['collapse_freq'] = col_list
-        loss_df_data['irreparable_freq'] = irr_list
-        loss_df_data['replacement_freq'] = [x + y for x, y
-                                            in zip(col_list, irr_list)]
-        
-        
-        # clean loss_by_group results=
-        group_header = ['B_mean', 'B_std', 'B_min',
-                       'B_25%', 'B_50%', 'B_75%', 'B_max',
-                       'C_mean', 'C_std', 'C_min',
-                       'C_25%', 'C_50%', 'C_75%', 'C_max',
-                       'D_mean', 'D_std', 'D_min',
-                       'D_25%', 'D_50%', 'D_75%', 'D_max',
-                       'E_mean', 'E_std', 'E_min',
-                       'E_25%', 'E_50%', 'E_75%', 'E_max']
-        
-        all_rows = []
-        
-        for row_idx in range(len(group_df)):
-            if row_idx % 8 == 0:
-                # get the block with current run, drop the 'Count'
-                run_df = group_df[row_idx:row_idx+8]
-                run_df = run_df.transpose()
-                run_df = run_df.drop(columns=['count'])
-                new_row = pd.concat([run_df.iloc[0], 
-                                     run_df.iloc[1], run_df.iloc[2], 
-                                     run_df.iloc[3]])
-                
-                all_rows.append(new_row)
-                
-        group_df_data = pd.concat(all_rows, axis=1).T
-        group_df_data.columns = group_header
+        if pelicun_mask.any():
+            pelicun_losses = self.estimate_run_losses(
+                db[pelicun_mask], mode=mode, cmp_dir=cmp_dir, 
+                n_workers=n_workers, seed=seed, batch=batch, 
+                batch_size=batch_size)
+            loss_records.loc[pelicun_mask] = pelicun_losses.to_numpy()
+        
+        return(loss_records, pelicun_mask)
         
-        self.max_loss = pd.concat([loss_df_data, group_df_data], axis=1)
+    def calc_cmp_max(self, db,
+                    cmp_dir='../resource/loss/', n_workers=1, seed=985,
+                    adaptive=False, batch=False, batch_size=20):
+        
+        # estimate loss for set
+        self.max_loss = self.estimate_run_losses(
+            db, mode='maximize', cmp_dir=cmp_dir, n_workers=n_workers, seed=seed,
+            adaptive=adaptive, batch=batch, batch_size=batch_size)
     
 #%% test inverse design validator
\ No newline at end of file
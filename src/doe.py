@@ -57,9 +57,9 @@ class GP:
         self.lin_reg = lin_pipe
         
     # Train GP classifier
-    def fit_gpc(self, kernel_name, noisy=True):
-        from sklearn.pipeline import Pipeline
-        from sklearn.preprocessing import StandardScaler
+    # n_jobs > 1 or theta0 runs the optimizer starts through multistart_fit
+    def fit_gpc(self, kernel_name, noisy=True, n_restarts=0, n_jobs=1,
+                theta0=None):
         from sklearn.gaussian_process import GaussianProcessClassifier
         import sklearn.gaussian_process.kernels as krn
         
@@ -84,22 +84,48 @@ class GP:
 
         if noisy==True:
             kernel = kernel + krn.WhiteKernel(noise_level=0.5)
+        
+        gpc_obj = GaussianProcessClassifier(kernel=kernel,
+                                            warm_start=True,
+                                            random_state=985,
+                                            n_restarts_optimizer=n_restarts,
+                                            max_iter_predict=250)
+        
         # pipeline to scale -> GPC
-        gp_pipe = Pipeline([
-                ('scaler', StandardScaler()),
-                ('gpc', GaussianProcessClassifier(kernel=kernel,
-                                                  warm_start=True,
-                                                  random_state=985,
-                                                  max_iter_predict=250))
-                ])
-    
-        gp_pipe.fit(self.X, self.y)
+        gp_pipe = self.fit_pipeline('gpc', gpc_obj, n_jobs=n_jobs, theta0=theta0)
         tr_scr = gp_pipe.score(self.X, self.y)
         print("The GP training score is %0.2f"
               %tr_scr)
         
         self.gpc = gp_pipe
         
+    # scale -> estimator pipeline, fit time is kept in self.fit_time
+    # GP estimators are fit with multistart_fit for parallel or warm starts
+    def fit_pipeline(self, step_name, estimator, n_jobs=1, theta0=None):
+        import time
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler
+        
+        t0 = time.time()
+        if n_jobs == 1 and theta0 is None:
+            gp_pipe = Pipeline([
+                    ('scaler', StandardScaler()),
+                    (step_name, estimator)
+                    ])
+            gp_pipe.fit(self.X, self.y)
+        else:
+            scaler = StandardScaler().fit(self.X)
+            X_scaled = scaler.transform(self.X)
+            fitted = multistart_fit(estimator, X_scaled, self.y,
+                                    theta0=theta0, n_jobs=n_jobs)
+            gp_pipe = Pipeline([
+                    ('scaler', scaler),
+                    (step_name, fitted)
+                    ])
+        self.fit_time = time.time() - t0
+        
+        return(gp_pipe)
+        
     def get_kernel(self, X_pr, kernel_name='rbf', gamma=0.25,
                                degree=3):
         if kernel_name=='rbf':
@@ -219,9 +245,14 @@ class GP:
         return y_pred, gp_std
     
     # Train GP regression
-    def fit_gpr(self, kernel_name):
-        from sklearn.pipeline import Pipeline
-        from sklearn.preprocessing import StandardScaler
+    # backend='exact' is sklearn's GaussianProcessRegressor; backend='sparse'
+    # conditions on n_inducing training points (sparse_gp.SparseGPR) for
+    # large sets. LOOCV acquisition and update_gpr need the exact backend
+    # n_jobs > 1 or theta0 (warm start, e.g. the previous DoE fit) runs the
+    # optimizer restarts of the exact backend through multistart_fit (not
+    # available for the sparse backend)
+    def fit_gpr(self, kernel_name, backend='exact', n_inducing=500, n_jobs=1,
+                theta0=None):
         from sklearn.gaussian_process import GaussianProcessRegressor
         import sklearn.gaussian_process.kernels as krn
         
@@ -247,19 +278,195 @@ class GP:
         kernel = kernel + krn.WhiteKernel(noise_level=0.1, noise_level_bounds=(1e-5, 1e1))
         # kernel = kernel + 0.1**2 * krn.RBF(length_scale=0.1)
             
+        if backend == 'exact':
+            gpr_obj = GaussianProcessRegressor(kernel=kernel,
+                                               random_state=985,
+                                               n_restarts_optimizer=10)
+        elif backend == 'sparse':
+            if n_jobs != 1 or theta0 is not None:
+                raise ValueError('n_jobs and theta0 are only supported by '
+                                 'the exact GP backend')
+            from sparse_gp import SparseGPR
+            gpr_obj = SparseGPR(kernel=kernel, n_inducing=n_inducing,
+                                random_state=985,
+                                n_restarts_optimizer=10)
+        else:
+            raise ValueError('Unknown GP backend: ' + str(backend))
+            
         # pipeline to scale -> GPR
-        gp_pipe = Pipeline([
-                ('scaler', StandardScaler()),
-                ('gpr', GaussianProcessRegressor(kernel=kernel,
-                                                 random_state=985,
-                                                 n_restarts_optimizer=10))
-                ])
-    
-        gp_pipe.fit(self.X, self.y)
+        if backend == 'exact':
+            gp_pipe = self.fit_pipeline('gpr', gpr_obj, n_jobs=n_jobs,
+                                        theta0=theta0)
+        else:
+            gp_pipe = self.fit_pipeline('gpr', gpr_obj)
         
         self.gpr = gp_pipe
+        self.gpr_backend = backend
+        
+        # per-point marginal likelihood at the optimized hyperparameters,
+        # reference for drift checks in update_gpr
+        gp_obj = gp_pipe._final_estimator
+        self.lml_per_pt = gp_obj.log_marginal_likelihood_value_/self.X.shape[0]
+        
+    def update_gpr(self, df_new):
+        """Append observations to a fitted GPR without re-optimizing.
+        The kernel hyperparameters and input scaling are kept fixed and the
+        Cholesky factor is extended with a rank-k block update.
+
+        Parameters
+        ----------
+        df_new: DataFrame of new rows with the covariate and outcome columns
+    
+        Returns
+        -------
+        lml_drift: relative change of the per-point log marginal likelihood
+        since the last full fit_gpr
+        """
+        import numpy as np
+        import pandas as pd
+        from scipy.linalg import cho_solve, cholesky, solve_triangular
+        
+        gp_obj = self.gpr._final_estimator
+        scaler = self.gpr.named_steps['scaler']
+        
+        var_list = self.X.columns
+        outcome_var = self.y.columns
+        
+        X_new = scaler.transform(df_new[var_list])
+        y_new = df_new[outcome_var].to_numpy(dtype=float)
+        
+        # block Cholesky: [[L11, 0], [L21, L22]]
+        L_11 = gp_obj.L_
+        K_12 = gp_obj.kernel_(gp_obj.X_train_, X_new)
+        K_22 = gp_obj.kernel_(X_new)
+        K_22[np.diag_indices_from(K_22)] += gp_obj.alpha
+        L_21 = solve_triangular(L_11, K_12, lower=True).T
+        L_22 = cholesky(K_22 - L_21 @ L_21.T, lower=True)
+        
+        n_old = L_11.shape[0]
+        n_new = L_22.shape[0]
+        L = np.zeros((n_old+n_new, n_old+n_new))
+        L[:n_old, :n_old] = L_11
+        L[n_old:, :n_old] = L_21
+        L[n_old:, n_old:] = L_22
+        
+        y_train = np.concatenate([np.asarray(gp_obj.y_train_).reshape(n_old, -1),
+                                  y_new.reshape(n_new, -1)])
+        if np.ndim(gp_obj.y_train_) == 1:
+            y_train = y_train.ravel()
+            
+        gp_obj.X_train_ = np.vstack([gp_obj.X_train_, X_new])
+        gp_obj.y_train_ = y_train
+        gp_obj.L_ = L
+        gp_obj.alpha_ = cho_solve((L, True), y_train)
+        
+        # older sklearn caches K^-1 for predict(return_std=True)
+        if hasattr(gp_obj, '_K_inv'):
+            gp_obj._K_inv = None
+        
+        # keep the GP object consistent with the grown training set
+        self._raw_data = pd.concat([self._raw_data, df_new], axis=0)
+        self.k = len(self._raw_data)
+        self.X = self._raw_data[var_list]
+        self.y = self._raw_data[outcome_var]
+        self._loocv_gp = None
+        
+        # log marginal likelihood at fixed hyperparameters (GPML eq. 2.30)
+        alpha_ = gp_obj.alpha_.reshape(L.shape[0], -1)
+        y_col = y_train.reshape(L.shape[0], -1)
+        lml = (-0.5*np.einsum('ik,ik->k', y_col, alpha_).sum()
+               - alpha_.shape[1]*np.log(np.diag(L)).sum()
+               - alpha_.shape[1]*L.shape[0]/2*np.log(2*np.pi))
+        lml_per_pt = lml/L.shape[0]
+        
+        lml_drift = abs(lml_per_pt - self.lml_per_pt)/abs(self.lml_per_pt)
+        return(lml_drift)
+    
+    def predict_gpr_chunked(self, X, return_std=True, max_mem_mb=512,
+                            n_threads=1, predictor=None):
+        """Predict over a large grid in chunks with bounded memory.
+        Each chunk materializes a (chunk x n_train) cross-kernel, so the
+        chunk size is set so that all concurrent chunks stay within
+        max_mem_mb. Results are written into preallocated arrays.
+
+        Parameters
+        ----------
+        X: DataFrame (or array) of prediction points
+        return_std: also return the predictive standard deviation
+        max_mem_mb: memory budget for the kernel temporaries, in MB
+        n_threads: number of chunks predicted concurrently (BLAS releases
+        the GIL, so threads scale without copying the model)
+        predictor: fitted pipeline to use, defaults to self.gpr
+    
+        Returns
+        -------
+        y_mean (, y_std): arrays of length X.shape[0]
+        """
+        import numpy as np
+        from concurrent.futures import ThreadPoolExecutor
+        
+        if predictor is None:
+            predictor = self.gpr
+        
+        # reference set the cross-kernel is taken against
+        gp_obj = predictor._final_estimator
+        if hasattr(gp_obj, 'inducing_points_'):
+            n_ref = gp_obj.inducing_points_.shape[0]
+        else:
+            n_ref = gp_obj.X_train_.shape[0]
+        
+        # kernel, its distance/gradient temporaries and the triangular
+        # solve: ~4 (n_ref) float64 rows per prediction point
+        bytes_per_pt = 4*8*max(n_ref, 1)
+        n_threads = max(int(n_threads), 1)
+        chunk_size = int(max_mem_mb*1024**2/(bytes_per_pt*n_threads))
+        chunk_size = max(chunk_size, 1)
+        
+        n_pts = X.shape[0]
+        if hasattr(X, 'iloc'):
+            get_rows = lambda i0, i1: X.iloc[i0:i1]
+        else:
+            get_rows = lambda i0, i1: X[i0:i1]
+        
+        starts = list(range(0, n_pts, chunk_size))
+        
+        def predict_chunk(i0):
+            i1 = min(i0 + chunk_size, n_pts)
+            return(i0, i1, predictor.predict(get_rows(i0, i1),
+                                             return_std=return_std))
+        
+        y_mean = None
+        y_std = None
+        
+        def store_chunk(result):
+            nonlocal y_mean, y_std
+            i0, i1, pred = result
+            chunk_mean, chunk_std = pred if return_std else (pred, None)
+            
+            # allocate on the first chunk to follow the predictor's shape
+            if y_mean is None:
+                y_mean = np.empty((n_pts,) + np.shape(chunk_mean)[1:])
+                if return_std:
+                    y_std = np.empty((n_pts,) + np.shape(chunk_std)[1:])
+            y_mean[i0:i1] = chunk_mean
+            if return_std:
+                y_std[i0:i1] = chunk_std
+        
+        if n_threads == 1 or len(starts) == 1:
+            for i0 in starts:
+                store_chunk(predict_chunk(i0))
+        else:
+            with ThreadPoolExecutor(max_workers=n_threads) as pool:
+                for result in pool.map(predict_chunk, starts):
+                    store_chunk(result)
+        
+        if return_std:
+            return(y_mean, y_std)
+        return(y_mean)
         
-    def fit_kernel_ridge(self, kernel_name='rbf'):
+    # n_jobs parallelizes the cross-validation grid
+    def fit_kernel_ridge(self, kernel_name='rbf', n_jobs=1):
+        import time
         from sklearn.pipeline import Pipeline
         from sklearn.preprocessing import StandardScaler
         from sklearn.kernel_ridge import KernelRidge
@@ -275,7 +482,8 @@ class GP:
              'kr__gamma':logspace(-3, 3, 7)}
             ]
         
-        kr_cv = GridSearchCV(kr_pipe, param_grid=parameters)
+        t0 = time.time()
+        kr_cv = GridSearchCV(kr_pipe, param_grid=parameters, n_jobs=n_jobs)
         kr_cv.fit(self.X, self.y)
         
         # set pipeline to use CV params
@@ -285,6 +493,7 @@ class GP:
         kr_pipe.fit(self.X, self.y)
         
         self.kr = kr_pipe
+        self.fit_time = time.time() - t0
     
     '''
     # Train SVM regression
@@ -423,7 +632,8 @@ class GP:
             
         return x_keep
     
-    def doe_rejection_sampler(self, n_pts, pr, bound_df, rho_wt=1.0, design_filter=False):
+    def doe_rejection_sampler(self, n_pts, pr, bound_df, rho_wt=1.0, design_filter=False,
+                              n_max=10000):
         """Return points sampled proportional to a custom DoE metric using 
         rejection sampling.
 
@@ -435,13 +645,13 @@ class GP:
         bound_df: Dataframe of variables and their upper/lower bound
         design_filter: Boolean determining whether or not to manually filter out
         designs for the sake of constructability of bearings (currently manual for TFP)
+        n_max: Number of uniform candidates drawn and scored in one batch
     
         Returns
         -------
         Array of n_pts sampled points proportional to (LOOCV) metric
         """
         import numpy as np
-        n_max = 10000
         n_var = bound_df.shape[1]
         
         min_list = [val for val in bound_df.loc['min']]
@@ -478,8 +688,8 @@ class GP:
         x_keep = x_var[u_var.ravel() < fx,:]
         '''
         
-        # evaluate the function at x
-        fx = np.apply_along_axis(self.fn_LOOCV_error, 1, x_var, bound_df, rho_wt)*-1
+        # evaluate the function at all x in one vectorized call
+        fx = self.fn_LOOCV_error(x_var, bound_df, rho_wt)*-1
         x_keep = x_var[u_var.ravel() < fx.ravel(),:]
         
         
@@ -636,16 +846,42 @@ class GP:
         return(-fs2 * Wx)
     
     
+    def loocv_error(self):
+        """Return squared LOOCV residuals of the training set (Kyprioti)
+        
+        Computed from the Cholesky factor of the fitted GPR and cached until
+        the GPR is refit.
+
+        Returns
+        -------
+        e_cv_sq: array of e^cv^2 for each training point
+        """
+        
+        import numpy as np
+        from scipy.linalg import solve_triangular
+        
+        gp_obj = self.gpr._final_estimator
+        if getattr(self, '_loocv_gp', None) is not gp_obj:
+            # diag(K^-1) is the column-wise squared norm of L^-1
+            L = gp_obj.L_
+            L_inv = solve_triangular(L, np.eye(L.shape[0]), lower=True)
+            K_inv_diag = np.einsum('ij,ij->j', L_inv, L_inv)
+            alpha_ = gp_obj.alpha_.flatten()
+            self.e_cv_sq = np.divide(alpha_, K_inv_diag)**2
+            self._loocv_gp = gp_obj
+        
+        return(self.e_cv_sq)
+    
     def fn_LOOCV_error(self, X_cand, bound_df, rho=1.0):
-        """Return point LOOCV error approximation for a given point
+        """Return LOOCV error approximation for one or many candidate points
         
         Parameters
         ----------
-        X_cand: np.array of candidate point
+        X_cand: np.array of candidate point, or (m x d) array of candidates
     
         Returns
         -------
-        x_next: e^cv^2 from Yi & Taflanidis paper
+        x_next: e^cv^2 from Yi & Taflanidis paper, one value per candidate
         """
         
         import numpy as np
@@ -657,7 +893,7 @@ class GP:
         
         # isotropic RBF, probably
         # use decaying distance metric
-        point = np.array([np.asarray(X_cand)])
+        point = np.atleast_2d(np.asarray(X_cand, dtype=float))
         from scipy.spatial.distance import cdist
         
         if len(gp_obj.kernel_.theta < 4):
@@ -666,14 +902,11 @@ class GP:
         else:
             lengthscale = gp_obj.kernel_.theta[1:5]
         
-        dist_list = cdist(point/lengthscale, X_train/lengthscale).flatten()
+        # (m x n) distances from each candidate to the training set
+        dist_list = cdist(point/lengthscale, X_train/lengthscale)
         
         # calculate LOOCV error of training set (Kyprioti)
-        L = gp_obj.L_
-        K_mat = L @ L.T
-        alpha_ = gp_obj.alpha_.flatten()
-        K_inv_diag = np.linalg.inv(K_mat).diagonal()
-        e_cv_sq = np.divide(alpha_, K_inv_diag)**2
+        e_cv_sq = self.loocv_error()
         
         '''
         # smoothing function, exponentially decaying
@@ -689,8 +922,8 @@ class GP:
         # aggregate LOOCV_error and distance
         # use LSE
         from scipy.special import logsumexp
-        denominator = logsumexp(-dist_list**2)
-        numerator = logsumexp(-dist_list**2, b=e_cv_sq)
+        denominator = logsumexp(-dist_list**2, axis=1)
+        numerator = logsumexp(-dist_list**2, b=e_cv_sq, axis=1)
         e_cv2_cand = np.exp(numerator - denominator)
         
         '''
@@ -711,11 +944,8 @@ class GP:
         warnings.resetwarnings()
         '''
         
-        # find predictive variance
-        if X_cand.ndim == 1:
-            X_df = np.array([X_cand])
-            
-        X_df = pd.DataFrame(X_df, columns=bound_df.columns)
+        # find predictive variance, all candidates in one call
+        X_df = pd.DataFrame(point, columns=bound_df.columns)
         
         fmu, fs1 = self.gpr.predict(X_df, return_std=True)
         fs2 = fs1**2
@@ -787,6 +1017,179 @@ class GP:
         e_cv2_cand = np.exp(numerator - denominator)
     '''
 
+# optimize the hyperparameters of a GPR/GPC from one starting log-theta
+# returns the optimized log-theta and its log marginal likelihood
+def fit_hyperparam_start(estimator, X, y, theta_start):
+    from sklearn.base import clone
+    
+    est = clone(estimator)
+    est.set_params(kernel=estimator.kernel.clone_with_theta(theta_start),
+                   n_restarts_optimizer=0)
+    est.fit(X, y)
+    return(est.kernel_.theta, est.log_marginal_likelihood_value_)
+
+# multi-start hyperparameter optimization with the starts run in a process
+# pool. Starts are the initial kernel, the warm start theta0 (if its size
+# matches) and log-uniform draws within the kernel bounds, n_restarts+1 in
+# total as in sklearn. The returned estimator is fit once more at the best
+# theta with the optimizer switched off
+def multistart_fit(estimator, X, y, theta0=None, n_jobs=1, n_restarts=None):
+    import numpy as np
+    from sklearn.base import clone
+    from concurrent.futures import ProcessPoolExecutor
+    
+    kernel = estimator.kernel
+    bounds = kernel.bounds
+    if n_restarts is None:
+        n_restarts = estimator.n_restarts_optimizer
+    
+    starts = [kernel.theta]
+    if theta0 is not None and len(theta0) == len(kernel.theta):
+        starts.append(np.clip(theta0, bounds[:,0], bounds[:,1]))
+    
+    rng = np.random.RandomState(estimator.random_state)
+    n_random = max(n_restarts + 1 - len(starts), 0)
+    starts += list(rng.uniform(bounds[:,0], bounds[:,1],
+                               size=(n_random, len(kernel.theta))))
+    
+    n_starts = len(starts)
+    if n_jobs == 1:
+        results = [fit_hyperparam_start(estimator, X, y, theta_start)
+                   for theta_start in starts]
+    else:
+        n_jobs = None if n_jobs == -1 else n_jobs
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(fit_hyperparam_start,
+                                    [estimator]*n_starts, [X]*n_starts,
+                                    [y]*n_starts, starts))
+    
+    lml_values = np.array([lml for theta, lml in results])
+    theta_best = results[int(np.argmax(lml_values))][0]
+    
+    best_est = clone(estimator)
+    best_est.set_params(kernel=kernel.clone_with_theta(theta_best),
+                        optimizer=None)
+    best_est.fit(X, y)
+    return(best_est)
+
+# screening surrogate of the Pelicun loss records (loss.loss_summary_header)
+# one GP per outcome, fit on a training split of a database's loss_data and
+# calibrated on the held out runs: the GP std is scaled so that the
+# mean +- z*std interval covers the requested fraction of the held out
+# residuals (split conformal). Costs and times are modeled in log1p space,
+# frequencies as is (clipped to [0, 1])
+class Loss_Surrogate:
+    
+    def __init__(self, covariate_list, 
+                 outcome_list=['cost_50%', 'time_u_50%', 'replacement_freq'],
+                 kernel_name='rbf_ard', coverage=0.9):
+        self.covariate_list = covariate_list
+        self.outcome_list = outcome_list
+        self.kernel_name = kernel_name
+        self.coverage = coverage
+    
+    # df: runs (covariates), loss_data: their loss records, same row order
+    # (as from Database.estimate_run_losses)
+    def fit(self, df, loss_data, calib_frac=0.2, backend='exact', n_jobs=1):
+        import numpy as np
+        from scipy.special import ndtri
+        from sklearn.model_selection import train_test_split
+        
+        X = df[self.covariate_list].reset_index(drop=True)
+        loss_data = loss_data.reset_index(drop=True)
+        
+        self.z_coverage = ndtri(0.5 + self.coverage/2)
+        self.models = {}
+        self.std_scale = {}
+        self.n_train = {}
+        for outcome in self.outcome_list:
+            y = self.transform(outcome, loss_data[outcome].to_numpy(dtype=float))
+            valid = np.isfinite(y)
+            
+            outcome_df = X[valid].copy()
+            outcome_df['y'] = y[valid]
+            df_train, df_calib = train_test_split(outcome_df, 
+                                                  test_size=calib_frac,
+                                                  random_state=985)
+            
+            mdl = GP(df_train)
+            mdl.set_covariates(self.covariate_list)
+            mdl.set_outcome('y')
+            mdl.fit_gpr(kernel_name=self.kernel_name, backend=backend,
+                        n_jobs=n_jobs)
+            
+            # calibration: quantile of the normalized held out residuals
+            y_hat, y_std = mdl.predict_gpr_chunked(df_calib[self.covariate_list])
+            resid = (np.abs(df_calib['y'].to_numpy() - np.ravel(y_hat)) / 
+                     np.maximum(np.ravel(y_std), 1e-12))
+            n_calib = len(resid)
+            q_level = min(np.ceil((n_calib + 1)*self.coverage)/n_calib, 1.0)
+            self.std_scale[outcome] = np.quantile(resid, q_level)/self.z_coverage
+            
+            self.models[outcome] = mdl
+            self.n_train[outcome] = len(df_train)
+        
+        return(self)
+    
+    def transform(self, outcome, y):
+        import numpy as np
+        if outcome.startswith('cost') or outcome.startswith('time'):
+            return(np.log1p(np.maximum(y, 0.0)))
+        return(y)
+    
+    def inverse_transform(self, outcome, y):
+        import numpy as np
+        if outcome.startswith('cost') or outcome.startswith('time'):
+            return(np.expm1(y))
+        if outcome.endswith('freq'):
+            return(np.clip(y, 0.0, 1.0))
+        return(y)
+    
+    # returns a DataFrame with, per outcome, the prediction and the bounds of
+    # the calibrated coverage interval (outcome, outcome_lower, outcome_upper)
+    # and the calibrated std in model space (outcome_std)
+    def predict(self, X, max_mem_mb=512):
+        import numpy as np
+        import pandas as pd
+        
+        X = X[self.covariate_list]
+        pred_df = pd.DataFrame(index=X.index)
+        for outcome in self.outcome_list:
+            y_hat, y_std = self.models[outcome].predict_gpr_chunked(
+                X, max_mem_mb=max_mem_mb)
+            y_hat = np.ravel(y_hat)
+            y_std = np.ravel(y_std)*self.std_scale[outcome]
+            half_width = self.z_coverage*y_std
+            pred_df[outcome] = self.inverse_transform(outcome, y_hat)
+            pred_df[outcome+'_lower'] = self.inverse_transform(outcome, 
+                                                               y_hat - half_width)
+            pred_df[outcome+'_upper'] = self.inverse_transform(outcome, 
+                                                               y_hat + half_width)
+            pred_df[outcome+'_std'] = y_std
+        return(pred_df)
+    
+    # thresholds: {outcome: decision threshold}
+    # a point is near a decision boundary if any threshold lies inside the
+    # calibrated interval of its outcome
+    def near_boundary(self, pred_df, thresholds):
+        import numpy as np
+        
+        near = np.zeros(len(pred_df), dtype=bool)
+        for outcome, threshold in thresholds.items():
+            near |= ((pred_df[outcome+'_lower'].to_numpy() <= threshold) &
+                     (pred_df[outcome+'_upper'].to_numpy() >= threshold))
+        return(near)
+    
+    def save(self, path):
+        import pickle
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+def load_loss_surrogate(path):
+    import pickle
+    with open(path, 'rb') as f:
+        return(pickle.load(f))
+
 # def logsumexp(x, a=None):
 #     import numpy as np
 #     c = x.max()
@@ -160,155 +160,907 @@ def prepare_results(output_path, design, T_1, Tfb, run_status):
     return(final_series)
     
 def collapse_fragility(run, drift_at_mu_plus_std=0.1):
-    system = run.superstructure_system
     peak_drift = max(run.PID)
-    n_stories = run.num_stories
+    collapse_prob, log_collapse_prob = collapse_fragility_arrays(
+        peak_drift, run.superstructure_system, run.num_stories,
+        drift_at_mu_plus_std=drift_at_mu_plus_std)
     
-    # collapse as a probability
-    from math import log, exp
-    from scipy.stats import lognorm
-    from scipy.stats import norm
+    return(peak_drift, float(collapse_prob))
+
+# lognormal drift collapse fragility of many runs at once
+# peak_drift, system and n_stories are arrays (or scalars) of the same length
+# returns collapse_prob and log_collapse_prob (log_ndtr, finite even where
+# collapse_prob underflows to 0)
+def collapse_fragility_arrays(peak_drift, system, n_stories, 
+                              drift_at_mu_plus_std=0.1):
+    import numpy as np
+    from scipy.special import ndtr, ndtri, log_ndtr
+    
+    peak_drift = np.asarray(peak_drift, dtype=float)
+    is_MF = np.asarray(system) == 'MF'
+    n_stories = np.asarray(n_stories)
     
     # TODO: change this for taller buildings
-    # MF: set 84% collapse at 0.10 drift, 0.25 beta
-    if system == 'MF':
-        inv_norm = norm.ppf(0.84)
-        if n_stories < 4:
-            beta_drift = 0.25
-        else:
-            beta_drift = 0.35
-        mean_log_drift = exp(log(drift_at_mu_plus_std) - beta_drift*inv_norm) 
-        
+    # MF: set 84% collapse at drift_at_mu_plus_std, 0.25 beta (0.35 for 4+
+    # stories)
     # CBF: set 90% collapse at 0.05 drift, 0.55 beta
-    else:
-        inv_norm = norm.ppf(0.90)
-        beta_drift = 0.55
-        mean_log_drift = exp(log(0.05) - beta_drift*inv_norm) 
-        
-    ln_dist = lognorm(s=beta_drift, scale=mean_log_drift)
-    collapse_prob = ln_dist.cdf(peak_drift)
+    beta_drift = np.where(is_MF, np.where(n_stories < 4, 0.25, 0.35), 0.55)
+    ref_drift = np.where(is_MF, drift_at_mu_plus_std, 0.05)
+    ref_prob = np.where(is_MF, 0.84, 0.90)
+    
+    # standard normal variate of the peak drift, ln(drift/median)/beta
+    with np.errstate(divide='ignore'):
+        z_drift = (np.log(peak_drift) - np.log(ref_drift))/beta_drift + ndtri(ref_prob)
+    
+    return(ndtr(z_drift), log_ndtr(z_drift))
+
+# max_drift, collapse_prob and log_collapse_prob of every run of df
+# (needs the PID, superstructure_system and num_stories columns)
+def collapse_fragility_df(df, drift_at_mu_plus_std=0.1):
+    import numpy as np
+    import pandas as pd
+    
+    max_drift = np.array([np.max(run_PID) for run_PID in df['PID']], 
+                         dtype=float)
+    collapse_prob, log_collapse_prob = collapse_fragility_arrays(
+        max_drift, df['superstructure_system'].to_numpy(), 
+        df['num_stories'].to_numpy(), 
+        drift_at_mu_plus_std=drift_at_mu_plus_std)
     
-    return(peak_drift, collapse_prob)
+    return(pd.DataFrame({'max_drift': max_drift, 
+                         'collapse_prob': collapse_prob,
+                         'log_collapse_prob': log_collapse_prob},
+                        index=df.index))
     
 # TODO: run pushover
 
-# run the experiment, GM name and scale factor must be baked into design
+# peak resident memory of the process over its whole lifetime so far, in MB
+# (nan if it cannot be queried). This is a high-water mark, not the usage of
+# one run: later runs in the same session report at least the largest earlier
+# peak
+def process_peak_memory_mb():
+    try:
+        import resource
+        import sys
+        
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        
+        # linux reports kB, macOS reports bytes
+        if sys.platform == 'darwin':
+            return(peak/1024**2)
+        return(peak/1024)
+    except ImportError:
+        pass
+    
+    # resource is unavailable on Windows, fall back to psutil if present
+    try:
+        import psutil
+        mem_info = psutil.Process().memory_info()
+        return(getattr(mem_info, 'peak_wset', mem_info.rss)/1024**2)
+    except ImportError:
+        return(float('nan'))
 
-def run_nlth(design, 
-             gm_path='../resource/ground_motions/PEERNGARecords_Unscaled/',
-             output_path='./outputs/'):
+# build the model, apply gravity, get periods and damp, then run the ground motion
+# returns the building object, periods, run status, and timing of each stage
+def build_and_run(design, dt_transient, convergence_mode=False,
+                  gm_path='../resource/ground_motions/PEERNGARecords_Unscaled/',
+                  output_path='./outputs/', analysis_profile=None):
     
+    import time
     from building import Building
     
     # generate the building, construct model
+    t0 = time.time()
     bldg = Building(design)
-    bldg.model_frame()
+    bldg.model_frame(convergence_mode=convergence_mode)
+    build_time = time.time() - t0
     
     # apply gravity loads, perform eigenvalue analysis, add damping
+    t0 = time.time()
     bldg.apply_grav_load()
+    gravity_time = time.time() - t0
+    
+    t0 = time.time()
     T_1 = bldg.run_eigen()
     Tfb = bldg.provide_damping(80, method='SP',
                                zeta=[0.05], modes=[1])
+    eigen_time = time.time() - t0
+    
+    # run ground motion
+    run_status = bldg.run_ground_motion(design['gm_selected'], 
+                                        design['scale_factor'], 
+                                        dt_transient,
+                                        gm_dir=gm_path,
+                                        data_dir=output_path,
+                                        analysis_profile=analysis_profile)
+    
+    timings = {'build_time': build_time,
+               'gravity_time': gravity_time,
+               'eigen_time': eigen_time}
+    
+    return(bldg, T_1, Tfb, run_status, timings)
+
+# run the experiment, GM name and scale factor must be baked into design
+
+# analysis_profile: name (see building.analysis_profiles) or dict of OpenSees
+# analysis settings; None uses the default profile of the superstructure system
+def run_nlth(design, 
+             gm_path='../resource/ground_motions/PEERNGARecords_Unscaled/',
+             output_path='./outputs/', analysis_profile=None):
+    
+    import time
+    t_start = time.time()
+    n_attempts = 1
     
     # run ground motion
-    if bldg.superstructure_system == 'MF':
+    if design['superstructure_system'] == 'MF':
         dt_default = 0.005
     else:
         dt_default = 0.005
-    run_status = bldg.run_ground_motion(design['gm_selected'], 
-                                   design['scale_factor'], 
-                                   dt_default,
-                                   gm_dir=gm_path,
-                                   data_dir=output_path)
+        
+    bldg, T_1, Tfb, run_status, timings = build_and_run(
+        design, dt_default, gm_path=gm_path, output_path=output_path,
+        analysis_profile=analysis_profile)
     
     # lower dt if convergence issues
     if run_status != 0:
+        n_attempts += 1
         if bldg.superstructure_system == 'MF':
             print('Lowering time step...')
             
-            bldg = Building(design)
-            bldg.model_frame()
-            
-            # apply gravity loads, perform eigenvalue analysis, add damping
-            bldg.apply_grav_load()
-            T_1 = bldg.run_eigen()
-            Tfb = bldg.provide_damping(80, method='SP',
-                                       zeta=[0.05], modes=[1])
-            
-            run_status = bldg.run_ground_motion(design['gm_selected'], 
-                                                design['scale_factor'], 
-                                                0.001,
-                                                gm_dir=gm_path,
-                                                data_dir=output_path)
+            bldg, T_1, Tfb, run_status, timings = build_and_run(
+                design, 0.001, gm_path=gm_path, output_path=output_path,
+                analysis_profile=analysis_profile)
         else:
             # print('Cutting time did not work.')
             print('Lowering time step and convergence mode CBF...')
             
-            bldg = Building(design)
-            bldg.model_frame(convergence_mode=True)
-            
-            # apply gravity loads, perform eigenvalue analysis, add damping
-            bldg.apply_grav_load()
-            T_1 = bldg.run_eigen()
-            Tfb = bldg.provide_damping(80, method='SP',
-                                        zeta=[0.05], modes=[1])
-            
-            run_status = bldg.run_ground_motion(design['gm_selected'], 
-                                                design['scale_factor'], 
-                                                0.001,
-                                                gm_dir=gm_path,
-                                                data_dir=output_path)
+            bldg, T_1, Tfb, run_status, timings = build_and_run(
+                design, 0.001, convergence_mode=True, 
+                gm_path=gm_path, output_path=output_path,
+                analysis_profile=analysis_profile)
         
     # CBF if still no converge, give up
     if run_status != 0:
         if bldg.superstructure_system == 'MF':
             print('Lowering time step one last time...')
+            n_attempts += 1
             
-            bldg = Building(design)
-            bldg.model_frame()
-            
-            # apply gravity loads, perform eigenvalue analysis, add damping
-            bldg.apply_grav_load()
-            T_1 = bldg.run_eigen()
-            Tfb = bldg.provide_damping(80, method='SP',
-                                       zeta=[0.05], modes=[1])
-            
-            run_status = bldg.run_ground_motion(design['gm_selected'], 
-                                                design['scale_factor'], 
-                                                0.0005,
-                                                gm_dir=gm_path,
-                                                data_dir=output_path)
+            bldg, T_1, Tfb, run_status, timings = build_and_run(
+                design, 0.0005, gm_path=gm_path, output_path=output_path,
+                analysis_profile=analysis_profile)
         else:
             print('CBF did not converge ...')
             
-            # bldg = Building(design)
-            # bldg.model_frame(convergence_mode=True)
-            
-            # # apply gravity loads, perform eigenvalue analysis, add damping
-            # bldg.apply_grav_load()
-            # T_1 = bldg.run_eigen()
-            # Tfb = bldg.provide_damping(80, method='SP',
-            #                             zeta=[0.05], modes=[1])
+            # bldg, T_1, Tfb, run_status, timings = build_and_run(
+            #     design, 0.0005, convergence_mode=True, 
+            #     gm_path=gm_path, output_path=output_path,
+            #     analysis_profile=analysis_profile)
             
-            # run_status = bldg.run_ground_motion(design['gm_selected'], 
-            #                                     design['scale_factor'], 
-            #                                     0.0005,
-            #                                     gm_dir=gm_path,
-            #                                     data_dir=output_path)
     if run_status != 0:
         print('Recording run and moving on.')
-       
+    
+    total_run_time = time.time() - t_start
+    
     # add a little delay to prevent weird overwriting
-    import time
     time.sleep(3)
     
     results_series = prepare_results(output_path, design, T_1, Tfb, run_status)
+    
+    # attach performance metadata of the final (reported) attempt
+    import pandas as pd
+    perf_dict = dict(timings)
+    perf_dict.update(bldg.run_stats)
+    perf_dict['n_attempts'] = n_attempts
+    perf_dict['total_run_time'] = total_run_time
+    # process-wide high-water mark at the end of this run (see
+    # process_peak_memory_mb), not the memory used by this run alone
+    perf_dict['process_peak_memory_mb'] = process_peak_memory_mb()
+    
+    results_series = pd.concat([results_series, pd.Series(perf_dict)])
     return(results_series)
     
 
+# run each design under each analysis profile and tabulate runtime and convergence
+def benchmark_profiles(designs, profiles,
+                       gm_path='../resource/ground_motions/PEERNGARecords_Unscaled/',
+                       output_path='./outputs/'):
+    
+    import pandas as pd
+    
+    bench_rows = []
+    for design_idx, design in designs.iterrows():
+        for profile in profiles:
+            print('========= Benchmark: %s design %s, profile %s ==========' %
+                  (design['superstructure_system'], str(design_idx), str(profile)))
+            
+            result = run_nlth(design, gm_path=gm_path, output_path=output_path,
+                              analysis_profile=profile)
+            
+            bench_rows.append({
+                'design': design_idx,
+                'superstructure_system': design['superstructure_system'],
+                'num_stories': design['num_stories'],
+                'profile': result['analysis_profile'],
+                'run_status': result['run_status'],
+                'n_attempts': result['n_attempts'],
+                'dt_final': result['dt_final'],
+                'n_steps': result['n_steps'],
+                'n_failed_steps': result['n_failed_steps'],
+                'transient_time': result['transient_time'],
+                'total_run_time': result['total_run_time'],
+                'max_drift': max(result['PID'])
+                })
+            
+    bench_df = pd.DataFrame(bench_rows)
+    
+    # runtime relative to the default profile of each design's system
+    default_time = bench_df.loc[
+        bench_df['profile'] == bench_df['superstructure_system']].set_index(
+            'design')['total_run_time']
+    bench_df['speedup'] = (bench_df['design'].map(default_time) / 
+                           bench_df['total_run_time'])
+    
+    return(bench_df)
+
+# design a requested DoE point on top of pregenerated params, trying the
+# candidate designs in order until one gives feasible bearings and frame
+# returns the designed one-row DataFrame (None if all fail) and candidates used
+def design_doe_point(next_row, candidate_designs):
+    
+    import pandas as pd
+    import design as ds
+    from loads import define_lateral_forces, define_gravity_loads
+    from gms import scale_ground_motion
+    
+    n_used = 0
+    for cand_idx in candidate_designs.index:
+        n_used += 1
+        
+        work_df = candidate_designs.loc[[cand_idx]].copy()
+        
+        row_df = pd.DataFrame(next_row).T
+        work_df = pd.concat([work_df, row_df.set_index(work_df.index)], 
+                            axis=1)
+        
+        work_df['T_m'] = work_df['T_fbe']*work_df['T_ratio']
+        work_df['moat_ampli'] = work_df['gap_ratio']
+        
+        # design
+        work_df[['W', 
+               'W_s', 
+               'w_fl', 
+               'P_lc',
+               'all_w_cases',
+               'all_Plc_cases']] = work_df.apply(lambda row: define_gravity_loads(row),
+                                                axis='columns', result_type='expand')
+                     
+        try:
+            all_tfp_designs = work_df.apply(lambda row: ds.design_TFP(row),
+                                           axis='columns', result_type='expand')
+        except:
+            continue
+        
+        all_tfp_designs.columns = ['mu_1', 'mu_2', 'R_1', 'R_2', 
+                                   'T_e', 'k_e', 'zeta_e', 'D_m']
+        
+        tfp_designs = all_tfp_designs.loc[(all_tfp_designs['R_1'] >= 10.0) &
+                                          (all_tfp_designs['R_1'] <= 50.0) &
+                                          (all_tfp_designs['R_2'] <= 190.0) &
+                                          (all_tfp_designs['zeta_e'] <= 0.27)]
+        
+        # retry if design didn't work
+        if tfp_designs.shape[0] == 0:
+            continue
+        
+        tfp_designs = tfp_designs.drop(columns=['zeta_e'])
+        work_df = pd.concat([work_df, tfp_designs.set_index(work_df.index)], 
+                            axis=1)
+        
+        # get lateral force and design structures
+        work_df[['wx', 
+               'hx', 
+               'h_col', 
+               'hsx', 
+               'Fx', 
+               'Vs',
+               'T_fbe']] = work_df.apply(lambda row: define_lateral_forces(row),
+                                    axis='columns', result_type='expand')
+                                          
+        all_mf_designs = work_df.apply(lambda row: ds.design_MF(row),
+                                         axis='columns', 
+                                         result_type='expand')
+          
+        all_mf_designs.columns = ['beam', 'column', 'flag']
+        
+        # keep the designs that look sensible
+        mf_designs = all_mf_designs.loc[all_mf_designs['flag'] == False]
+        mf_designs = mf_designs.dropna(subset=['beam','column'])
+        mf_designs = mf_designs.drop(['flag'], axis=1)
+        
+        if mf_designs.shape[0] == 0:
+            continue
+      
+        # get the design params of those bearings
+        work_df = pd.concat([work_df, mf_designs.set_index(work_df.index)], 
+                            axis=1)
+        
+        work_df[['gm_selected',
+                 'scale_factor',
+                 'sa_avg']] = work_df.apply(lambda row: scale_ground_motion(row),
+                                            axis='columns', result_type='expand')
+        
+        return(work_df, n_used)
+    
+    return(None, n_used)
+
+# design, scale and analyze one DoE point; module level so it can run in a
+# worker process. returns the result row (None if no candidate could be
+# designed) and the number of candidates used
+# predesigned=True skips the design step and analyzes the first candidate
+def run_doe_point(next_row, candidate_designs,
+                  gm_path='../resource/ground_motions/PEERNGARecords_Unscaled/',
+                  output_path='./outputs/', seed=None, predesigned=False):
+    
+    import pandas as pd
+    import numpy as np
+    
+    # workers inherit the parent's RNG state, reseed so GM selection differs
+    if seed is not None:
+        import random
+        np.random.seed(seed)
+        random.seed(seed)
+        
+    if predesigned:
+        work_df, n_used = candidate_designs.head(1).copy(), 1
+    else:
+        work_df, n_used = design_doe_point(next_row, candidate_designs)
+    if work_df is None:
+        return(None, n_used)
+    
+    # TODO: we cannot have the exact T_ratio and gap_ratio as DOE called for
+    # gap ratio is affected by a stochastic gm_sa_tm
+    # T_ratio is affected by the fact that the true Tfb is not the estimated Tfb
+    
+    # drop the "called-for" values and record the "as constructed" values
+    
+    work_df = work_df.drop(columns=['gap_ratio', 'T_ratio'])
+    bldg_result = run_nlth(work_df.iloc[0], gm_path, output_path=output_path)
+    result_df = pd.DataFrame(bldg_result).T
+    
+    result_df[['max_drift', 'collapse_prob', 
+               'log_collapse_prob']] = collapse_fragility_df(result_df)
+    
+    return(result_df, n_used)
+
+# design and analyze all requested points of a DoE batch
+# n_workers > 1 runs the points in separate processes, each handed n_spare
+# pregen candidates (unused ones are returned to the pool); points whose
+# candidates all fail are retried with fresh candidates
+# with a design_pool (see build_doe_design_pool), each point is instead matched
+# to its nearest unused feasible pre-designed building
+# returns the list of result rows and the remaining pregen designs
+def run_doe_batch(next_df, pregen_designs,
+                  gm_path='../resource/ground_motions/PEERNGARecords_Unscaled/',
+                  output_path='./outputs/', n_workers=1, n_spare=3,
+                  design_pool=None):
+    
+    import pandas as pd
+    import numpy as np
+    
+    predesigned = design_pool is not None
+    
+    # candidates for one point, None if the pool is exhausted
+    def draw_candidates(next_row, n_draw):
+        nonlocal pregen_designs
+        if predesigned:
+            return(match_pool_design(next_row, design_pool))
+        
+        candidates = pregen_designs.head(n_draw)
+        if candidates.shape[0] == 0:
+            return(None)
+        pregen_designs = pregen_designs.iloc[candidates.shape[0]:]
+        return(candidates)
+    
+    batch_results = []
+    
+    if n_workers <= 1:
+        for idx, next_row in next_df.iterrows():
+            
+            print('========= Run %d of DoE batch ==========' % 
+                  (len(batch_results)+1))
+            
+            candidates = draw_candidates(next_row, pregen_designs.shape[0])
+            if candidates is None:
+                break
+            
+            result_df, n_used = run_doe_point(next_row, candidates, gm_path,
+                                              output_path=output_path,
+                                              predesigned=predesigned)
+            if not predesigned:
+                pregen_designs = pd.concat([candidates.iloc[n_used:], 
+                                            pregen_designs], axis=0)
+            
+            if result_df is None:
+                break
+            batch_results.append(result_df)
+            
+        return(batch_results, pregen_designs)
+    
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+    
+    pending = [next_row for idx, next_row in next_df.iterrows()]
+    
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        while len(pending) > 0:
+            
+            print('========= Dispatching %d DoE runs to %d workers ==========' % 
+                  (len(pending), n_workers))
+            
+            # each point gets its own candidates and its own output folder
+            jobs = []
+            for slot, next_row in enumerate(pending):
+                candidates = draw_candidates(next_row, n_spare)
+                if candidates is None:
+                    break
+                
+                worker_path = output_path+'doe_worker_'+str(slot)+'/'
+                os.makedirs(worker_path, exist_ok=True)
+                
+                future = executor.submit(run_doe_point, next_row, candidates,
+                                         gm_path, worker_path,
+                                         np.random.randint(2**31-1),
+                                         predesigned)
+                jobs.append((future, next_row, candidates))
+            
+            # nothing left to draw from
+            if len(jobs) == 0:
+                break
+                
+            failed = [next_row for next_row in pending[len(jobs):]]
+            returned = []
+            for future, next_row, candidates in jobs:
+                try:
+                    result_df, n_used = future.result()
+                except Exception as err:
+                    print('DoE run failed in worker: %s' % err)
+                    result_df, n_used = None, candidates.shape[0]
+                
+                if not predesigned:
+                    returned.append(candidates.iloc[n_used:])
+                if result_df is None:
+                    failed.append(next_row)
+                else:
+                    batch_results.append(result_df)
+            
+            # give back untouched candidates before drawing replacements
+            pregen_designs = pd.concat(returned+[pregen_designs], axis=0)
+            pending = failed
+            
+    return(batch_results, pregen_designs)
+
+# pregenerated MF-TFP designs (without DoE covariates) that requested DoE
+# points are designed on top of
+def prepare_doe_pool(maxIter, covariate_columns, buffer=4):
+    
+    from db import Database
+    from loads import estimate_period
+    
+    doe_reserve_db = Database(maxIter, n_buffer=buffer, seed=131, 
+                        struct_sys_list=['MF'], isol_wts=[1, 0])
+    
+    # drop covariates 
+    reserve_df = doe_reserve_db.raw_input
+    reserve_df = reserve_df.drop(columns=['T_m', 'moat_ampli'])
+    pregen_designs = reserve_df.drop(columns=[col for col in reserve_df 
+                                              if col in covariate_columns])
+    
+    pregen_designs['T_fbe'] = pregen_designs.apply(lambda row: estimate_period(row),
+                                                     axis='columns', result_type='expand')
+    return(pregen_designs)
+
+# design the whole reserve set up front, each row at DoE covariates drawn
+# uniformly within sample_bounds. the feasibility map records which design
+# stage every reserve row passed; feasible designs are indexed in a KD-tree of
+# covariates normalized by the bound ranges for nearest-neighbor matching
+def build_doe_design_pool(pregen_designs, sample_bounds, seed=131):
+    
+    import time
+    import numpy as np
+    import pandas as pd
+    from scipy.spatial import cKDTree
+    import design as ds
+    from loads import define_lateral_forces, define_gravity_loads
+    from gms import scale_ground_motion
+    
+    t0 = time.time()
+    covariate_columns = list(sample_bounds.columns)
+    
+    pool_df = pregen_designs.copy()
+    rng = np.random.default_rng(seed)
+    for col in covariate_columns:
+        pool_df[col] = rng.uniform(sample_bounds.loc['min', col], 
+                                   sample_bounds.loc['max', col],
+                                   pool_df.shape[0])
+    
+    pool_df['T_m'] = pool_df['T_fbe']*pool_df['T_ratio']
+    pool_df['moat_ampli'] = pool_df['gap_ratio']
+    
+    pool_df[['W', 
+           'W_s', 
+           'w_fl', 
+           'P_lc',
+           'all_w_cases',
+           'all_Plc_cases']] = pool_df.apply(lambda row: define_gravity_loads(row),
+                                            axis='columns', result_type='expand')
+    
+    # a failed bearing design only removes its own row
+    def try_design_TFP(row):
+        try:
+            return(ds.design_TFP(row))
+        except:
+            return([np.nan]*8)
+    
+    all_tfp_designs = pool_df.apply(try_design_TFP, axis='columns', 
+                                    result_type='expand')
+    all_tfp_designs.columns = ['mu_1', 'mu_2', 'R_1', 'R_2', 
+                               'T_e', 'k_e', 'zeta_e', 'D_m']
+    
+    tfp_ok = ((all_tfp_designs['R_1'] >= 10.0) &
+              (all_tfp_designs['R_1'] <= 50.0) &
+              (all_tfp_designs['R_2'] <= 190.0) &
+              (all_tfp_designs['zeta_e'] <= 0.27))
+    
+    feasibility = pd.DataFrame({'tfp_ok': tfp_ok, 'mf_ok': False}, 
+                               index=pool_df.index)
+    
+    tfp_designs = all_tfp_designs.loc[tfp_ok].drop(columns=['zeta_e'])
+    designed_df = pd.concat([pool_df.loc[tfp_ok], tfp_designs], axis=1)
+    
+    # get lateral force and design structures
+    designed_df[['wx', 
+                 'hx', 
+                 'h_col', 
+                 'hsx', 
+                 'Fx', 
+                 'Vs',
+                 'T_fbe']] = designed_df.apply(lambda row: define_lateral_forces(row),
+                                               axis='columns', result_type='expand')
+                                              
+    all_mf_designs = designed_df.apply(lambda row: ds.design_MF(row),
+                                       axis='columns', 
+                                       result_type='expand')
+    all_mf_designs.columns = ['beam', 'column', 'flag']
+    
+    mf_ok = ((all_mf_designs['flag'] == False) & 
+             all_mf_designs['beam'].notna() & all_mf_designs['column'].notna())
+    feasibility.loc[mf_ok[mf_ok].index, 'mf_ok'] = True
+    feasibility['feasible'] = feasibility['tfp_ok'] & feasibility['mf_ok']
+    
+    mf_designs = all_mf_designs.loc[mf_ok].drop(columns=['flag'])
+    designed_df = pd.concat([designed_df.loc[mf_ok], mf_designs], axis=1)
+    
+    designed_df[['gm_selected',
+                 'scale_factor',
+                 'sa_avg']] = designed_df.apply(lambda row: scale_ground_motion(row),
+                                                axis='columns', result_type='expand')
+    
+    lower = sample_bounds.loc['min', covariate_columns].to_numpy(dtype=float)
+    span = (sample_bounds.loc['max', covariate_columns].to_numpy(dtype=float) - 
+            lower)
+    X_pool = (designed_df[covariate_columns].to_numpy(dtype=float) - lower)/span
+    
+    print('Design pool: %d of %d reserve designs feasible in %.2f s' %
+          (designed_df.shape[0], pool_df.shape[0], time.time() - t0))
+    
+    design_pool = {'designs': designed_df,
+                   'feasibility': feasibility,
+                   'tree': cKDTree(X_pool),
+                   'used': np.zeros(designed_df.shape[0], dtype=bool),
+                   'lower': lower,
+                   'span': span,
+                   'covariates': covariate_columns}
+    return(design_pool)
+
+# nearest unused feasible design of the pool to a requested DoE point, marked
+# as used; None if the pool is exhausted
+def match_pool_design(next_row, design_pool):
+    
+    import numpy as np
+    
+    used = design_pool['used']
+    n_used = int(used.sum())
+    if n_used == used.shape[0]:
+        return(None)
+    
+    point = ((next_row[design_pool['covariates']].to_numpy(dtype=float) - 
+              design_pool['lower'])/design_pool['span'])
+    
+    # the n_used+1 nearest neighbors always contain an unused design
+    dist, nbr_idx = design_pool['tree'].query(point, k=n_used+1)
+    for idx in np.atleast_1d(nbr_idx):
+        if not used[idx]:
+            used[idx] = True
+            return(design_pool['designs'].iloc[[idx]])
+
+# test set RMSE/MAE and training LOOCV error of the DoE GP
+def doe_error_metrics(mdl, test_set, outcome):
+    
+    import numpy as np
+    from sklearn.metrics import mean_squared_error, mean_absolute_error
+    
+    y_hat = mdl.gpr.predict(test_set.X)
+    
+    print('===== Training model size:', mdl.X.shape[0], '=====')
+    mse = mean_squared_error(test_set.y, y_hat)
+    
+    # SOURCE: Yi & Taflanidis (2023)
+    e_cv_sq = mdl.loocv_error()
+    NRMSE_cv = ((np.sum(e_cv_sq)/len(e_cv_sq))**0.5/
+                (max(mdl.y[outcome]) - min(mdl.y[outcome])))
+    
+    # nrmse = rmse/(max(mdl.y[outcome]) - min(mdl.y[outcome]))
+    print('Test set NRMSE_cv: %.3f' % NRMSE_cv)
+    
+    rmse = mse**0.5
+    print('Test set RMSE: %.3f' % rmse)
+
+    mae = mean_absolute_error(test_set.y, y_hat)
+    print('Test set MAE: %.3f' % mae)
+    
+    return(rmse, mae, NRMSE_cv)
+
+# asynchronous DoE: n_workers NLTH runs are always in flight. Each finished run
+# updates the GP right away (full refit every batch_size*refit_every runs or on
+# likelihood drift) and a new point is dispatched immediately. Points still
+# running are fantasized into the GP when choosing the next one:
+#   fantasy='believer': pending outcome is the GP mean (kriging believer)
+#   fantasy='liar': pending outcome is the mean observed outcome (constant liar)
+# convergence is checked every batch_size finished runs, as in run_doe
+def run_doe_async(prob_target, df_train, df_test, sample_bounds=None,
+                  n_workers=4, batch_size=10, error_tol=0.15, maxIter=1000,
+                  conv_tol=1e-2, kernel='rbf_iso', doe_strat='balanced',
+                  refit_every=1, lml_drift_tol=0.1, fantasy='believer',
+                  n_spare=3, output_path='./outputs/', use_design_pool=False,
+                  fit_jobs=1):
+    
+    import os
+    import copy
+    import random
+    import numpy as np
+    import pandas as pd
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    from doe import GP
+    
+    if fantasy not in ['believer', 'liar']:
+        raise ValueError('Unknown fantasy strategy: %s. Use believer or liar.' 
+                         % fantasy)
+    
+    gm_path='../resource/ground_motions/PEERNGARecords_Unscaled/'
+    
+    np.random.seed(986)
+    random.seed(986)
+    
+    # set bounds for DoE
+    if sample_bounds is None:
+        sample_bounds = pd.DataFrame({'gap_ratio': [0.5, 2.0],
+                                      'RI': [0.5, 2.25],
+                                      'T_ratio': [2.0, 5.0],
+                                      'zeta_e': [0.10, 0.25]}, index=['min', 'max'])
+        covariate_columns = ['gap_ratio', 'RI', 'T_ratio', 'zeta_e']
+    else:
+        covariate_columns = sample_bounds.columns
+    
+    outcome = 'collapse_prob'
+    
+    test_set = GP(df_test)
+    test_set.set_covariates(covariate_columns)
+    test_set.set_outcome(outcome)
+    
+    pregen_designs = prepare_doe_pool(maxIter, covariate_columns)
+    
+    if use_design_pool:
+        design_pool = build_doe_design_pool(pregen_designs, sample_bounds)
+    else:
+        design_pool = None
+    
+    if doe_strat == 'balanced':
+        rho_list = [1.0, 1.0, 1.0, 1.0, 1.0]
+    elif doe_strat == 'exploit':
+        rho_list = [10.0, 5.0, 1.0, 0.5, 0.0]
+    elif doe_strat == 'explore':
+        rho_list = [1.0, 1.0, 1.0, 0.0, 0.0]
+    
+    rmse_list = []
+    mae_list = []
+    nrmse_list = []
+    
+    # kernel log-theta of each fit, last column is the fit time in seconds
+    if kernel == 'rbf_iso':
+        hyperparam_list = np.empty((0,4), float)
+    else:
+        hyperparam_list = np.empty((0,7), float)
+    
+    # refits are warm-started from the previous hyperparameters
+    def fit_model(df, prev_mdl=None):
+        theta_prev = None
+        if prev_mdl is not None:
+            theta_prev = prev_mdl.gpr._final_estimator.kernel_.theta
+        model = GP(df)
+        model.set_outcome(outcome)
+        model.set_covariates(covariate_columns)
+        model.fit_gpr(kernel_name=kernel, n_jobs=fit_jobs, theta0=theta_prev)
+        return(model)
+    
+    mdl = fit_model(df_train)
+    rmse, mae, NRMSE_cv = doe_error_metrics(mdl, test_set, outcome)
+    
+    # choose the next point with the in-flight points fantasized into the GP
+    def select_point(pending_rows, rho):
+        fantasy_mdl = mdl
+        if len(pending_rows) > 0:
+            pending_df = pd.DataFrame(pending_rows)[covariate_columns].astype(float)
+            if fantasy == 'believer':
+                pending_df[outcome] = np.ravel(mdl.gpr.predict(pending_df))
+            else:
+                pending_df[outcome] = mdl.y[outcome].mean()
+            fantasy_mdl = copy.deepcopy(mdl)
+            fantasy_mdl.update_gpr(pending_df)
+            
+        x_next = fantasy_mdl.doe_rejection_sampler(1, prob_target, sample_bounds,
+                                                   rho_wt=rho, design_filter=True)
+        return(pd.Series(x_next[0], index=covariate_columns))
+    
+    in_flight = {}
+    free_slots = list(range(n_workers))
+    retry_rows = []
+    n_dispatched = 0
+    n_completed = 0
+    converged = False
+    pool_exhausted = False
+    
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        while True:
+            
+            # keep every worker busy with a point
+            while ((not converged) and (len(free_slots) > 0) and 
+                   (n_dispatched < maxIter) and (not pool_exhausted)):
+                
+                if len(retry_rows) > 0:
+                    next_row = retry_rows.pop(0)
+                else:
+                    pending_rows = [job[0] for job in in_flight.values()]
+                    rho = rho_list[n_dispatched % len(rho_list)]
+                    next_row = select_point(pending_rows, rho)
+                
+                if design_pool is not None:
+                    candidates = match_pool_design(next_row, design_pool)
+                else:
+                    candidates = pregen_designs.head(n_spare)
+                    pregen_designs = pregen_designs.iloc[candidates.shape[0]:]
+                    if candidates.shape[0] == 0:
+                        candidates = None
+                        
+                if candidates is None:
+                    pool_exhausted = True
+                    break
+                
+                slot = free_slots.pop(0)
+                worker_path = output_path+'doe_worker_'+str(slot)+'/'
+                os.makedirs(worker_path, exist_ok=True)
+                
+                future = executor.submit(run_doe_point, next_row, candidates,
+                                         gm_path, worker_path,
+                                         np.random.randint(2**31-1),
+                                         design_pool is not None)
+                in_flight[future] = (next_row, candidates, slot)
+                n_dispatched += 1
+                print('========= Dispatched DoE run %d to worker %d ==========' % 
+                      (n_dispatched, slot))
+            
+            if len(in_flight) == 0:
+                break
+            
+            done, not_done = wait(list(in_flight.keys()), 
+                                  return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                next_row, candidates, slot = in_flight.pop(future)
+                free_slots.append(slot)
+                
+                try:
+                    result_df, n_used = future.result()
+                except Exception as err:
+                    print('DoE run failed in worker: %s' % err)
+                    result_df, n_used = None, candidates.shape[0]
+                
+                if design_pool is None:
+                    pregen_designs = pd.concat([candidates.iloc[n_used:], 
+                                                pregen_designs], axis=0)
+                    pool_exhausted = pregen_designs.shape[0] == 0
+                
+                # redispatch failed points with fresh candidates
+                if result_df is None:
+                    retry_rows.append(next_row)
+                    n_dispatched -= 1
+                    continue
+                
+                df_train = pd.concat([df_train, result_df], axis=0)
+                n_completed += 1
+                
+                # refit periodically, otherwise grow the GP in place
+                if n_completed % (batch_size*refit_every) == 0:
+                    mdl = fit_model(df_train, mdl)
+                else:
+                    lml_drift = mdl.update_gpr(df_train.iloc[mdl.k:])
+                    if lml_drift > lml_drift_tol:
+                        print('Likelihood drift exceeds tolerance. Refitting...')
+                        mdl = fit_model(df_train, mdl)
+                
+                if (n_completed % batch_size != 0) or converged:
+                    continue
+                
+                rmse_list.append(rmse)
+                mae_list.append(mae)
+                nrmse_list.append(NRMSE_cv)
+                
+                rmse, mae, NRMSE_cv = doe_error_metrics(mdl, test_set, outcome)
+                # time of the fit that produced the current hyperparameters
+                theta = mdl.gpr._final_estimator.kernel_.theta
+                hyperparam_list = np.append(hyperparam_list, 
+                                            [np.append(theta, mdl.fit_time)], 
+                                            axis=0)
+                df_train.to_csv('../data/doe/temp_save.csv', index=False)
+                
+                # same stopping criteria as run_doe
+                if len(nrmse_list) < 3:
+                    conv = False
+                else:
+                    nrmse_array = np.append(np.array(nrmse_list), NRMSE_cv)
+                    change_array = np.abs(np.diff(nrmse_array))
+                    conv = np.all(change_array[-3:] < conv_tol)
+                
+                if NRMSE_cv < error_tol:
+                    print('Stopping criterion reached. Finishing runs in flight...')
+                    converged = True
+                elif conv:
+                    print('NRMSE_cv did not improve beyond convergence tolerance. '+
+                          'Finishing runs in flight...')
+                    converged = True
+    
+    rmse_list.append(rmse)
+    mae_list.append(mae)
+    nrmse_list.append(NRMSE_cv)
+    
+    if not converged:
+        print('DoE did not converge within maximum iteration specified.')
+    print('Number of added points: ' + str(n_completed))
+    return df_train, rmse_list, mae_list, nrmse_list, hyperparam_list
+
+# refit_every > 1 grows the GP between full fits with fixed hyperparameters;
+# a full refit is forced early if the marginal likelihood drifts by lml_drift_tol
+# n_workers > 1 designs and analyzes the points of each batch in parallel
+# asynchronous=True keeps n_workers busy instead (see run_doe_async)
+# use_design_pool=True designs the reserve set once up front and maps each
+# requested point to its nearest feasible design (see build_doe_design_pool)
+# fit_jobs > 1 runs the GP optimizer restarts in parallel; refits are always
+# warm-started from the previous hyperparameters
 def run_doe(prob_target, df_train, df_test, sample_bounds=None,
             batch_size=10, error_tol=0.15, maxIter=1000, conv_tol=1e-2,
-            kernel='rbf_iso', doe_strat='balanced'):
+            kernel='rbf_iso', doe_strat='balanced', refit_every=1,
+            lml_drift_tol=0.1, n_workers=1, n_spare=3, asynchronous=False,
+            fantasy='believer', use_design_pool=False, fit_jobs=1):
+    
+    if asynchronous:
+        return(run_doe_async(prob_target, df_train, df_test, 
+                             sample_bounds=sample_bounds, n_workers=n_workers,
+                             batch_size=batch_size, error_tol=error_tol, 
+                             maxIter=maxIter, conv_tol=conv_tol, kernel=kernel,
+                             doe_strat=doe_strat, refit_every=refit_every,
+                             lml_drift_tol=lml_drift_tol, fantasy=fantasy,
+                             n_spare=n_spare, use_design_pool=use_design_pool,
+                             fit_jobs=fit_jobs))
     
     import random
     import numpy as np
@@ -319,7 +1071,6 @@ def run_doe(prob_target, df_train, df_test, sample_bounds=None,
     np.random.seed(986)
     random.seed(986)
     from doe import GP
-    from db import Database
     
     # sample_bounds = test_set.X.agg(['min', 'max'])
     
@@ -341,19 +1092,12 @@ def run_doe(prob_target, df_train, df_test, sample_bounds=None,
     
     test_set.set_outcome(outcome)
     
-    buffer = 4
-    doe_reserve_db = Database(maxIter, n_buffer=buffer, seed=131, 
-                        struct_sys_list=['MF'], isol_wts=[1, 0])
+    pregen_designs = prepare_doe_pool(maxIter, covariate_columns)
     
-    # drop covariates 
-    reserve_df = doe_reserve_db.raw_input
-    reserve_df = reserve_df.drop(columns=['T_m', 'moat_ampli'])
-    pregen_designs = reserve_df.drop(columns=[col for col in reserve_df 
-                                              if col in covariate_columns])
-    
-    from loads import estimate_period
-    pregen_designs['T_fbe'] = pregen_designs.apply(lambda row: estimate_period(row),
-                                                     axis='columns', result_type='expand')
+    if use_design_pool:
+        design_pool = build_doe_design_pool(pregen_designs, sample_bounds)
+    else:
+        design_pool = None
     
     rmse = 1.0
     batch_idx = 0
@@ -363,10 +1107,11 @@ def run_doe(prob_target, df_train, df_test, sample_bounds=None,
     mae_list = []
     nrmse_list = []
     
+    # kernel log-theta of each fit, last column is the fit time in seconds
     if kernel == 'rbf_iso':
-        hyperparam_list = np.empty((0,3), float)
+        hyperparam_list = np.empty((0,4), float)
     else:
-        hyperparam_list = np.empty((0,6), float)
+        hyperparam_list = np.empty((0,7), float)
     
     doe_idx = 0
     
@@ -382,9 +1127,8 @@ def run_doe(prob_target, df_train, df_test, sample_bounds=None,
     
     rho_idx = 0
     
-    import design as ds
-    from loads import define_lateral_forces, define_gravity_loads
-    from gms import scale_ground_motion
+    mdl = None
+    batches_since_fit = 0
     
     while doe_idx < maxIter:
         
@@ -393,45 +1137,39 @@ def run_doe(prob_target, df_train, df_test, sample_bounds=None,
         
         if (batch_idx % (batch_size) == 0):
             
-            mdl = GP(df_train)
-            
-            mdl.set_outcome(outcome)
-            
-            mdl.set_covariates(covariate_columns)
-            mdl.fit_gpr(kernel_name=kernel)
+            # grow the existing GP unless a full refit is due
+            full_refit = (mdl is None) or (batches_since_fit+1 >= refit_every)
+            if not full_refit:
+                lml_drift = mdl.update_gpr(df_train.iloc[mdl.k:])
+                batches_since_fit += 1
+                print('GP updated with fixed hyperparameters, likelihood drift: %.3f' 
+                      % lml_drift)
+                if lml_drift > lml_drift_tol:
+                    print('Likelihood drift exceeds tolerance. Refitting...')
+                    full_refit = True
             
-            y_hat = mdl.gpr.predict(test_set.X)
-            
-            print('===== Training model size:', mdl.X.shape[0], '=====')
-            from sklearn.metrics import mean_squared_error, mean_absolute_error
-            import numpy as np
-            compare = pd.DataFrame(test_set.y).copy()
-            compare['predicted'] = y_hat
-            mse = mean_squared_error(test_set.y, y_hat)
+            if full_refit:
+                theta_prev = None
+                if mdl is not None:
+                    theta_prev = mdl.gpr._final_estimator.kernel_.theta
+                
+                mdl = GP(df_train)
+                
+                mdl.set_outcome(outcome)
+                
+                mdl.set_covariates(covariate_columns)
+                mdl.fit_gpr(kernel_name=kernel, n_jobs=fit_jobs, 
+                            theta0=theta_prev)
+                batches_since_fit = 0
             
-            # SOURCE: Yi & Taflanidis (2023)
-            gp_obj = mdl.gpr._final_estimator
-            L = gp_obj.L_
-            K_mat = L @ L.T
-            alpha_ = gp_obj.alpha_.flatten()
-            K_inv_diag = np.linalg.inv(K_mat).diagonal()
-            theta = gp_obj.kernel_.theta
+            rmse, mae, NRMSE_cv = doe_error_metrics(mdl, test_set, outcome)
             
-            hyperparam_list = np.append(hyperparam_list, [theta], 
+            # time of the fit that produced the current hyperparameters
+            theta = mdl.gpr._final_estimator.kernel_.theta
+            hyperparam_list = np.append(hyperparam_list, 
+                                        [np.append(theta, mdl.fit_time)], 
                                         axis=0)
             
-            NRMSE_cv = ((np.sum(np.divide(alpha_, K_inv_diag)**2)/len(alpha_))**0.5/
-                        (max(mdl.y[outcome]) - min(mdl.y[outcome])))
-            
-            # nrmse = rmse/(max(mdl.y[outcome]) - min(mdl.y[outcome]))
-            print('Test set NRMSE_cv: %.3f' % NRMSE_cv)
-            
-            rmse = mse**0.5
-            print('Test set RMSE: %.3f' % rmse)
-
-            mae = mean_absolute_error(test_set.y, y_hat)
-            print('Test set MAE: %.3f' % mae)
-            
             # if len(rmse_list) == 0:
             #     conv = rmse
             # else:
@@ -494,113 +1232,13 @@ def run_doe(prob_target, df_train, df_test, sample_bounds=None,
         #
         # Currently somewhat hardcoded for TFP-MF
     
-        # get first set of randomly generated params and merge with a buffer
-        # amount of DoE found points (to account for failed designs)
+        # each requested point is designed on top of pregenerated params, with
+        # replacement pregen designs drawn for failed designs
+        batch_results, pregen_designs = run_doe_batch(
+            next_df, pregen_designs, gm_path, n_workers=n_workers,
+            n_spare=n_spare, design_pool=design_pool)
         
-        for idx, next_row in next_df.iterrows():
-            
-            print('========= Run %d of batch %d ==========' % 
-                  (batch_idx+1, batch_no+1))
-            
-            while pregen_designs.shape[0] > 0:
-                
-                # pop off a pregen design and try to design with it
-                work_df = pregen_designs.head(1)
-                pregen_designs.drop(pregen_designs.head(1).index, inplace=True)
-                
-                # next_row = next_df.iloc[[batch_idx]].set_index(work_df.index)
-                row_df = pd.DataFrame(next_row).T
-                work_df = pd.concat([work_df, row_df.set_index(work_df.index)], 
-                                    axis=1)
-                
-                work_df['T_m'] = work_df['T_fbe']*work_df['T_ratio']
-                work_df['moat_ampli'] = work_df['gap_ratio']
-                
-                # design
-                work_df[['W', 
-                       'W_s', 
-                       'w_fl', 
-                       'P_lc',
-                       'all_w_cases',
-                       'all_Plc_cases']] = work_df.apply(lambda row: define_gravity_loads(row),
-                                                        axis='columns', result_type='expand')
-                             
-                try:
-                    all_tfp_designs = work_df.apply(lambda row: ds.design_TFP(row),
-                                                   axis='columns', result_type='expand')
-                except:
-                    continue
-                
-                all_tfp_designs.columns = ['mu_1', 'mu_2', 'R_1', 'R_2', 
-                                           'T_e', 'k_e', 'zeta_e', 'D_m']
-                
-                tfp_designs = all_tfp_designs.loc[(all_tfp_designs['R_1'] >= 10.0) &
-                                                  (all_tfp_designs['R_1'] <= 50.0) &
-                                                  (all_tfp_designs['R_2'] <= 190.0) &
-                                                  (all_tfp_designs['zeta_e'] <= 0.27)]
-                
-                # retry if design didn't work
-                if tfp_designs.shape[0] == 0:
-                    continue
-                
-                tfp_designs = tfp_designs.drop(columns=['zeta_e'])
-                work_df = pd.concat([work_df, tfp_designs.set_index(work_df.index)], 
-                                    axis=1)
-                
-                # get lateral force and design structures
-                work_df[['wx', 
-                       'hx', 
-                       'h_col', 
-                       'hsx', 
-                       'Fx', 
-                       'Vs',
-                       'T_fbe']] = work_df.apply(lambda row: define_lateral_forces(row),
-                                            axis='columns', result_type='expand')
-                                                  
-                all_mf_designs = work_df.apply(lambda row: ds.design_MF(row),
-                                                 axis='columns', 
-                                                 result_type='expand')
-                  
-                all_mf_designs.columns = ['beam', 'column', 'flag']
-                
-                # keep the designs that look sensible
-                mf_designs = all_mf_designs.loc[all_mf_designs['flag'] == False]
-                mf_designs = mf_designs.dropna(subset=['beam','column'])
-                 
-                mf_designs = mf_designs.drop(['flag'], axis=1)
-                
-                if mf_designs.shape[0] == 0:
-                    continue
-              
-                # get the design params of those bearings
-                work_df = pd.concat([work_df, mf_designs.set_index(work_df.index)], 
-                                    axis=1)
-                
-                
-                work_df[['gm_selected',
-                         'scale_factor',
-                         'sa_avg']] = work_df.apply(lambda row: scale_ground_motion(row),
-                                                    axis='columns', result_type='expand')
-                   
-                break
-            
-            # TODO: we cannot have the exact T_ratio and gap_ratio as DOE called for
-            # gap ratio is affected by a stochastic gm_sa_tm
-            # T_ratio is affected by the fact that the true Tfb is not the estimated Tfb
-            
-            # drop the "called-for" values and record the "as constructed" values
-            
-            work_df = work_df.drop(columns=['gap_ratio', 'T_ratio'])
-            bldg_result = run_nlth(work_df.iloc[0], gm_path)
-            result_df = pd.DataFrame(bldg_result).T
-            
-            
-            result_df[['max_drift',
-               'collapse_prob']] = result_df.apply(lambda row: collapse_fragility(row),
-                                                    axis='columns', result_type='expand')
-                                   
-            from numpy import log
-            result_df['log_collapse_prob'] = log(result_df['collapse_prob'])
+        for result_df in batch_results:
             
             # if run is successful and is batch marker, record error metric
             if (batch_idx % (batch_size) == 0):
@@ -613,6 +1251,10 @@ def run_doe(prob_target, df_train, df_test, sample_bounds=None,
     
             # attach to existing data
             df_train = pd.concat([df_train, result_df], axis=0)
+            
+        if len(batch_results) < next_df.shape[0]:
+            print('Ran out of pregenerated designs. Ending DoE...')
+            return (df_train, rmse_list, mae_list, nrmse_list, hyperparam_list)
         
         batch_no += 1
     print('DoE did not converge within maximum iteration specified.')
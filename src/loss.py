@@ -40,114 +40,14 @@ class Loss_Analysis:
             
     # returns SDC-custom mean, std, and metadata of components
     def nqe_sheets(self, nqe_dir='../resource/loss/'):
-        import pandas as pd
-        import numpy as np
         sheet_name = self.get_SDC()
+        nqe_meta, nqe_mean, nqe_std = get_nqe_sheet(sheet_name, nqe_dir)
         
-        nqe_data = pd.read_csv(nqe_dir + sheet_name)
-        nqe_data.set_index('cmp', inplace=True)
-        nqe_data = nqe_data.replace({'All Zero': 0}, regex=True)
-        nqe_data = nqe_data.replace({'2 Points = 0': 0}, regex=True)
-        nqe_data = nqe_data.replace({np.nan: 0})
-        nqe_data['directional'] = nqe_data['directional'].map(
-            {'YES': True, 'NO': False})
-
-        nqe_meta = nqe_data[[c for c in nqe_data if not (
-            c.endswith('mean') or c.endswith('std'))]]
-        nqe_mean = nqe_data[[c for c in nqe_data if c.endswith('mean')]]
-        nqe_std = nqe_data[[c for c in nqe_data if c.endswith('std')]].apply(
-            pd.to_numeric, errors='coerce')
-        
-        # unit conversion
-
-        # goal: convert nqe sheet from FEMA units to PBEE units
-        # also change PACT block division from FEMA to PBEE
-
-        # this section should not be set on a slice
-        # i will ignore
-        pd.options.mode.chained_assignment = None  # default='warn'
-
-        # convert chillers to single units (assumes small 75 ton chillers)
-        # also assumes chillers only components using TN
-        mask = nqe_meta['unit'].str.contains('TN')
-        nqe_mean.loc[mask,:] = nqe_mean.loc[mask,:].div(75)
-        nqe_meta.loc[mask, 'PACT_block'] = 'EA 1'
-        nqe_meta = nqe_meta.replace({'TN': 'EA'})
-
-        # convert AHUs to single units (assumes small 4000 cfm AHUs)
-        # also assumes AHUs only components using CF
-        mask = nqe_meta['unit'].str.contains('CF')
-        nqe_mean.loc[mask,:] = nqe_mean.loc[mask,:].div(4000)
-        nqe_meta.loc[mask, 'PACT_block'] = 'EA 1'
-        nqe_meta = nqe_meta.replace({'CF': 'EA'})
-
-        # convert large transformers from WT to EA (assumes 250e3 W = 250 kV = 1 EA)
-        mask = nqe_meta['unit'].str.contains('WT')
-        nqe_mean.loc[mask,:] = nqe_mean.loc[mask,:].div(250e3)
-
-        # change all transformers block division to EA
-        mask = nqe_meta['PACT_name'].str.contains('Transformer')
-        nqe_meta.loc[mask, 'PACT_block'] = 'EA 1'
-        nqe_meta = nqe_meta.replace({'WT': 'EA'})
-
-
-        # distribution panels already in EA, but block division needs to change
-        mask = nqe_meta['PACT_name'].str.contains('Distribution Panel')
-        nqe_meta.loc[mask, 'PACT_block'] = 'EA 1'
-
-        # convert low voltage switchgear to single units (assumes 225 AP per unit)
-        # also assumes switchgear only components using AP
-        mask = nqe_meta['unit'].str.contains('AP')
-        nqe_mean.loc[mask,:] = nqe_mean.loc[mask,:].div(225)
-        nqe_meta.loc[mask, 'PACT_block'] = 'EA 1'
-        nqe_meta = nqe_meta.replace({'AP': 'EA'})
-
-        # convert diesel generator to single units (assumes 250 kV per unit)
-        mask = nqe_meta['PACT_name'].str.contains('Diesel generator')
-        nqe_mean.loc[mask,:] = nqe_mean.loc[mask,:].div(250)
-        nqe_meta.loc[mask, 'PACT_block'] = 'EA 1'
-        nqe_meta.loc[mask, 'unit'] = 'EA'
-        
-        # Reduce block size for some excessive block count components
-        # curtain walls
-        mask = nqe_meta['PACT_name'].str.contains('Curtain Walls')
-        nqe_meta.loc[mask, 'PACT_block'] = 'SF 500'
-        
-        # # steam piping
-        # mask = nqe_meta['PACT_name'].str.contains('Steam Piping')
-        # nqe_meta.loc[mask, 'PACT_block'] = 'LF 1000'
-        
-        # # waste piping
-        # mask = nqe_meta['PACT_name'].str.contains('Waste Piping')
-        # nqe_meta.loc[mask, 'PACT_block'] = 'LF 1000'
-        
-        # ceiling
-        mask = nqe_meta['PACT_name'].str.contains('Raised Access Floor')
-        nqe_meta.loc[mask, 'PACT_block'] = 'SF 1000'
-        
-        # ceiling
-        mask = nqe_meta['PACT_name'].str.contains('Suspended Ceiling')
-        nqe_meta.loc[mask, 'PACT_block'] = 'SF 1000'
-        
-        # Floor covering
-        mask = nqe_meta['PACT_name'].str.contains('Generic Floor Covering')
-        nqe_meta.loc[mask, 'PACT_block'] = 'SF 500'
-        
-        # Pendant lighting
-        mask = nqe_meta['PACT_name'].str.contains('Independent Pendant Lighting')
-        nqe_meta.loc[mask, 'PACT_block'] = 'EA 100'
-        
-        # Concrete tile roof
-        mask = nqe_meta['PACT_name'].str.contains('Concrete tile roof')
-        nqe_meta.loc[mask, 'PACT_block'] = 'SF 1000'
-        
-        # Bookcases
-        mask = nqe_meta['PACT_name'].str.contains('Bookcase')
-        nqe_meta.loc[mask, 'PACT_block'] = 'EA 10'
-        
-        self.meta_sheet = nqe_meta
-        self.mean_sheet = nqe_mean
-        self.std_sheet = nqe_std
+        # copies, normative_quantity_estimation adds columns to the metadata
+        self.meta_sheet = nqe_meta.copy()
+        self.mean_sheet = nqe_mean.copy()
+        self.std_sheet = nqe_std.copy()
+        self.nqe_dir = nqe_dir
     
     # structural components
     def get_structural_cmp_MF(self, metadata):
@@ -437,7 +337,40 @@ class Loss_Analysis:
             clean_df = pd.concat([clean_df, new_row], axis=0)
         return(clean_df)
     
+    # component marginals are memoized in cmp_marginal_cache: NSCs depend only
+    # on the SDC sheet (and the NQE directory it was read from), floor size and
+    # usage per floor, structural components
+    # only on the system and its member lists
     def normative_quantity_estimation(self, usage, P58_metadata, brace_dir='../resource/'):
+        import pandas as pd
+        
+        nsc_key = ('nsc', self.nqe_dir, self.get_SDC(), float(self.L_bldg), 
+                   tuple(tuple(fl_usage) for fl_usage in usage))
+        nsc_cmp = get_cached_cmp(nsc_key)
+        if nsc_cmp is None:
+            nsc_cmp = self.nsc_quantity_estimation(usage)
+            store_cached_cmp(nsc_key, nsc_cmp)
+        
+        if self.superstructure_system == 'MF':
+            strct_key = ('MF', self.num_bays, self.num_stories, self.L_bay,
+                         tuple(self.beam), tuple(self.column))
+        else:
+            strct_key = ('CBF', self.num_bays, self.num_stories, self.L_bay,
+                         tuple(self.column), tuple(self.brace), brace_dir)
+        structural_cmp = get_cached_cmp(strct_key)
+        if structural_cmp is None:
+            structural_cmp = self.structural_quantity_estimation(P58_metadata, 
+                                                                 brace_dir)
+            store_cached_cmp(strct_key, structural_cmp)
+        
+        total_cmps = pd.concat([structural_cmp, nsc_cmp], ignore_index=True)
+        self.components = total_cmps
+        
+        # buildings with the same key have identical component models and can
+        # share one Pelicun assessment (estimate_damage_batch)
+        self.cmp_key = (nsc_key, strct_key)
+        
+    def nsc_quantity_estimation(self, usage):
         floor_area = self.L_bldg**2 # sq ft
         import pandas as pd
         import numpy as np
@@ -539,6 +472,16 @@ class Loss_Analysis:
         
         nsc_cmp = pd.concat([cmp_marginal, replace_df])
         
+        from numpy import ceil
+        nsc_cmp[['Theta_0']] = nsc_cmp[['Theta_0']].apply(pd.to_numeric)
+        nsc_cmp[['Theta_0']] = ceil(nsc_cmp[['Theta_0']])
+        nsc_cmp[['Blocks']] = nsc_cmp[['Blocks']].apply(pd.to_numeric)
+        
+        return(nsc_cmp)
+    
+    def structural_quantity_estimation(self, P58_metadata, brace_dir='../resource/'):
+        import pandas as pd
+        
         # structural components
         superstructure = self.superstructure_system
         if superstructure == 'MF':
@@ -552,16 +495,14 @@ class Loss_Analysis:
         
         structural_cmp['Theta_1'] = 0
         
-        from numpy import ceil
-        nsc_cmp[['Theta_0']] = nsc_cmp[['Theta_0']].apply(pd.to_numeric)
-        nsc_cmp[['Theta_0']] = ceil(nsc_cmp[['Theta_0']])
-        nsc_cmp[['Blocks']] = nsc_cmp[['Blocks']].apply(pd.to_numeric)
-        
-        total_cmps = pd.concat([structural_cmp, nsc_cmp], ignore_index=True)
-        self.components = total_cmps
+        return(structural_cmp)
         
+    # deterministic demands of this run (same EDPs in both directions) as a
+    # (type, loc, dir) indexed frame with Units and Value columns, on the
+    # EDP index shared by all runs with the same story count
     def process_EDP(self):
-
+        import numpy as np
+        
         # from ast import literal_eval
         # PID = literal_eval(self.PID)
         # PFV = literal_eval(self.PFV)
@@ -572,74 +513,69 @@ class Loss_Analysis:
         PFA = self.PFA
         # max_isol_disp = self.max_isol_disp
         
-        PID_names_1 = ['PID-'+str(fl+1)+'-1' for fl in range(len(PID))]
-        PID_names_2 = ['PID-'+str(fl+1)+'-2' for fl in range(len(PID))]
+        edp_key = (len(PID), len(PFA), len(PFV))
+        edp_values = np.concatenate([PFA, PFV, PID, PFA, PFV, PID]).astype(float)
+        self.set_demands(edp_values, edp_key)
+    
+    # edp_values in get_edp_index order, e.g. one row of format_demand_table
+    def set_demands(self, edp_values, edp_key):
+        import pandas as pd
         
-        PFA_names_1 = ['PFA-'+str(fl+1)+'-1' for fl in range(len(PFA))]
-        PFA_names_2 = ['PFA-'+str(fl+1)+'-2' for fl in range(len(PFA))]
+        edp_index, edp_units = get_edp_index(edp_key)
+        self.raw_demands = pd.DataFrame({'Units': edp_units, 
+                                         'Value': edp_values}, 
+                                        index=edp_index)
+        self.edp_key = edp_key
+    
+    # Pelicun assessment of one building, in three stages: demand sample
+    # (build_demand_sample), component/damage/repair models and calculations
+    # (run_damage_and_loss) and summary (summarize_damage_and_loss). The
+    # stages are shared with estimate_damage_batch
+    def estimate_damage(self, mode='generate', custom_fragility_db=None,
+                        seed=985, n_sample=1000):
         
-        PFV_names_1 = ['PFV-'+str(fl+1)+'-1' for fl in range(len(PFV))]
-        PFV_names_2 = ['PFV-'+str(fl+1)+'-2' for fl in range(len(PFV))]
         
-        import pandas as pd
-        all_edps = PFA + PFV + PID + PFA + PFV + PID
-        all_names = (PFA_names_1 + PFV_names_1 + PID_names_1 +
-                     PFA_names_2 + PFV_names_2 + PID_names_2)
-        edp_df = pd.DataFrame([all_edps], columns = all_names)
+        from pelicun.assessment import Assessment
         
+        # initialize, no printing outputs, offset fixed with current components
+        PAL = Assessment({
+            "PrintLog": False, 
+            "Seed": seed,
+            "Verbose": False,
+            "DemandOffset": {"PFA": 0, "PFV": 0}
+        })
         
-        edp_df.loc['Units'] = ['g' if edp.startswith('PFA') else
-                               'inps' if edp.startswith('PFV') else
-                               'rad' for edp in all_names]
-
-        edp_df["new"] = range(1,len(edp_df)+1)
-        edp_df.loc[edp_df.index=='Units', 'new'] = 0
-        edp_df = edp_df.sort_values("new").drop('new', axis=1)
-
-        self.edp = edp_df
-    
-    def estimate_damage(self, mode='generate', custom_fragility_db=None):
+        demand_sample_ext = self.build_demand_sample(PAL, mode=mode, 
+                                                     n_sample=n_sample)
         
+        PAL.demand.load_sample(add_demand_units(demand_sample_ext))
         
-        from pelicun.assessment import Assessment
-        from pelicun.base import convert_to_MultiIndex
+        [cmp_sample, damage_sample, loss_sample, agg_DF, 
+         cmp_list] = self.run_damage_and_loss(PAL, mode=mode, 
+                                              custom_fragility_db=custom_fragility_db)
+        
+        return(self.summarize_damage_and_loss(cmp_sample, damage_sample, 
+                                              loss_sample, agg_DF, cmp_list, 
+                                              mode=mode))
+    
+    # demand sample of n_sample realizations (without the units row) drawn
+    # with the demand model of PAL
+    def build_demand_sample(self, PAL, mode='generate', n_sample=1000):
         import pandas as pd
-        import numpy as np
         
-        # prepare edp
+        # prepare edp (from process_EDP or set_demands)
         # TODO: fix EDPs for validation (make suitable for distribution per IDA level)
         # determine what to do for validation
         # validation is currently same as generate
-        if mode=='generate':
-            raw_demands = self.edp.transpose()
-            raw_demands.columns = ['Units', 'Value']
-            raw_demands = convert_to_MultiIndex(raw_demands, axis=0)
-            raw_demands.index.names = ['type','loc','dir']
         # if mode is validation, treat the dataset as a distribution
-        elif mode=='validation':
-            raw_demands = self.edp.transpose()
-            raw_demands.columns = ['Units', 'Value']
-            raw_demands = convert_to_MultiIndex(raw_demands, axis=0)
-            raw_demands.index.names = ['type','loc','dir']
+        raw_demands = self.raw_demands.copy()
             
         # if mode is maximize, add high EDPs to maximize loss
-        elif mode=='maximize':
-            raw_demands = self.edp.transpose()
-            raw_demands.columns = ['Units', 'Value']
-            raw_demands = convert_to_MultiIndex(raw_demands, axis=0)
-            raw_demands.index.names = ['type','loc','dir']
+        if mode=='maximize':
             raw_demands.loc[raw_demands['Units'] == 'g', 'Value'] = 1e4
             raw_demands.loc[raw_demands['Units'] == 'rad', 'Value'] = 1e2
             raw_demands.loc[raw_demands['Units'] == 'inps', 'Value'] = 1e6
         
-        # initialize, no printing outputs, offset fixed with current components
-        PAL = Assessment({
-            "PrintLog": False, 
-            "Seed": 985,
-            "Verbose": False,
-            "DemandOffset": {"PFA": 0, "PFV": 0}
-        })
-        
         ###########################################################################
         # DEMANDS
         ###########################################################################
@@ -659,21 +595,15 @@ class Loss_Analysis:
             demands.insert(1, 'Family',"deterministic")
             demands.rename(columns = {'Value': 'Theta_0'}, inplace=True)
             
-            # prepare a correlation matrix that represents perfect correlation
-            ndims = demands.shape[0]
-            demand_types = demands.index 
-        
-            perfect_CORR = pd.DataFrame(
-                np.ones((ndims, ndims)),
-                columns = demand_types,
-                index = demand_types)
+            # correlation matrix that represents perfect correlation (shared
+            # by all runs with the same story count)
+            perfect_CORR = get_perfect_corr(self.edp_key).copy()
         
             # load the demand model
             PAL.demand.load_model({'marginals': demands,
                                    'correlation': perfect_CORR})
 
         # generate demand sample
-        n_sample = 1000
         PAL.demand.generate_sample({"SampleSize": n_sample})
 
         # extract the generated sample
@@ -712,16 +642,47 @@ class Loss_Analysis:
         #                                                         ('PID','2','1'),
         #                                                         ('PID','3','1')]].max(axis=1)
         
-        # add units to the data 
-        demand_sample_ext.T.insert(0, 'Units',"")
-
-        # PFA and SA are in "g" in this example, while PID and RID are "rad"
-        demand_sample_ext.loc['Units', ['PFA', 'SA_Tm']] = 'g'
-        demand_sample_ext.loc['Units',['PID', 'PID_all', 'RID']] = 'rad'
-        demand_sample_ext.loc['Units',['PFV']] = 'inps'
-
-
-        PAL.demand.load_sample(demand_sample_ext)
+        return(demand_sample_ext)
+    
+    # replacement cost and time of the building
+    def replacement_consequence(self):
+        # TODO: find replacement cost estimate
+        # use PACT
+        # assume $250/sf
+        # assume 40% of replacement cost is labor, $680/worker-day for SF Bay Area
+        
+        # assume $600/sf
+        bldg_area = self.L_bldg**2 * (self.num_stories + 1)
+        replacement_cost = 600.0*bldg_area
+        
+        # assume 2 years timeline
+        # assume 1 worker per 1000 sf, but can work in parallel of 2 floors
+        n_worker_series = bldg_area/1000
+        n_worker_parallel = n_worker_series/2
+        replacement_time = n_worker_parallel*365*2
+        
+        return(replacement_cost, replacement_time)
+    
+    # load the models into PAL (demand sample already loaded) and run the
+    # damage and loss calculations
+    def run_damage_and_loss(self, PAL, mode='generate', custom_fragility_db=None):
+        cmp_list, dmg_process = self.load_damage_and_loss_models(
+            PAL, mode=mode, custom_fragility_db=custom_fragility_db)
+        
+        [cmp_sample, damage_sample, loss_sample, 
+         agg_DF] = self.calculate_damage_and_loss(PAL, dmg_process=dmg_process)
+        
+        return(cmp_sample, damage_sample, loss_sample, agg_DF, cmp_list)
+    
+    # load the component, damage and repair models of this building into PAL
+    # returns the P58 component list and the damage process used by
+    # calculate_damage_and_loss
+    def load_damage_and_loss_models(self, PAL, mode='generate', 
+                                    custom_fragility_db=None):
+        import pandas as pd
+        import numpy as np
+        
+        PID_all = self.PID
         
         # ###########################################################################
         # # COMPONENTS
@@ -740,7 +701,7 @@ class Loss_Analysis:
         
         
         # review the damage model - in this example: fragility functions
-        P58_data = PAL.get_default_data('damage_DB_FEMA_P58_2nd')
+        P58_data = get_P58_data('damage_DB_FEMA_P58_2nd')
 
         # note that we drop the last three components here (excessiveRID, irreparable, and collapse) 
         # because they are not part of P58
@@ -754,12 +715,6 @@ class Loss_Analysis:
 
         # now load the model into Pelicun
         PAL.asset.load_cmp_model({'marginals': cmp_marginals})
-        
-        # Generate the component quantity sample
-        PAL.asset.generate_cmp_sample()
-
-        # get the component quantity sample - again, use the save function to convert units
-        cmp_sample = PAL.asset.save_cmp_sample()
 
         # load in some custom definitions for a couple of missing components
         incomplete_db = P58_data_for_this_assessment.loc[
@@ -767,8 +722,7 @@ class Loss_Analysis:
         inc_names = incomplete_db.index.tolist()
         
         if custom_fragility_db is None:
-            custom_fragility_db = pd.read_csv('../resource/loss/custom_component_fragilities.csv',
-                                              header=[0,1], index_col=0)
+            custom_fragility_db = get_custom_fragilities()
             
         custom_fragility_db = custom_fragility_db.rename(
             columns=lambda x: '' if "Unnamed" in x else x, level=1)
@@ -842,12 +796,7 @@ class Loss_Analysis:
         # 84% collapse rate (10% is the mean+1std.dev)
         # Yun and Hamburger has beta (logarithmic stdev) value of 0.3 for 
         # 3-story global collapse drift, lowered by 0.05 if nonlin dynamic anly
-        from math import log, exp
-        from scipy.stats import norm
-        drift_mu_plus_std = 0.1
-        inv_norm = norm.ppf(0.84)
-        beta_drift = 0.25
-        mean_log_drift = exp(log(drift_mu_plus_std) - beta_drift*inv_norm) # 0.9945 is inverse normCDF of 0.84
+        mean_log_drift, beta_drift = drift_collapse_capacity()
         additional_fragility_db.loc[
             'collapse', [('Demand','Directional'),
                             ('Demand','Offset'),
@@ -868,9 +817,11 @@ class Loss_Analysis:
                 index=['collapse', 'excessiveRID', 'irreparable'])
         
         # load fragility data
+        # (the default P58 data comes from the loss model cache, copied since
+        # Pelicun converts units on the frame it is given)
         PAL.damage.load_damage_model([
             additional_fragility_db,  # This is the extra fragility data we've just created
-            'PelicunDefault/damage_DB_FEMA_P58_2nd.csv' # and this is a table with the default P58 data    
+            get_P58_data('damage_DB_FEMA_P58_2nd').copy() # and this is a table with the default P58 data    
         ])
         
         ### 3.3.5 Damage Process
@@ -901,20 +852,6 @@ class Loss_Analysis:
         else:
             dmg_process = None
         
-        ###########################################################################
-        # DAMAGE
-        ###########################################################################
-        
-        
-        print('Damage estimation...')
-        # Now we can run the calculation
-        PAL.damage.calculate(dmg_process=dmg_process)#, block_batch_size=100)
-        
-        # Damage estimates
-        damage_sample = PAL.damage.save_sample()
-        
-        print('Damage estimation complete!')
-        
         ###########################################################################
         # LOSS
         ###########################################################################
@@ -936,47 +873,10 @@ class Loss_Analysis:
         loss_map = pd.DataFrame(loss_models, columns=['Repair'], index=drivers)
         
         # load the consequence models
-        P58_data = PAL.get_default_data('loss_repair_DB_FEMA_P58_2nd')
+        P58_data = get_P58_data('loss_repair_DB_FEMA_P58_2nd')
 
         # group E (filing cabinets, bookcases)
-        incomplete_cmp = pd.DataFrame(
-            columns = pd.MultiIndex.from_tuples([('Incomplete',''), 
-                                                  ('Quantity','Unit'), 
-                                                  ('DV', 'Unit'), 
-                                                  ('DS1','Theta_0'),
-                                                  ('DS1','Theta_1'),
-                                                  ('DS1','Family'),]),
-            index=pd.MultiIndex.from_tuples([('E.20.22.102a','Cost'), 
-                                              ('E.20.22.102a','Time'),
-                                              ('E.20.22.112a','Cost'), 
-                                              ('E.20.22.112a','Time'),
-                                              ('E.20.22.114b','Cost'), 
-                                              ('E.20.22.114b','Time'),
-                                              ('E.20.22.106b','Cost'), 
-                                              ('E.20.22.106b','Time'),])
-        )
-        
-        # bookcases (unanchored vs anchored)
-        incomplete_cmp.loc[('E.20.22.102a', 'Cost')] = [0, '1 EA', 'USD_2011',
-                                                      '190.0,150.0|1,5', 0.35, 'lognormal']
-        incomplete_cmp.loc[('E.20.22.102a', 'Time')] = [0, '1 EA', 'worker_day',
-                                                      0.02, 0.5, 'lognormal']
-        
-        incomplete_cmp.loc[('E.20.22.106b', 'Cost')] = [0, '1 EA', 'USD_2011',
-                                                      '250.0,150.0|1,5', 0.35, 'lognormal']
-        incomplete_cmp.loc[('E.20.22.106b', 'Time')] = [0, '1 EA', 'worker_day',
-                                                      0.03, 0.5, 'lognormal']
-
-        # filing cabinets (unanchored vs anchored)
-        incomplete_cmp.loc[('E.20.22.112a', 'Cost')] = [0, '1 EA', 'USD_2011',
-                                                      '110.0,70.0|1,5', 0.35, 'lognormal']
-        incomplete_cmp.loc[('E.20.22.112a', 'Time')] = [0, '1 EA', 'worker_day',
-                                                      0.02, 0.5, 'lognormal']
-        
-        incomplete_cmp.loc[('E.20.22.114b', 'Cost')] = [0, '1 EA', 'USD_2011',
-                                                      '170.0,70.0|1,5', 0.35, 'lognormal']
-        incomplete_cmp.loc[('E.20.22.114b', 'Time')] = [0, '1 EA', 'worker_day',
-                                                      0.03, 0.5, 'lognormal']
+        incomplete_cmp = incomplete_consequences()
         
         # if maximizing, drop the three replacement damage states
         if mode == 'maximize':
@@ -1006,20 +906,7 @@ class Loss_Analysis:
         
         # add the data about replacement cost and time
 
-        # TODO: find replacement cost estimate
-        # use PACT
-        # assume $250/sf
-        # assume 40% of replacement cost is labor, $680/worker-day for SF Bay Area
-        
-        # assume $600/sf
-        bldg_area = self.L_bldg**2 * (self.num_stories + 1)
-        replacement_cost = 600.0*bldg_area
-        
-        # assume 2 years timeline
-        # assume 1 worker per 1000 sf, but can work in parallel of 2 floors
-        n_worker_series = bldg_area/1000
-        n_worker_parallel = n_worker_series/2
-        replacement_time = n_worker_parallel*365*2
+        replacement_cost, replacement_time = self.replacement_consequence()
         additional_consequences.loc[('replacement', 'Cost')] = [0, '1 EA',
                                                                 'USD_2011',
                                                                 replacement_cost,
@@ -1036,9 +923,38 @@ class Loss_Analysis:
         # Load the loss model to pelicun
         PAL.repair.load_model(
             [additional_consequences, incomplete_cmp,
-              "PelicunDefault/loss_repair_DB_FEMA_P58_2nd.csv"], 
+              P58_data.copy()], 
             loss_map, decision_variables=['Cost', 'Time'])
         
+        return(cmp_list, dmg_process)
+    
+    # component, damage and loss samples for the demand sample loaded in PAL,
+    # with the models of load_damage_and_loss_models. Can be repeated on the
+    # same PAL after loading a new demand sample
+    def calculate_damage_and_loss(self, PAL, dmg_process=None):
+        # Generate the component quantity sample
+        PAL.asset.generate_cmp_sample()
+
+        # get the component quantity sample - again, use the save function to convert units
+        cmp_sample = PAL.asset.save_cmp_sample()
+        
+        ###########################################################################
+        # DAMAGE
+        ###########################################################################
+        
+        print('Damage estimation...')
+        # Now we can run the calculation
+        PAL.damage.calculate(dmg_process=dmg_process)#, block_batch_size=100)
+        
+        # Damage estimates
+        damage_sample = PAL.damage.save_sample()
+        
+        print('Damage estimation complete!')
+        
+        ###########################################################################
+        # LOSS
+        ###########################################################################
+        
         # and run the calculations
         print('Loss estimation...')
         PAL.repair.calculate()
@@ -1047,6 +963,20 @@ class Loss_Analysis:
         # loss estimates
         loss_sample = PAL.repair.save_sample()
         
+        # aggregate
+        agg_DF = PAL.repair.aggregate_losses()
+        
+        return(cmp_sample, damage_sample, loss_sample, agg_DF)
+    
+    # replacement frequencies and B/C/D/E loss groups of one building's
+    # samples (rows are realizations)
+    def summarize_damage_and_loss(self, cmp_sample, damage_sample, loss_sample,
+                                  agg_DF, cmp_list, mode='generate'):
+        import pandas as pd
+        import numpy as np
+        
+        n_sample = loss_sample.shape[0]
+        replacement_cost = self.replacement_consequence()[0]
         
         # group components and ensure that all components and replacement are present
         loss_by_cmp = loss_sample.groupby(level=[0, 2], axis=1).sum()['Cost']
@@ -1066,12 +996,12 @@ class Loss_Analysis:
             loss_groups['E'] = loss_by_cmp[[
                 col for col in loss_by_cmp.columns if col.startswith('E')]].sum(axis=1)
             
+            # raw group sample for summarize_run_loss
+            self.loss_group_sample = loss_groups
+            
             # this returns NaN if collapse/irreparable is 100%
             loss_groups = loss_groups.describe()
             
-            # aggregate
-            agg_DF = PAL.repair.aggregate_losses()
-            
             collapse_freq = 0.0
             irreparable_freq = 0.0
             
@@ -1110,14 +1040,1131 @@ class Loss_Analysis:
         collapse_freq = replacement_instances['collapse'].sum(axis=0)/n_sample
         irreparable_freq = replacement_instances['irreparable'].sum(axis=0)/n_sample
         
+        # raw group sample for summarize_run_loss
+        self.loss_group_sample = loss_groups
+        
         # this returns NaN if collapse/irreparable is 100%
         loss_groups = loss_groups.describe()
         
-        # aggregate
-        agg_DF = PAL.repair.aggregate_losses()
-        
         return(cmp_sample, damage_sample, loss_sample, loss_groups, agg_DF,
                 collapse_freq, irreparable_freq)
+
+    # estimate_damage with the sample size set by the Monte Carlo error: one
+    # assessment (models loaded once) draws n_init realizations, then further
+    # batches sized from the current standard errors (SE ~ 1/sqrt(n)) until
+    # the SE of the median and 90th percentile repair cost is below rtol
+    # (relative) and that of the replacement frequency below ftol, or n_max
+    # is reached
+    # returns the same as estimate_damage, pooled over all batches
+    def estimate_damage_adaptive(self, mode='generate', custom_fragility_db=None,
+                                 seed=985, n_init=250, n_max=4000, 
+                                 rtol=0.02, ftol=0.01):
+        from pelicun.assessment import Assessment
+        import numpy as np
+        import pandas as pd
+        
+        PAL = Assessment({
+            "PrintLog": False, 
+            "Seed": seed,
+            "Verbose": False,
+            "DemandOffset": {"PFA": 0, "PFV": 0}
+        })
+        
+        cmp_list, dmg_list, loss_list, agg_list, group_list = [], [], [], [], []
+        n_collapse = 0.0
+        n_irreparable = 0.0
+        converged = False
+        P58_cmp_list = None
+        
+        n_total = 0
+        n_batch = min(n_init, n_max)
+        while n_batch > 0:
+            # the demand model is reloaded, its sample continues PAL's stream
+            demand_sample_ext = self.build_demand_sample(PAL, mode=mode, 
+                                                         n_sample=n_batch)
+            PAL.demand.load_sample(add_demand_units(demand_sample_ext))
+            
+            if P58_cmp_list is None:
+                P58_cmp_list, dmg_process = self.load_damage_and_loss_models(
+                    PAL, mode=mode, custom_fragility_db=custom_fragility_db)
+            
+            [cmp_sample, damage_sample, loss_sample, 
+             agg_DF] = self.calculate_damage_and_loss(PAL, 
+                                                      dmg_process=dmg_process)
+            [cmp_sample, damage_sample, loss_sample, loss_groups, agg_DF,
+             collapse_freq, irreparable_freq] = self.summarize_damage_and_loss(
+                 cmp_sample, damage_sample, loss_sample, agg_DF, P58_cmp_list,
+                 mode=mode)
+            
+            cmp_list.append(cmp_sample)
+            dmg_list.append(damage_sample)
+            loss_list.append(loss_sample)
+            agg_list.append(agg_DF)
+            group_list.append(self.loss_group_sample)
+            n_collapse += collapse_freq*n_batch
+            n_irreparable += irreparable_freq*n_batch
+            n_total += n_batch
+            
+            cost = np.ravel(pd.concat(agg_list)['repair_cost'])
+            repl_freq = (n_collapse + n_irreparable)/n_total
+            
+            # standard errors against their tolerances
+            cost_tol = rtol*np.maximum(np.abs(np.quantile(cost, [0.5, 0.9])), 1.0)
+            se_ratio = np.array([
+                quantile_std_error(cost, 0.5)/cost_tol[0],
+                quantile_std_error(cost, 0.9)/cost_tol[1],
+                np.sqrt(repl_freq*(1-repl_freq)/n_total)/ftol])
+            se_ratio = np.nan_to_num(se_ratio, nan=np.inf)
+            if np.all(se_ratio <= 1.0):
+                converged = True
+                break
+            
+            # realizations needed for the worst statistic, at least n_init more
+            n_needed = int(np.ceil(n_total*np.max(se_ratio)**2)) if np.all(
+                np.isfinite(se_ratio)) else n_max
+            n_batch = min(max(n_needed - n_total, n_init), n_max - n_total)
+        
+        agg_DF = pd.concat(agg_list, ignore_index=True)
+        self.loss_group_sample = pd.concat(group_list, ignore_index=True)
+        collapse_freq = n_collapse/n_total
+        irreparable_freq = n_irreparable/n_total
+        
+        if converged:
+            print('Loss statistics converged with %d realizations' % n_total)
+        else:
+            print('Loss statistics not converged at n_max = %d realizations' % 
+                  n_total)
+        
+        return(pd.concat(cmp_list, ignore_index=True), 
+               pd.concat(dmg_list, ignore_index=True),
+               pd.concat(loss_list, ignore_index=True),
+               self.loss_group_sample.describe(), agg_DF,
+               collapse_freq, irreparable_freq)
+    
+    # fragility and consequence arrays of this building's component model,
+    # used by estimate_loss_analytic and memoized in fragility_table_cache
+    # (by cmp_key and the directory of the custom fragilities, cmp_dir). One
+    # row per component and location; directions of a row share the same EDP
+    # (process_EDP duplicates them) and are counted in n_dir
+    def fragility_table(self, cmp_dir='../resource/loss/'):
+        import numpy as np
+        import pandas as pd
+        
+        table_key = (self.cmp_key, cmp_dir)
+        if table_key in fragility_table_cache:
+            return(fragility_table_cache[table_key])
+        
+        custom_fragility_db = get_custom_fragilities(cmp_dir).rename(
+            columns=lambda x: '' if "Unnamed" in x else x, level=1)
+        P58_damage = get_P58_data('damage_DB_FEMA_P58_2nd')
+        P58_repair = get_P58_data('loss_repair_DB_FEMA_P58_2nd')
+        incomplete_cmp = incomplete_consequences()
+        
+        # EDP vector of a building is PID, PFA, PFV stacked
+        edp_len = {'PID': len(self.PID), 'PFA': len(self.PFA), 
+                   'PFV': len(self.PFV)}
+        edp_offset = {'PID': 0, 'PFA': edp_len['PID'], 
+                      'PFV': edp_len['PID'] + edp_len['PFA']}
+        edp_unit = {'PID': 'rad', 'PFA': 'g', 'PFV': 'inps'}
+        
+        # the replacement components are evaluated in estimate_loss_analytic
+        cmp_marginals = self.components
+        cmp_marginals = cmp_marginals[~cmp_marginals['Component'].isin(
+            ['excessiveRID', 'irreparable', 'collapse'])]
+        cmp_names = list(cmp_marginals['Component'].unique())
+        
+        # fragilities: the custom definitions only replace incomplete P58 ones
+        cmp_frag = []
+        cmp_edp = []
+        for cmp_name in cmp_names:
+            if ((cmp_name in P58_damage.index) and 
+                (P58_damage.loc[cmp_name, ('Incomplete', '')] != 1)):
+                frag_row = P58_damage.loc[cmp_name]
+            elif cmp_name in custom_fragility_db.index:
+                frag_row = custom_fragility_db.loc[cmp_name]
+            else:
+                raise ValueError('No fragility data for component ' + cmp_name)
+            
+            demand_type = frag_row[('Demand', 'Type')]
+            if demand_type not in fragility_demand_types:
+                raise ValueError('Demand type ' + str(demand_type) + 
+                                 ' of component ' + cmp_name + 
+                                 ' is not supported by the analytic loss path')
+            edp = fragility_demand_types[demand_type]
+            
+            # fragility medians in the units of the building EDPs
+            theta_factor = (unit_factor(frag_row[('Demand', 'Unit')]) / 
+                            unit_factor(edp_unit[edp]))
+            cmp_frag.append(fragility_limit_states(frag_row, theta_factor))
+            cmp_edp.append(edp)
+        
+        n_cmp = len(cmp_names)
+        n_ls = max([len(frag[0]) for frag in cmp_frag] + [1])
+        n_ds = max([frag[3].shape[1] for frag in cmp_frag] + [1])
+        
+        theta = np.full((n_cmp, n_ls), np.nan)
+        beta = np.zeros((n_cmp, n_ls))
+        lognormal = np.zeros((n_cmp, n_ls), dtype=bool)
+        ds_weights = np.zeros((n_cmp, n_ls, n_ds))
+        for cmp_idx, (ls_theta, ls_beta, ls_lognormal, 
+                      ls_weights) in enumerate(cmp_frag):
+            n_cmp_ls, n_cmp_ds = ls_weights.shape
+            theta[cmp_idx, :n_cmp_ls] = ls_theta
+            beta[cmp_idx, :n_cmp_ls] = ls_beta
+            lognormal[cmp_idx, :n_cmp_ls] = ls_lognormal
+            ds_weights[cmp_idx, :n_cmp_ls, :n_cmp_ds] = ls_weights
+        
+        # consequences: the group E definitions take precedence over P58
+        consequence = {}
+        qty_factor = {}
+        for dv in ['Cost', 'Time']:
+            cons_arrays = {'c_hi': np.zeros((n_cmp, n_ds)), 
+                           'c_lo': np.zeros((n_cmp, n_ds)), 
+                           'q_lo': np.zeros((n_cmp, n_ds)), 
+                           'q_hi': np.ones((n_cmp, n_ds)), 
+                           'beta': np.zeros((n_cmp, n_ds)), 
+                           'lognormal': np.zeros((n_cmp, n_ds), dtype=bool)}
+            dv_qty_factor = np.ones(n_cmp)
+            for cmp_idx, cmp_name in enumerate(cmp_names):
+                if (cmp_name, dv) in incomplete_cmp.index:
+                    cons_row = incomplete_cmp.loc[(cmp_name, dv)]
+                elif (cmp_name, dv) in P58_repair.index:
+                    cons_row = P58_repair.loc[(cmp_name, dv)]
+                else:
+                    # no consequence model, as in the Pelicun loss map
+                    continue
+                
+                # consequence quantity unit, e.g. '100 SF'
+                qty_unit = str(cons_row[('Quantity', 'Unit')]).split(' ')
+                if len(qty_unit) == 2:
+                    dv_qty_factor[cmp_idx] = (1.0/(float(qty_unit[0]) * 
+                                                   unit_factor(qty_unit[1])))
+                
+                for ds_idx in range(n_ds):
+                    ds = 'DS' + str(ds_idx+1)
+                    if ((ds, 'Theta_0') not in cons_row.index or 
+                        pd.isna(cons_row[(ds, 'Theta_0')])):
+                        continue
+                    [cons_arrays['c_hi'][cmp_idx, ds_idx], 
+                     cons_arrays['c_lo'][cmp_idx, ds_idx],
+                     cons_arrays['q_lo'][cmp_idx, ds_idx],
+                     cons_arrays['q_hi'][cmp_idx, ds_idx]] = parse_consequence_median(
+                         cons_row[(ds, 'Theta_0')])
+                    family = cons_row.get((ds, 'Family'), np.nan)
+                    ds_beta = cons_row.get((ds, 'Theta_1'), np.nan)
+                    if not pd.isna(ds_beta):
+                        cons_arrays['beta'][cmp_idx, ds_idx] = float(ds_beta)
+                    cons_arrays['lognormal'][cmp_idx, ds_idx] = family == 'lognormal'
+            consequence[dv] = cons_arrays
+            qty_factor[dv] = dv_qty_factor
+        
+        # rows: component x location
+        row_cmp, row_edp, row_story, row_qty, row_dir, row_blocks = [], [], [], [], [], []
+        for cmp_row in cmp_marginals.itertuples():
+            cmp_idx = cmp_names.index(cmp_row.Component)
+            edp = cmp_edp[cmp_idx]
+            
+            n_dir = len(parse_locations(cmp_row.Direction, self.num_stories))
+            blocks = float(cmp_row.Blocks)
+            if not (blocks >= 1.0):
+                blocks = 1.0
+            
+            for loc in parse_locations(cmp_row.Location, self.num_stories):
+                # ground level demands (location 0) map to the first entry
+                edp_loc = min(max(loc, 1), edp_len[edp]) - 1
+                row_cmp.append(cmp_idx)
+                row_edp.append(edp_offset[edp] + edp_loc)
+                row_story.append(max(loc, 1))
+                row_qty.append(float(cmp_row.Theta_0)*
+                               unit_factor(cmp_row.Units))
+                row_dir.append(n_dir)
+                row_blocks.append(blocks)
+        
+        row_cmp = np.array(row_cmp, dtype=int)
+        group_names = ['B', 'C', 'D', 'E']
+        row_group = np.array([group_names.index(cmp_names[cmp_idx][0]) 
+                              if cmp_names[cmp_idx][0] in group_names else 4
+                              for cmp_idx in row_cmp], dtype=int)
+        
+        table = {'cmp_idx': row_cmp,
+                 'edp_idx': np.array(row_edp, dtype=int),
+                 'story': np.array(row_story, dtype=int),
+                 'group': row_group,
+                 'qty': {dv: np.array(row_qty)*qty_factor[dv][row_cmp]
+                         for dv in ['Cost', 'Time']},
+                 'n_dir': np.array(row_dir, dtype=float),
+                 'blocks': np.array(row_blocks),
+                 'theta': theta, 'beta': beta, 'lognormal': lognormal,
+                 'ds_weights': ds_weights,
+                 'consequence': consequence}
+        
+        fragility_table_cache[table_key] = table
+        return(table)
+    
+    # expected loss and loss quantiles for deterministic demands (generate
+    # mode) without sampling: damage state probabilities are the P58
+    # fragility CDFs at the EDPs, and the loss moments follow from the
+    # consequence functions. Approximations against the Monte Carlo path:
+    # blocks are damaged independently, unit repair costs are independent
+    # across components, quantities are fixed at their median, economies of
+    # scale use the expected damaged quantity, the repair loss given no
+    # replacement is lognormal by moments, and parallel repair time is that
+    # of the story with the largest expected time
+    # returns one row of loss_summary_header (min, max and the Monte Carlo
+    # standard errors are NaN)
+    def estimate_loss_analytic(self, cmp_dir='../resource/loss/', delta_y=0.0075):
+        import numpy as np
+        from scipy.special import ndtr
+        
+        table = self.fragility_table(cmp_dir)
+        cmp_idx = table['cmp_idx']
+        n_rows = len(cmp_idx)
+        
+        # damage state probabilities of each row
+        edp = np.concatenate([np.ravel(self.PID), np.ravel(self.PFA), 
+                              np.ravel(self.PFV)]).astype(float)
+        demand = edp[table['edp_idx']][:, None]
+        theta = table['theta'][cmp_idx]
+        beta = table['beta'][cmp_idx]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p_ls = np.where(table['lognormal'][cmp_idx],
+                            ndtr(np.log(demand/theta)/beta), 
+                            demand >= theta)
+        p_ls = np.nan_to_num(p_ls)
+        p_ls_only = p_ls - np.concatenate([p_ls[:, 1:], np.zeros((n_rows, 1))], 
+                                          axis=1)
+        p_ds = np.einsum('rl,rld->rd', p_ls_only, table['ds_weights'][cmp_idx])
+        
+        blocks = table['blocks']
+        n_dir = table['n_dir']
+        dv_mean = {}
+        dv_var = {}
+        for dv in ['Cost', 'Time']:
+            cons = table['consequence'][dv]
+            qty = table['qty'][dv]
+            
+            # economies of scale on the expected damaged quantity
+            dmg_qty = np.zeros(cons['c_hi'].shape)
+            np.add.at(dmg_qty, cmp_idx, (qty*n_dir)[:, None]*p_ds)
+            scale_range = cons['q_hi'] - cons['q_lo']
+            frac = np.clip((dmg_qty - cons['q_lo'])/np.where(
+                scale_range > 0, scale_range, 1.0), 0.0, 1.0)
+            median = cons['c_hi'] + frac*(cons['c_lo'] - cons['c_hi'])
+            
+            # lognormal: Theta_1 is the log stdev, normal: Theta_1 is the COV
+            unit_mean = np.where(cons['lognormal'], 
+                                 median*np.exp(cons['beta']**2/2), median)
+            unit_var = np.where(cons['lognormal'],
+                                unit_mean**2*(np.exp(cons['beta']**2) - 1),
+                                (cons['beta']*median)**2)
+            unit_mean = unit_mean[cmp_idx]
+            unit_var = unit_var[cmp_idx]
+            
+            pm = np.sum(p_ds*unit_mean, axis=1)
+            pm2 = np.sum(p_ds*unit_mean**2, axis=1)
+            dmg_var = qty**2/blocks*(pm2 - pm**2)
+            cost_var = np.sum(
+                qty[:, None]**2*(p_ds*(1 - p_ds)/blocks[:, None] + p_ds**2)*
+                unit_var, axis=1)
+            
+            dv_mean[dv] = n_dir*qty*pm
+            dv_var[dv] = n_dir*(dmg_var + cost_var)
+        
+        # replacement: collapse on the peak drift, irreparable on the
+        # residual drift (any story and direction) given no collapse
+        PID = np.ravel(self.PID).astype(float)
+        theta_collapse, beta_collapse = drift_collapse_capacity()
+        collapse_prob = float(ndtr(np.log(PID.max()/theta_collapse)/beta_collapse))
+        
+        RID = residual_drift_median(PID, delta_y)
+        with np.errstate(divide='ignore'):
+            p_excessive = ndtr(np.log(RID/excessive_RID_capacity[0]) / 
+                               np.sqrt(excessive_RID_capacity[1]**2 + 
+                                       residual_drift_beta**2))
+        irreparable_prob = float((1 - collapse_prob)*
+                                 (1 - np.prod((1 - p_excessive)**2)))
+        replacement_prob = collapse_prob + irreparable_prob
+        
+        replacement_cost, replacement_time = self.replacement_consequence()
+        
+        # parallel repair time: story with the largest expected time
+        story_mean = np.bincount(table['story'], weights=dv_mean['Time'])
+        story_var = np.bincount(table['story'], weights=dv_var['Time'])
+        crit_story = np.argmax(story_mean)
+        
+        cost_stats = replacement_mixture_stats(
+            dv_mean['Cost'].sum(), dv_var['Cost'].sum(), replacement_prob,
+            replacement_cost, [0.1, 0.5, 0.9])
+        time_l_stats = replacement_mixture_stats(
+            story_mean[crit_story], story_var[crit_story], replacement_prob,
+            replacement_time, [0.1, 0.5, 0.9])
+        time_u_stats = replacement_mixture_stats(
+            dv_mean['Time'].sum(), dv_var['Time'].sum(), replacement_prob,
+            replacement_time, [0.1, 0.5, 0.9])
+        
+        # B/C/D/E repair cost given no replacement
+        group_mean = np.bincount(table['group'], weights=dv_mean['Cost'], 
+                                 minlength=5)
+        group_var = np.bincount(table['group'], weights=dv_var['Cost'], 
+                                minlength=5)
+        group_stats = [replacement_mixture_stats(group_mean[grp], 
+                                                 group_var[grp], 0.0, 0.0, 
+                                                 [0.25, 0.5, 0.75])
+                       for grp in range(4)]
+        
+        return(np.concatenate([cost_stats, time_l_stats, time_u_stats,
+                               [collapse_prob, irreparable_prob, 
+                                replacement_prob]] + group_stats +
+                              [np.full(4, np.nan)]))
+    
+# collapse capacity is assumed lognormal distributed with 10% interstory drift
+# being the mean + 1 stdev percentile (see run_damage_and_loss)
+# returns the median and logarithmic stdev of the collapse drift
+def drift_collapse_capacity():
+    from math import log, exp
+    from scipy.stats import norm
+    drift_mu_plus_std = 0.1
+    inv_norm = norm.ppf(0.84)
+    beta_drift = 0.25
+    mean_log_drift = exp(log(drift_mu_plus_std) - beta_drift*inv_norm) # 0.9945 is inverse normCDF of 0.84
+    return(mean_log_drift, beta_drift)
+
+# repair consequences of the group E components missing from P58
+# (filing cabinets, bookcases)
+def incomplete_consequences():
+    import pandas as pd
+    
+    incomplete_cmp = pd.DataFrame(
+        columns = pd.MultiIndex.from_tuples([('Incomplete',''), 
+                                              ('Quantity','Unit'), 
+                                              ('DV', 'Unit'), 
+                                              ('DS1','Theta_0'),
+                                              ('DS1','Theta_1'),
+                                              ('DS1','Family'),]),
+        index=pd.MultiIndex.from_tuples([('E.20.22.102a','Cost'), 
+                                          ('E.20.22.102a','Time'),
+                                          ('E.20.22.112a','Cost'), 
+                                          ('E.20.22.112a','Time'),
+                                          ('E.20.22.114b','Cost'), 
+                                          ('E.20.22.114b','Time'),
+                                          ('E.20.22.106b','Cost'), 
+                                          ('E.20.22.106b','Time'),])
+    )
+
+    # bookcases (unanchored vs anchored)
+    incomplete_cmp.loc[('E.20.22.102a', 'Cost')] = [0, '1 EA', 'USD_2011',
+                                                  '190.0,150.0|1,5', 0.35, 'lognormal']
+    incomplete_cmp.loc[('E.20.22.102a', 'Time')] = [0, '1 EA', 'worker_day',
+                                                  0.02, 0.5, 'lognormal']
+
+    incomplete_cmp.loc[('E.20.22.106b', 'Cost')] = [0, '1 EA', 'USD_2011',
+                                                  '250.0,150.0|1,5', 0.35, 'lognormal']
+    incomplete_cmp.loc[('E.20.22.106b', 'Time')] = [0, '1 EA', 'worker_day',
+                                                  0.03, 0.5, 'lognormal']
+
+    # filing cabinets (unanchored vs anchored)
+    incomplete_cmp.loc[('E.20.22.112a', 'Cost')] = [0, '1 EA', 'USD_2011',
+                                                  '110.0,70.0|1,5', 0.35, 'lognormal']
+    incomplete_cmp.loc[('E.20.22.112a', 'Time')] = [0, '1 EA', 'worker_day',
+                                                  0.02, 0.5, 'lognormal']
+
+    incomplete_cmp.loc[('E.20.22.114b', 'Cost')] = [0, '1 EA', 'USD_2011',
+                                                  '170.0,70.0|1,5', 0.35, 'lognormal']
+    incomplete_cmp.loc[('E.20.22.114b', 'Time')] = [0, '1 EA', 'worker_day',
+                                                  0.03, 0.5, 'lognormal']
+    
+    return(incomplete_cmp)
+
+# analytic loss path (Loss_Analysis.estimate_loss_analytic)
+# fragility demand types with a building EDP
+fragility_demand_types = {'Peak Interstory Drift Ratio': 'PID',
+                          'Peak Floor Acceleration': 'PFA',
+                          'Peak Floor Velocity': 'PFV'}
+
+# P58 default excessive residual drift capacity (median, log stdev), and the
+# dispersion Pelicun's estimate_RID adds to the FEMA P58 residual drift
+excessive_RID_capacity = (0.01, 0.3)
+residual_drift_beta = 0.2
+
+# median residual drift from the peak drift (FEMA P58 Vol. 1, Sec. 5.4)
+def residual_drift_median(PID, delta_y=0.0075):
+    import numpy as np
+    
+    PID = np.asarray(PID, dtype=float)
+    RID = np.where(PID < 4*delta_y, 0.3*(PID - delta_y), PID - 3*delta_y)
+    RID[PID < delta_y] = 0.0
+    return(RID)
+
+# Pelicun unit conversion factor (to SI) of a unit name, PACT quantity units
+# are mapped to their Pelicun names
+pact_unit_names = {'EA': 'ea', 'SF': 'ft2', 'LF': 'ft'}
+
+def unit_factor(unit):
+    factors = get_default_assessment().unit_conversion_factors
+    unit = pact_unit_names.get(str(unit), str(unit))
+    return(factors.get(unit, 1.0))
+
+# Pelicun location or direction string ('1', '1,2', '2--4', 'all', 'roof',
+# 'top') as a list of integers
+def parse_locations(loc_str, n_stories):
+    loc_str = str(loc_str).strip()
+    if loc_str == 'all':
+        return(list(range(1, n_stories+1)))
+    if loc_str == 'roof':
+        return([n_stories])
+    if loc_str == 'top':
+        return([n_stories+1])
+    
+    locs = []
+    for loc_part in loc_str.split(','):
+        if '--' in loc_part:
+            loc_start, loc_end = loc_part.split('--')
+            locs += list(range(int(loc_start), int(loc_end)+1))
+        else:
+            locs.append(int(float(loc_part)))
+    return(locs)
+
+# limit states of a fragility row: medians (times theta_factor), log stdevs,
+# lognormal flags and the (n_ls, n_ds) damage state weights of each limit state
+def fragility_limit_states(frag_row, theta_factor=1.0):
+    import numpy as np
+    import pandas as pd
+    
+    ls_theta, ls_beta, ls_lognormal, ls_ds_weights = [], [], [], []
+    ls_idx = 1
+    while ((('LS'+str(ls_idx), 'Theta_0') in frag_row.index) and 
+           not pd.isna(frag_row[('LS'+str(ls_idx), 'Theta_0')])):
+        ls = 'LS'+str(ls_idx)
+        is_lognormal = frag_row.get((ls, 'Family'), np.nan) == 'lognormal'
+        ls_theta.append(float(frag_row[(ls, 'Theta_0')])*theta_factor)
+        ls_beta.append(float(frag_row[(ls, 'Theta_1')]) if is_lognormal else 0.0)
+        ls_lognormal.append(is_lognormal)
+        
+        # mutually exclusive damage states share the limit state
+        ds_weights = frag_row.get((ls, 'DamageStateWeights'), np.nan)
+        if pd.isna(ds_weights):
+            ls_ds_weights.append([1.0])
+        else:
+            ls_ds_weights.append([float(w) for w in str(ds_weights).split('|')])
+        ls_idx += 1
+    
+    n_ds = sum([len(w) for w in ls_ds_weights])
+    weights = np.zeros((len(ls_theta), n_ds))
+    ds_idx = 0
+    for ls_idx, w in enumerate(ls_ds_weights):
+        weights[ls_idx, ds_idx:ds_idx+len(w)] = w
+        ds_idx += len(w)
+    
+    return(np.array(ls_theta), np.array(ls_beta), np.array(ls_lognormal), 
+           weights)
+
+# consequence median '190.0,150.0|1,5' (quantity dependent) or '0.02'
+# returns median at low and high quantity, low and high quantity
+def parse_consequence_median(theta_0):
+    theta_str = str(theta_0)
+    if '|' not in theta_str:
+        median = float(theta_str)
+        return(median, median, 0.0, 1.0)
+    medians, qtys = theta_str.split('|')
+    c_hi, c_lo = [float(c) for c in medians.split(',')]
+    q_lo, q_hi = [float(q) for q in qtys.split(',')]
+    return(c_hi, c_lo, q_lo, q_hi)
+
+# statistics of a loss that equals repl_value with probability repl_prob and
+# is otherwise lognormal with the given mean and variance
+# returns mean, std, NaN (min), quantiles, NaN (max), as describe_sample
+def replacement_mixture_stats(mean, var, repl_prob, repl_value, quantiles):
+    import numpy as np
+    from scipy.special import ndtr, ndtri
+    
+    quantiles = np.asarray(quantiles, dtype=float)
+    p_repair = 1.0 - repl_prob
+    
+    mix_mean = repl_prob*repl_value + p_repair*mean
+    mix_var = (repl_prob*repl_value**2 + p_repair*(var + mean**2) - 
+               mix_mean**2)
+    
+    # lognormal fit of the repair loss by moments
+    if mean > 0:
+        sigma = max(np.sqrt(np.log1p(var/mean**2)), 1e-12)
+        mu = np.log(mean) - sigma**2/2
+        repair_ppf = lambda q: np.exp(mu + sigma*ndtri(np.clip(q, 0.0, 1.0)))
+        cdf_repl = ndtr((np.log(repl_value) - mu)/sigma) if repl_value > 0 else 0.0
+    else:
+        repair_ppf = lambda q: np.zeros(np.shape(q))
+        cdf_repl = 1.0
+    
+    if p_repair > 0:
+        below_repl = quantiles < p_repair*cdf_repl
+        above_repl = quantiles > p_repair*cdf_repl + repl_prob
+        loss_q = np.where(below_repl, repair_ppf(quantiles/p_repair),
+                          np.where(above_repl, 
+                                   repair_ppf((quantiles - repl_prob)/p_repair),
+                                   repl_value))
+    else:
+        loss_q = np.full(len(quantiles), float(repl_value))
+    
+    return(np.concatenate([[mix_mean, np.sqrt(max(mix_var, 0.0)), np.nan],
+                           loss_q, [np.nan]]))
+
+# PFA and SA are in "g", PID and RID are "rad", PFV is "inps"
+# returns a copy of demand_sample_ext with the units row Pelicun expects
+def add_demand_units(demand_sample_ext):
+    demand_sample_ext = demand_sample_ext.copy()
+    
+    # add units to the data 
+    demand_sample_ext.T.insert(0, 'Units',"")
+    
+    demand_sample_ext.loc['Units', ['PFA', 'SA_Tm']] = 'g'
+    demand_sample_ext.loc['Units',['PID', 'PID_all', 'RID']] = 'rad'
+    demand_sample_ext.loc['Units',['PFV']] = 'inps'
+    
+    return(demand_sample_ext)
+
+# Pelicun assessment of several buildings with the same component model
+# (same Loss_Analysis.cmp_key) in one Assessment. The demand samples of the
+# buildings are stacked as consecutive blocks of n_sample realizations, the
+# component, damage and repair models are loaded and calculated once, and the
+# samples are split back per building. This removes Pelicun's per-call model
+# loading and setup, which dominates for small buildings
+# returns a list with the estimate_damage output of each building
+def estimate_damage_batch(loss_list, mode='generate', custom_fragility_db=None,
+                          seed=985, n_sample=1000):
+    from pelicun.assessment import Assessment
+    import pandas as pd
+    
+    PAL_config = {
+        "PrintLog": False, 
+        "Seed": seed,
+        "Verbose": False,
+        "DemandOffset": {"PFA": 0, "PFV": 0}
+    }
+    
+    # each building draws its demand sample from its own demand model
+    demand_list = []
+    for bldg_loss in loss_list:
+        demand_PAL = Assessment(dict(PAL_config))
+        demand_list.append(bldg_loss.build_demand_sample(
+            demand_PAL, mode=mode, n_sample=n_sample))
+    demand_sample_ext = pd.concat(demand_list, axis=0, ignore_index=True)
+    
+    PAL = Assessment(dict(PAL_config))
+    PAL.demand.load_sample(add_demand_units(demand_sample_ext))
+    
+    # component model, stories and replacement consequences are the same for
+    # the whole batch
+    [cmp_sample, damage_sample, loss_sample, agg_DF, 
+     cmp_list] = loss_list[0].run_damage_and_loss(
+         PAL, mode=mode, custom_fragility_db=custom_fragility_db)
+    
+    results = []
+    for bldg_idx, bldg_loss in enumerate(loss_list):
+        bldg_rows = slice(bldg_idx*n_sample, (bldg_idx+1)*n_sample)
+        [bldg_cmp, bldg_dmg, bldg_loss_sample, bldg_agg] = [
+            sample.iloc[bldg_rows].reset_index(drop=True) for sample in 
+            [cmp_sample, damage_sample, loss_sample, agg_DF]]
+        results.append(bldg_loss.summarize_damage_and_loss(
+            bldg_cmp, bldg_dmg, bldg_loss_sample, bldg_agg, cmp_list, 
+            mode=mode))
+    
+    return(results)
+
+# standard error of the q-quantile of a sample from the distribution-free
+# (order statistic) 95% confidence interval
+def quantile_std_error(sample, q):
+    import numpy as np
+    
+    x = np.sort(np.ravel(np.asarray(sample, dtype=float)))
+    n = len(x)
+    if n < 2:
+        return(np.nan)
+    half_width = 1.96*np.sqrt(n*q*(1-q))
+    lo = int(max(np.floor(n*q - half_width), 0))
+    hi = int(min(np.ceil(n*q + half_width), n-1))
+    return((x[hi] - x[lo])/(2*1.96))
+
+# flat per-run loss record: repair cost and time statistics, replacement
+# frequencies and B/C/D/E group losses (same columns as the former
+# describe()-and-reshape output of run_pelicun)
+loss_stat_names = ['mean', 'std', 'min', '10%', '50%', '90%', 'max']
+group_stat_names = ['mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+loss_summary_header = (
+    [var+'_'+stat for var in ['cost', 'time_l', 'time_u'] 
+     for stat in loss_stat_names] +
+    ['collapse_freq', 'irreparable_freq', 'replacement_freq'] +
+    [grp+'_'+stat for grp in ['B', 'C', 'D', 'E'] for stat in group_stat_names] +
+    ['n_sample', 'cost_50%_se', 'cost_90%_se', 'replacement_freq_se'])
+
+# mean, sample std, min, quantiles and max of each column of sample (as
+# DataFrame.describe, NaN for empty columns), flattened column by column
+def describe_sample(sample, quantiles):
+    import numpy as np
+    
+    sample = np.asarray(sample, dtype=float)
+    n_cols = sample.shape[1]
+    if sample.shape[0] == 0:
+        return(np.full(n_cols*(len(quantiles)+4), np.nan))
+    
+    if sample.shape[0] > 1:
+        std = sample.std(axis=0, ddof=1)
+    else:
+        std = np.full(n_cols, np.nan)
+    
+    stats = np.vstack([sample.mean(axis=0), std, sample.min(axis=0),
+                       np.quantile(sample, quantiles, axis=0).reshape(-1, n_cols),
+                       sample.max(axis=0)])
+    return(stats.T.ravel())
+
+# agg: aggregated loss sample, loss_groups: B/C/D/E loss sample
+# returns one row of loss_summary_header
+def summarize_run_loss(agg, loss_groups, collapse_rate, irr_rate):
+    import numpy as np
+    
+    cost = np.ravel(agg['repair_cost'])
+    loss_sample = np.column_stack([cost,
+                                   agg[('repair_time', 'parallel')],
+                                   agg[('repair_time', 'sequential')]])
+    
+    n_sample = len(cost)
+    repl_freq = collapse_rate + irr_rate
+    
+    return(np.concatenate([
+        describe_sample(loss_sample, [0.1, 0.5, 0.9]),
+        [collapse_rate, irr_rate, repl_freq],
+        describe_sample(loss_groups[['B', 'C', 'D', 'E']], [0.25, 0.5, 0.75]),
+        [n_sample, quantile_std_error(cost, 0.5), quantile_std_error(cost, 0.9),
+         np.sqrt(repl_freq*(1-repl_freq)/n_sample)]]))
+
+# split runs into batches of up to batch_size runs with the same component
+# model (cmp_keys, see Loss_Analysis.cmp_key), keeping the run order within
+# each component model
+def cmp_batches(run_labels, cmp_keys, batch_size=20):
+    cmp_groups = {}
+    for run_idx, cmp_key in zip(run_labels, cmp_keys):
+        cmp_groups.setdefault(cmp_key, []).append(run_idx)
+    
+    return([group_runs[batch_start:batch_start+batch_size]
+            for group_runs in cmp_groups.values()
+            for batch_start in range(0, len(group_runs), batch_size)])
+
+# component model key of every run in db, demands are not processed
+def run_cmp_keys(db):
+    P58_metadata = get_P58_metadata('loss_repair_DB_FEMA_P58_2nd')
+    return([prepare_run_loss(db.loc[run_idx], P58_metadata, 
+                             process_edp=False).cmp_key
+            for run_idx in db.index])
+
+# loss estimation for one partition of a database (run in a worker process)
+# each run sets up its own Pelicun assessment seeded with the same fixed seed,
+# so unbatched results do not depend on the partitioning. Model data comes
+# from the per-process loss model cache
+# adaptive=True grows each run's sample until the loss statistics converge
+# (see Loss_Analysis.estimate_damage_adaptive)
+# batch=True evaluates up to batch_size runs with the same component model in
+# one assessment (see estimate_damage_batch); adaptive runs are not batched.
+# Each batch shares one random stream, so its realizations depend on which
+# runs are batched together (same distribution). Partitions must hold whole
+# batches (estimate_run_losses splits on cmp_batches) for results to be
+# independent of the partitioning
+# analytic=True skips Pelicun (generate mode only), see
+# Loss_Analysis.estimate_loss_analytic
+# returns a list of (run_idx, loss record), see loss_summary_header
+def estimate_loss_partition(db_part, mode='generate', 
+                            cmp_dir='../resource/loss/', seed=985,
+                            adaptive=False, batch=False, batch_size=20,
+                            analytic=False):
+    # generate structural components and join with NSCs
+    P58_metadata = get_P58_metadata('loss_repair_DB_FEMA_P58_2nd')
+    additional_frag_db = get_custom_fragilities(cmp_dir)
+    
+    if mode == 'maximize':
+        loss_label = 'maximum loss'
+    else:
+        loss_label = 'loss'
+    
+    results = []
+    
+    if analytic:
+        if mode != 'generate':
+            raise ValueError('The analytic loss path needs deterministic '
+                             '(generate mode) demands')
+        for run_idx in db_part.index:
+            run_loss = prepare_run_loss(db_part.loc[run_idx], P58_metadata,
+                                        process_edp=False)
+            results.append((run_idx, 
+                            run_loss.estimate_loss_analytic(cmp_dir)))
+        return(results)
+    
+    # demands of the whole partition, formatted per story count
+    run_demands = {}
+    for edp_key, (run_labels, edp_values) in format_demand_table(db_part).items():
+        for run_idx, run_values in zip(run_labels, edp_values):
+            run_demands[run_idx] = (run_values, edp_key)
+    
+    if batch and not adaptive:
+        run_losses = {run_idx: prepare_run_loss(db_part.loc[run_idx], 
+                                                P58_metadata,
+                                                demands=run_demands[run_idx])
+                      for run_idx in db_part.index}
+        
+        # group runs by component model, in partition order
+        run_batches = cmp_batches(
+            list(run_losses.keys()), 
+            [run_loss.cmp_key for run_loss in run_losses.values()], batch_size)
+        
+        for batch_runs in run_batches:
+            print('========================================')
+            print('Estimating', loss_label, 'for run indices', 
+                  [run_idx+1 for run_idx in batch_runs])
+            
+            batch_results = estimate_damage_batch(
+                [run_losses[run_idx] for run_idx in batch_runs], 
+                mode=mode, custom_fragility_db=additional_frag_db, 
+                seed=seed)
+            
+            for run_idx, damage_result in zip(batch_runs, batch_results):
+                [cmp, dmg, loss, loss_cmp, agg, 
+                 collapse_rate, irr_rate] = damage_result
+                loss_record = summarize_run_loss(
+                    agg, run_losses[run_idx].loss_group_sample,
+                    collapse_rate, irr_rate)
+                print('Run index', run_idx+1)
+                print_run_loss(loss_record)
+                results.append((run_idx, loss_record))
+        
+        return(results)
+    
+    for run_idx in db_part.index:
+        print('========================================')
+        print('Estimating', loss_label, 'for run index', run_idx+1)
+        
+        run_loss = prepare_run_loss(db_part.loc[run_idx], P58_metadata,
+                                    demands=run_demands[run_idx])
+        
+        if adaptive:
+            damage_fn = run_loss.estimate_damage_adaptive
+        else:
+            damage_fn = run_loss.estimate_damage
+        
+        [cmp, dmg, loss, loss_cmp, agg, 
+         collapse_rate, irr_rate] = damage_fn(
+             custom_fragility_db=additional_frag_db, mode=mode, seed=seed)
+        
+        loss_record = summarize_run_loss(agg, run_loss.loss_group_sample,
+                                         collapse_rate, irr_rate)
+        print_run_loss(loss_record)
+        
+        results.append((run_idx, loss_record))
+    
+    return(results)
+
+# Loss_Analysis of one database run with components and EDPs ready for
+# estimate_damage
+# demands: (edp_values, edp_key) from format_demand_table, instead of
+# process_EDP
+def prepare_run_loss(run_data, P58_metadata, process_edp=True, demands=None):
+    # lab, health, ed, res, office, retail, warehouse, hotel
+    fl_usage = [0., 0., 0., 0., 1.0, 0., 0., 0.]
+    
+    floors = run_data.num_stories
+    
+    bldg_usage = [fl_usage]*floors
+    
+    run_loss = Loss_Analysis(run_data)
+    run_loss.nqe_sheets()
+    run_loss.normative_quantity_estimation(bldg_usage, P58_metadata)
+    
+    if demands is not None:
+        run_loss.set_demands(*demands)
+    elif process_edp:
+        run_loss.process_EDP()
+    
+    return(run_loss)
+
+def print_run_loss(loss_record):
+    cost = loss_record[loss_summary_header.index('cost_50%')]
+    time_l = loss_record[loss_summary_header.index('time_l_50%')]
+    time_u = loss_record[loss_summary_header.index('time_u_50%')]
+    collapse_rate = loss_record[loss_summary_header.index('collapse_freq')]
+    irr_rate = loss_record[loss_summary_header.index('irreparable_freq')]
+    
+    print('Median repair cost: ', 
+          f'${cost:,.2f}')
+    print('Median lower bound repair time: ', 
+          f'{time_l:,.2f}', 'worker-days')
+    print('Median upper bound repair time: ', 
+          f'{time_u:,.2f}', 'worker-days')
+    print('Collapse frequency: ', 
+          f'{collapse_rate:.2%}')
+    print('Irreparable RID frequency: ', 
+          f'{irr_rate:.2%}')
+    print('Replacement frequency: ', 
+          f'{collapse_rate+irr_rate:.2%}')
+
+###############################################################################
+#              Demand formatting
+###############################################################################
+
+demand_units = {'PFA': 'g', 'PFV': 'inps', 'PID': 'rad'}
+
+# EDP MultiIndex (type, loc, dir) and units, and the perfect correlation
+# matrix of the deterministic demand model, for each edp_key (number of PID,
+# PFA and PFV entries per direction)
+edp_index_cache = {}
+
+# EDP order: PFA, PFV, PID of direction 1, then the same for direction 2
+# (locations and directions are strings, as from convert_to_MultiIndex)
+def get_edp_index(edp_key):
+    if edp_key not in edp_index_cache:
+        import pandas as pd
+        
+        n_PID, n_PFA, n_PFV = edp_key
+        edp_tuples = []
+        for edp_dir in ['1', '2']:
+            for edp_type, n_loc in [('PFA', n_PFA), ('PFV', n_PFV), 
+                                    ('PID', n_PID)]:
+                edp_tuples += [(edp_type, str(loc+1), edp_dir) 
+                               for loc in range(n_loc)]
+        edp_index = pd.MultiIndex.from_tuples(edp_tuples, 
+                                              names=['type','loc','dir'])
+        edp_units = [demand_units[edp[0]] for edp in edp_tuples]
+        edp_index_cache[edp_key] = (edp_index, edp_units)
+    return(edp_index_cache[edp_key])
+
+def get_perfect_corr(edp_key):
+    corr_key = ('corr', edp_key)
+    if corr_key not in edp_index_cache:
+        import numpy as np
+        import pandas as pd
+        
+        edp_index = get_edp_index(edp_key)[0]
+        ndims = len(edp_index)
+        edp_index_cache[corr_key] = pd.DataFrame(np.ones((ndims, ndims)),
+                                                 columns=edp_index,
+                                                 index=edp_index)
+    return(edp_index_cache[corr_key])
+
+# batch EDP formatter: the per-story EDP list columns (PID, PFA, PFV) of a
+# results table as one demand array per story count
+# returns {edp_key: (row labels of df, (n_runs, n_edps) array)}, columns in
+# get_edp_index order
+def format_demand_table(df):
+    import numpy as np
+    
+    edp_keys = zip(df['PID'].map(len), df['PFA'].map(len), df['PFV'].map(len))
+    key_labels = {}
+    for run_label, edp_key in zip(df.index, edp_keys):
+        key_labels.setdefault(edp_key, []).append(run_label)
+    
+    demand_table = {}
+    for edp_key, run_labels in key_labels.items():
+        PID = np.array(df.loc[run_labels, 'PID'].tolist(), dtype=float)
+        PFA = np.array(df.loc[run_labels, 'PFA'].tolist(), dtype=float)
+        PFV = np.array(df.loc[run_labels, 'PFV'].tolist(), dtype=float)
+        demand_table[edp_key] = (run_labels, 
+                                 np.hstack([PFA, PFV, PID, PFA, PFV, PID]))
+    return(demand_table)
+
+# peak EDP features of each run (max_PID, max_PFA, max_PFV), e.g. as inputs of
+# an EDP-based doe.Loss_Surrogate
+def edp_features(df):
+    import numpy as np
+    import pandas as pd
+    
+    return(pd.DataFrame({'max_'+edp: np.array([np.max(run_edp) 
+                                               for run_edp in df[edp]], 
+                                              dtype=float)
+                         for edp in ['PID', 'PFA', 'PFV']}, index=df.index))
+
+###############################################################################
+#              Loss model cache
+###############################################################################
+
+# P58 databases, custom fragilities and cleaned NQE sheets are loaded once per
+# process and shared by every Loss_Analysis (and every run of a worker)
+loss_model_cache = {}
+
+# Assessment only used to locate and read the Pelicun default databases
+def get_default_assessment():
+    if 'assessment' not in loss_model_cache:
+        from pelicun.assessment import Assessment
+        loss_model_cache['assessment'] = Assessment({
+            "PrintLog": False, 
+            "Seed": 985,
+            "Verbose": False,
+            "DemandOffset": {"PFA": 0, "PFV": 0}
+        })
+    return(loss_model_cache['assessment'])
+
+def get_P58_data(db_name):
+    key = ('data', db_name)
+    if key not in loss_model_cache:
+        PAL = get_default_assessment()
+        loss_model_cache[key] = PAL.get_default_data(db_name)
+    return(loss_model_cache[key])
+
+def get_P58_metadata(db_name):
+    key = ('metadata', db_name)
+    if key not in loss_model_cache:
+        PAL = get_default_assessment()
+        loss_model_cache[key] = PAL.get_default_metadata(db_name)
+    return(loss_model_cache[key])
+
+def get_custom_fragilities(cmp_dir='../resource/loss/'):
+    import pandas as pd
+    
+    key = ('custom_fragilities', cmp_dir)
+    if key not in loss_model_cache:
+        loss_model_cache[key] = pd.read_csv(
+            cmp_dir+'custom_component_fragilities.csv', header=[0,1], index_col=0)
+    return(loss_model_cache[key])
+
+# NQE sheet of one SDC category, converted from FEMA to PBEE units
+# returns the metadata, mean and std sheets (shared, do not modify in place)
+def get_nqe_sheet(sheet_name, nqe_dir='../resource/loss/'):
+    key = ('nqe', sheet_name, nqe_dir)
+    if key not in loss_model_cache:
+        loss_model_cache[key] = load_nqe_sheet(sheet_name, nqe_dir)
+    return(loss_model_cache[key])
+
+def load_nqe_sheet(sheet_name, nqe_dir='../resource/loss/'):
+    import pandas as pd
+    import numpy as np
+    
+    nqe_data = pd.read_csv(nqe_dir + sheet_name)
+    nqe_data.set_index('cmp', inplace=True)
+    nqe_data = nqe_data.replace({'All Zero': 0}, regex=True)
+    nqe_data = nqe_data.replace({'2 Points = 0': 0}, regex=True)
+    nqe_data = nqe_data.replace({np.nan: 0})
+    nqe_data['directional'] = nqe_data['directional'].map(
+        {'YES': True, 'NO': False})
+
+    nqe_meta = nqe_data[[c for c in nqe_data if not (
+        c.endswith('mean') or c.endswith('std'))]]
+    nqe_mean = nqe_data[[c for c in nqe_data if c.endswith('mean')]]
+    nqe_std = nqe_data[[c for c in nqe_data if c.endswith('std')]].apply(
+        pd.to_numeric, errors='coerce')
+    
+    # unit conversion
+
+    # goal: convert nqe sheet from FEMA units to PBEE units
+    # also change PACT block division from FEMA to PBEE
+
+    # this section should not be set on a slice
+    # i will ignore
+    pd.options.mode.chained_assignment = None  # default='warn'
+
+    # convert chillers to single units (assumes small 75 ton chillers)
+    # also assumes chillers only components using TN
+    mask = nqe_meta['unit'].str.contains('TN')
+    nqe_mean.loc[mask,:] = nqe_mean.loc[mask,:].div(75)
+    nqe_meta.loc[mask, 'PACT_block'] = 'EA 1'
+    nqe_meta = nqe_meta.replace({'TN': 'EA'})
+
+    # convert AHUs to single units (assumes small 4000 cfm AHUs)
+    # also assumes AHUs only components using CF
+    mask = nqe_meta['unit'].str.contains('CF')
+    nqe_mean.loc[mask,:] = nqe_mean.loc[mask,:].div(4000)
+    nqe_meta.loc[mask, 'PACT_block'] = 'EA 1'
+    nqe_meta = nqe_meta.replace({'CF': 'EA'})
+
+    # convert large transformers from WT to EA (assumes 250e3 W = 250 kV = 1 EA)
+    mask = nqe_meta['unit'].str.contains('WT')
+    nqe_mean.loc[mask,:] = nqe_mean.loc[mask,:].div(250e3)
+
+    # change all transformers block division to EA
+    mask = nqe_meta['PACT_name'].str.contains('Transformer')
+    nqe_meta.loc[mask, 'PACT_block'] = 'EA 1'
+    nqe_meta = nqe_meta.replace({'WT': 'EA'})
+
+
+    # distribution panels already in EA, but block division needs to change
+    mask = nqe_meta['PACT_name'].str.contains('Distribution Panel')
+    nqe_meta.loc[mask, 'PACT_block'] = 'EA 1'
+
+    # convert low voltage switchgear to single units (assumes 225 AP per unit)
+    # also assumes switchgear only components using AP
+    mask = nqe_meta['unit'].str.contains('AP')
+    nqe_mean.loc[mask,:] = nqe_mean.loc[mask,:].div(225)
+    nqe_meta.loc[mask, 'PACT_block'] = 'EA 1'
+    nqe_meta = nqe_meta.replace({'AP': 'EA'})
+
+    # convert diesel generator to single units (assumes 250 kV per unit)
+    mask = nqe_meta['PACT_name'].str.contains('Diesel generator')
+    nqe_mean.loc[mask,:] = nqe_mean.loc[mask,:].div(250)
+    nqe_meta.loc[mask, 'PACT_block'] = 'EA 1'
+    nqe_meta.loc[mask, 'unit'] = 'EA'
+    
+    # Reduce block size for some excessive block count components
+    # curtain walls
+    mask = nqe_meta['PACT_name'].str.contains('Curtain Walls')
+    nqe_meta.loc[mask, 'PACT_block'] = 'SF 500'
+    
+    # # steam piping
+    # mask = nqe_meta['PACT_name'].str.contains('Steam Piping')
+    # nqe_meta.loc[mask, 'PACT_block'] = 'LF 1000'
+    
+    # # waste piping
+    # mask = nqe_meta['PACT_name'].str.contains('Waste Piping')
+    # nqe_meta.loc[mask, 'PACT_block'] = 'LF 1000'
+    
+    # ceiling
+    mask = nqe_meta['PACT_name'].str.contains('Raised Access Floor')
+    nqe_meta.loc[mask, 'PACT_block'] = 'SF 1000'
+    
+    # ceiling
+    mask = nqe_meta['PACT_name'].str.contains('Suspended Ceiling')
+    nqe_meta.loc[mask, 'PACT_block'] = 'SF 1000'
+    
+    # Floor covering
+    mask = nqe_meta['PACT_name'].str.contains('Generic Floor Covering')
+    nqe_meta.loc[mask, 'PACT_block'] = 'SF 500'
+    
+    # Pendant lighting
+    mask = nqe_meta['PACT_name'].str.contains('Independent Pendant Lighting')
+    nqe_meta.loc[mask, 'PACT_block'] = 'EA 100'
+    
+    # Concrete tile roof
+    mask = nqe_meta['PACT_name'].str.contains('Concrete tile roof')
+    nqe_meta.loc[mask, 'PACT_block'] = 'SF 1000'
+    
+    # Bookcases
+    mask = nqe_meta['PACT_name'].str.contains('Bookcase')
+    nqe_meta.loc[mask, 'PACT_block'] = 'EA 10'
+    
+    return(nqe_meta, nqe_mean, nqe_std)
+
+# component marginal tables per building configuration, least recently used
+# entries are dropped beyond cmp_marginal_cache_size
+cmp_marginal_cache = collections.OrderedDict()
+cmp_marginal_cache_size = 256
+
+def get_cached_cmp(key):
+    if key not in cmp_marginal_cache:
+        return(None)
+    cmp_marginal_cache.move_to_end(key)
+    return(cmp_marginal_cache[key])
+
+def store_cached_cmp(key, cmp_df):
+    cmp_marginal_cache[key] = cmp_df
+    cmp_marginal_cache.move_to_end(key)
+    while len(cmp_marginal_cache) > cmp_marginal_cache_size:
+        cmp_marginal_cache.popitem(last=False)
+
+# fragility/consequence arrays of Loss_Analysis.fragility_table, by component
+# model key and custom fragility directory
+fragility_table_cache = {}
+
+# preload every SDC's NQE sheet, e.g. before forking a worker pool
+def preload_loss_models(nqe_dir='../resource/loss/', cmp_dir='../resource/loss/'):
+    for sheet_name in ['fema_nqe_cmp_cat_ab.csv', 'fema_nqe_cmp_cat_c.csv',
+                       'fema_nqe_cmp_cat_def.csv']:
+        get_nqe_sheet(sheet_name, nqe_dir)
+    get_custom_fragilities(cmp_dir)
+    for db_name in ['damage_DB_FEMA_P58_2nd', 'loss_repair_DB_FEMA_P58_2nd']:
+        get_P58_data(db_name)
+    get_P58_metadata('loss_repair_DB_FEMA_P58_2nd')
     
 #%% test
 '''
@@ -0,0 +1,42 @@
+############################################################################
+#               Analysis profile benchmark
+
+# Date created: October 2026
+
+# Description:  Runs a reference MF and CBF design under each transient
+#               analysis profile and reports runtime and convergence
+
+# Open issues:  
+
+############################################################################
+
+from db import Database
+
+main_obj = Database(10, n_buffer=8, seed=985)
+
+main_obj.design_bearings(filter_designs=True)
+main_obj.design_structure(filter_designs=True)
+
+main_obj.scale_gms()
+
+#%% pick reference designs
+
+# the tallest design of each system stresses the solver most
+import pandas as pd
+all_des = main_obj.retained_designs
+ref_designs = pd.concat(
+    [all_des[all_des['superstructure_system'] == system].sort_values(
+        'num_stories').tail(1) for system in ['MF', 'CBF']])
+
+#%% run benchmark
+
+from experiment import benchmark_profiles
+
+profiles = [None, 'band_general', 'sparse_sym', 'hht', 'trbdf2', 'krylov']
+bench_df = benchmark_profiles(ref_designs, profiles)
+
+print(bench_df[['superstructure_system', 'num_stories', 'profile',
+                'run_status', 'n_attempts', 'n_steps', 'n_failed_steps',
+                'total_run_time', 'speedup']])
+
+# bench_df.to_csv('../data/profile_benchmark.csv', index=False)
@@ -22,6 +22,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib as mpl
 from doe import GP
+from pareto import is_pareto_efficient
 
 plt.close('all')
 
@@ -358,7 +359,7 @@ baseline_fs1 = baseline_fs1.item()
 baseline_fs2 = baseline_fs2.item()
 
 t0 = time.time()
-fmu_design, fs1_design = mdl.gpr.predict(X_design_cand, return_std=True)
+fmu_design, fs1_design = mdl.predict_gpr_chunked(X_design_cand, return_std=True)
 fs2_design = fs1_design**2
 
 tp = time.time() - t0
@@ -537,72 +538,9 @@ print(best_design)
 # available data space (model reverts to 0)
 
 '''
-#%%
-def simple_cull_df(input_df, dominates, *args):
-    pareto_df = pd.DataFrame(columns=input_df.columns)
-    candidateRowNr = 0
-    dominated_df = pd.DataFrame(columns=input_df.columns)
-    while True:
-        candidateRow = input_df.iloc[[candidateRowNr]]
-        input_df = input_df.drop(index=candidateRow.index)
-        rowNr = 0
-        nonDominated = True
-        while input_df.shape[0] != 0 and rowNr < input_df.shape[0]:
-            row = input_df.iloc[[rowNr]]
-            if dominates(candidateRow, row, *args):
-                # If it is worse on all features remove the row from the array
-                input_df = input_df.drop(index=row.index)
-                dominated_df = dominated_df.append(row)
-            elif dominates(row, candidateRow, *args):
-                nonDominated = False
-                dominated_df = dominated_df.append(candidateRow)
-                rowNr += 1
-            else:
-                rowNr += 1
-
-        if nonDominated:
-            # add the non-dominated point to the Pareto frontier
-            pareto_df = pareto_df.append(candidateRow)
-
-        if input_df.shape[0] == 0:
-            break
-    return pareto_df, dominated_df
-
-def dominates_pd(row, candidate_row, mdl, cost, coefs):
-    row_pr = mdl.predict(row).item()
-    cand_pr = mdl.predict(candidate_row).item()
-    
-    row_cost = cost(row, coefs).item()
-    cand_cost = cost(candidate_row, coefs).item()
-    
-    return ((row_pr < cand_pr) and (row_cost < cand_cost))
-
-# Faster than is_pareto_efficient_simple, but less readable.
-def is_pareto_efficient(costs, return_mask = True):
-    """
-    Find the pareto-efficient points
-    :param costs: An (n_points, n_costs) array
-    :param return_mask: True to return a mask
-    :return: An array of indices of pareto-efficient points.
-        If return_mask is True, this will be an (n_points, ) boolean array
-        Otherwise it will be a (n_efficient_points, ) integer array of indices.
-    """
-    is_efficient = np.arange(costs.shape[0])
-    n_points = costs.shape[0]
-    next_point_index = 0  # Next index in the is_efficient array to search for
-    while next_point_index<len(costs):
-        nondominated_point_mask = np.any(costs<costs[next_point_index], axis=1)
-        nondominated_point_mask[next_point_index] = True
-        is_efficient = is_efficient[nondominated_point_mask]  # Remove dominated points
-        costs = costs[nondominated_point_mask]
-        next_point_index = np.sum(nondominated_point_mask[:next_point_index])+1
-    if return_mask:
-        is_efficient_mask = np.zeros(n_points, dtype = bool)
-        is_efficient_mask[is_efficient] = True
-        return is_efficient_mask
-    else:
-        return is_efficient
-    
+#%% pareto
+# sort-and-scan front extraction is imported from pareto.py (see top)
+
 '''
 all_costs = calc_upfront_cost(X_design_cand, coef_dict)
 constr_costs = all_costs['total']
@@ -716,11 +654,11 @@ kernel_name = 'rbf_iso'
 
 collapse_drift_def_mu_std = 0.1
 #%%
-from experiment import collapse_fragility
+from experiment import collapse_fragility_df
 df_doe[['max_drift',
-   'collapse_prob']] = df_doe.apply(
-       lambda row: collapse_fragility(row, drift_at_mu_plus_std=collapse_drift_def_mu_std), 
-       axis='columns', result_type='expand')
+   'collapse_prob']] = collapse_fragility_df(
+       df_doe, drift_at_mu_plus_std=collapse_drift_def_mu_std)[
+           ['max_drift', 'collapse_prob']]
 
 
 
@@ -810,7 +748,8 @@ ax2.set_xlabel('Points added', fontsize=axis_font)
 ax2.grid(True)
 
 from numpy import exp
-all_hyperparams = exp(theta)
+# newer DoE runs store the fit time after the kernel hyperparameters
+all_hyperparams = exp(theta[:, :len(theta_vars)])
 
 # TODO: hardcoded removal of outlier
 all_hyperparams = np.delete(all_hyperparams, 1, axis=0)
@@ -1074,7 +1013,7 @@ X_design_cand = make_design_space(design_res)
 
 
 t0 = time.time()
-fmu_design, fs1_design = mdl_doe.gpr.predict(X_design_cand, return_std=True)
+fmu_design, fs1_design = mdl_doe.predict_gpr_chunked(X_design_cand, return_std=True)
 fs2_design = fs1_design**2
 
 tp = time.time() - t0
@@ -1798,7 +1737,7 @@ x_pl = np.unique(xx)
 y_pl = np.unique(yy)
 xx_pl, yy_pl = np.meshgrid(x_pl, y_pl)
 
-fmu_3d, fs1_3d = mdl_doe.gpr.predict(X_plot, return_std=True)
+fmu_3d, fs1_3d = mdl_doe.predict_gpr_chunked(X_plot, return_std=True)
 fs2_3d = fs1_3d**2
 
 Z_3d = fmu_3d.reshape(xx_pl.shape)
@@ -1836,7 +1775,7 @@ x_pl = np.unique(xx)
 y_pl = np.unique(yy)
 xx_pl, yy_pl = np.meshgrid(x_pl, y_pl)
 
-fmu_3d, fs1_3d = mdl_doe.gpr.predict(X_plot, return_std=True)
+fmu_3d, fs1_3d = mdl_doe.predict_gpr_chunked(X_plot, return_std=True)
 fs2_3d = fs1_3d**2
 
 Z_3d = fmu_3d.reshape(xx_pl.shape)
@@ -1872,7 +1811,7 @@ x_pl = np.unique(xx)
 y_pl = np.unique(yy)
 xx_pl, yy_pl = np.meshgrid(x_pl, y_pl)
 
-fmu_3d, fs1_3d = mdl_doe.gpr.predict(X_plot, return_std=True)
+fmu_3d, fs1_3d = mdl_doe.predict_gpr_chunked(X_plot, return_std=True)
 fs2_3d = fs1_3d**2
 
 Z_3d = fmu_3d.reshape(xx_pl.shape)
@@ -1909,7 +1848,7 @@ x_pl = np.unique(xx)
 y_pl = np.unique(yy)
 xx_pl, yy_pl = np.meshgrid(x_pl, y_pl)
 
-fmu_3d, fs1_3d = mdl_doe.gpr.predict(X_plot, return_std=True)
+fmu_3d, fs1_3d = mdl_doe.predict_gpr_chunked(X_plot, return_std=True)
 fs2_3d = fs1_3d**2
 
 Z_3d = fmu_3d.reshape(xx_pl.shape)
@@ -2505,15 +2444,10 @@ plt.show()
 
 def df_collapse(df, drift_mu_plus_std=0.1):
     
-    from experiment import collapse_fragility
-    df[['max_drift',
-       'collapse_prob']] = df.apply(
-           lambda row: collapse_fragility(
-               row, drift_at_mu_plus_std=drift_mu_plus_std), 
-           axis='columns', result_type='expand')
-                           
-    from numpy import log
-    df['log_collapse_prob'] = log(df['collapse_prob'])
+    from experiment import collapse_fragility_df
+    df[['max_drift', 'collapse_prob', 
+        'log_collapse_prob']] = collapse_fragility_df(
+            df, drift_at_mu_plus_std=drift_mu_plus_std)
     
     return df
     
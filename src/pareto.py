@@ -0,0 +1,125 @@
+############################################################################
+#               Pareto front extraction for inverse design
+
+# Date created: October 2026
+
+# Description:  Vectorized non-dominated sorting. Objectives are evaluated
+#               once for the whole candidate set, then the front is found by
+#               sort-and-scan (2 objectives) or a chunked lexicographic sweep
+#               (k objectives). All objectives are minimized.
+
+# Open issues:  (1) the k-objective sweep is O(n |front| k) for large fronts
+
+############################################################################
+
+# 2-objective front by sort-and-scan, O(n log n)
+# after sorting by the first objective (ties by the second), a point is
+# efficient if its second objective is below that of every earlier point.
+# Weakly dominated points and repeated points (all but one) are removed,
+# same as the original is_pareto_efficient
+def pareto_front_2d(costs, return_mask=True):
+    import numpy as np
+
+    costs = np.asarray(costs, dtype=float)
+    n_points = costs.shape[0]
+
+    order = np.lexsort((costs[:,1], costs[:,0]))
+    y_sorted = costs[order, 1]
+
+    prev_min = np.empty(n_points)
+    prev_min[:1] = np.inf
+    prev_min[1:] = np.minimum.accumulate(y_sorted)[:-1]
+
+    is_efficient = np.sort(order[y_sorted < prev_min])
+
+    if return_mask:
+        is_efficient_mask = np.zeros(n_points, dtype=bool)
+        is_efficient_mask[is_efficient] = True
+        return(is_efficient_mask)
+    else:
+        return(is_efficient)
+
+# remove points of a lexicographically sorted block that are dominated by an
+# earlier point of the same block
+def cull_sorted_block(block):
+    import numpy as np
+
+    keep = np.arange(block.shape[0])
+    next_idx = 0
+    while next_idx < block.shape[0]:
+        nondominated = np.any(block < block[next_idx], axis=1)
+        nondominated[:next_idx+1] = True
+        keep = keep[nondominated]
+        block = block[nondominated]
+        next_idx += 1
+    return(keep)
+
+def is_pareto_efficient(costs, return_mask=True, max_mem_mb=256):
+    """Find the Pareto-efficient points of an (n_points, n_costs) array.
+
+    Two objectives use the sort-and-scan of pareto_front_2d. With more
+    objectives the points are swept in lexicographic order (only earlier
+    points can dominate later ones) in blocks checked against the front
+    found so far, with the block size bounded by max_mem_mb.
+
+    Parameters
+    ----------
+    costs: (n_points, n_costs) array, all objectives minimized
+    return_mask: True to return a boolean mask
+    max_mem_mb: memory budget of the block-vs-front comparison, in MB
+
+    Returns
+    -------
+    (n_points, ) boolean mask if return_mask, else the integer indices of the
+    efficient points
+    """
+    import numpy as np
+
+    costs = np.asarray(costs, dtype=float)
+    if costs.ndim == 1:
+        costs = costs.reshape(-1, 1)
+    n_points, n_costs = costs.shape
+
+    if n_costs == 2:
+        return(pareto_front_2d(costs, return_mask=return_mask))
+
+    # no points, no front (the sweep below needs at least one block)
+    if n_points == 0:
+        if return_mask:
+            return(np.zeros(0, dtype=bool))
+        else:
+            return(np.zeros(0, dtype=int))
+
+    order = np.lexsort(costs.T[::-1])
+    costs_sorted = costs[order]
+
+    front = np.empty((0, n_costs))
+    front_idx = []
+    budget = max_mem_mb*1024**2
+    start = 0
+    while start < n_points:
+        block_size = int(budget/(max(front.shape[0], 1)*n_costs))
+        block_size = min(max(block_size, 1), n_points - start)
+        block = costs_sorted[start:start+block_size]
+        block_idx = np.arange(start, start+block_size)
+
+        # weakly dominated by a point already on the front
+        if front.shape[0] > 0:
+            dominated = np.any(np.all(front[None,:,:] <= block[:,None,:],
+                                      axis=2), axis=1)
+            block = block[~dominated]
+            block_idx = block_idx[~dominated]
+
+        keep = cull_sorted_block(block)
+        front = np.concatenate([front, block[keep]], axis=0)
+        front_idx.append(block_idx[keep])
+        start += block_size
+
+    is_efficient = np.sort(order[np.concatenate(front_idx)])
+
+    if return_mask:
+        is_efficient_mask = np.zeros(n_points, dtype=bool)
+        is_efficient_mask[is_efficient] = True
+        return(is_efficient_mask)
+    else:
+        return(is_efficient)
@@ -0,0 +1,131 @@
+############################################################################
+#               Sparse (inducing point) GP regression
+
+# Date created: October 2026
+
+# Description:  Nystrom / deterministic training conditional (DTC) GP
+#               regression for large training sets. Drop-in final step for
+#               the GP.fit_gpr pipeline (same predict(X, return_std=True))
+
+# Open issues:  (1) hyperparameters are optimized on the inducing subset only
+#               (2) LOOCV-based DoE acquisition needs the exact backend
+
+############################################################################
+
+import numpy as np
+from scipy.linalg import cholesky, solve_triangular
+from sklearn.base import BaseEstimator, RegressorMixin
+
+class SparseGPR(RegressorMixin, BaseEstimator):
+    """GP regression through m inducing points (DTC approximation).
+
+    Fit is O(n m^2) and prediction O(m) per point, against O(n^3) and O(n)
+    for the exact GP. The inducing points are a random subset of the
+    training set; the kernel hyperparameters come from an exact GP fit on
+    that subset.
+
+    Parameters
+    ----------
+    kernel: sklearn kernel, a trailing WhiteKernel is used as the noise term
+    n_inducing: number of inducing points (the exact GP is recovered when
+    n_inducing >= number of training points)
+    n_restarts_optimizer: optimizer restarts of the subset hyperparameter fit
+    random_state: seed of inducing point selection and optimizer restarts
+    """
+
+    def __init__(self, kernel=None, n_inducing=500, n_restarts_optimizer=10,
+                 random_state=985):
+        self.kernel = kernel
+        self.n_inducing = n_inducing
+        self.n_restarts_optimizer = n_restarts_optimizer
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        from sklearn.gaussian_process import GaussianProcessRegressor
+
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        n_train = X.shape[0]
+
+        self._y_ndim = y.ndim
+        y_mat = y.reshape(n_train, -1)
+
+        rng = np.random.RandomState(self.random_state)
+        if n_train > self.n_inducing:
+            inducing_idx = np.sort(rng.choice(n_train, self.n_inducing,
+                                              replace=False))
+        else:
+            inducing_idx = np.arange(n_train)
+        Z = X[inducing_idx]
+
+        # hyperparameters from an exact GP on the inducing subset
+        subset_gp = GaussianProcessRegressor(
+            kernel=self.kernel, random_state=self.random_state,
+            n_restarts_optimizer=self.n_restarts_optimizer)
+        subset_gp.fit(Z, y[inducing_idx])
+
+        self.kernel_ = subset_gp.kernel_
+        signal_kernel, noise = split_noise_kernel(self.kernel_, subset_gp.alpha)
+
+        # Kmm = Lm Lm^T, A = Lm^-1 Kmn / sigma, B = I + A A^T = LB LB^T
+        Kmm = signal_kernel(Z)
+        Kmm[np.diag_indices_from(Kmm)] += 1e-8*np.mean(np.diag(Kmm))
+        Kmn = signal_kernel(Z, X)
+
+        Lm = cholesky(Kmm, lower=True)
+        A = solve_triangular(Lm, Kmn, lower=True)/np.sqrt(noise)
+        B = A @ A.T
+        B[np.diag_indices_from(B)] += 1.0
+        LB = cholesky(B, lower=True)
+        c = solve_triangular(LB, A @ y_mat, lower=True)/np.sqrt(noise)
+
+        self.inducing_points_ = Z
+        self.signal_kernel_ = signal_kernel
+        self.noise_ = noise
+        self.Lm_ = Lm
+        self.LB_ = LB
+        self.c_ = c
+
+        # DTC log marginal likelihood
+        n_out = y_mat.shape[1]
+        self.log_marginal_likelihood_value_ = float(
+            -0.5*n_out*n_train*np.log(2*np.pi)
+            - n_out*np.log(np.diag(LB)).sum()
+            - 0.5*n_out*n_train*np.log(noise)
+            - 0.5*np.sum(y_mat**2)/noise
+            + 0.5*np.sum(c**2))
+
+        return(self)
+
+    def predict(self, X, return_std=False):
+        X = np.asarray(X, dtype=float)
+
+        K_zs = self.signal_kernel_(self.inducing_points_, X)
+        V = solve_triangular(self.Lm_, K_zs, lower=True)
+        W = solve_triangular(self.LB_, V, lower=True)
+
+        y_mean = W.T @ self.c_
+        if self._y_ndim == 1 or y_mean.shape[1] == 1:
+            y_mean = y_mean.ravel()
+
+        if not return_std:
+            return(y_mean)
+
+        # prior variance (incl. noise, as sklearn) minus Nystrom explained part
+        # plus the uncertainty of the inducing values
+        y_var = (self.kernel_.diag(X) - np.einsum('ij,ij->j', V, V) +
+                 np.einsum('ij,ij->j', W, W))
+        y_var = np.maximum(y_var, 0.0)
+
+        return(y_mean, np.sqrt(y_var))
+
+# separate a trailing WhiteKernel from the signal kernel
+# returns the signal kernel and the noise variance
+def split_noise_kernel(kernel, alpha=1e-10):
+    from sklearn.gaussian_process.kernels import Sum, WhiteKernel
+
+    if isinstance(kernel, Sum) and isinstance(kernel.k2, WhiteKernel):
+        return(kernel.k1, kernel.k2.noise_level + alpha)
+
+    # noiseless kernel: keep a small nugget so B stays well conditioned
+    return(kernel, max(alpha, 1e-6))
@@ -13,6 +13,12 @@
 ############################################################################
 # UTILITIES
 ############################################################################
+import sys
+# caution: path[0] is reserved for script path (or '' in REPL)
+sys.path.insert(1, '../src/')
+
+from building import get_mik_table, mik_columns
+
 def get_shape(shape_name, member, csv_dir='../resource/'):
     import pandas as pd
     
@@ -40,49 +46,10 @@ def getProperties(shape):
     tw      = float(shape.iloc[0]['tw'])
     return(Ag, Ix, Iy, Zx, Sx, d, bf, tf, tw)
 
-def getModifiedIK(shape, L):
-    # reference Lignos & Krawinkler (2011)
-    Fy = 50 # ksi
-    Es = 29000 # ksi
-
-    Zx = float(shape.iloc[0]['Zx'])
-    Iz = float(shape.iloc[0]['Ix'])
-    d = float(shape.iloc[0]['d'])
-    htw = float(shape.iloc[0]['h/tw'])
-    bftf = float(shape.iloc[0]['bf/2tf'])
-    ry = float(shape.iloc[0]['ry'])
-    c1 = 25.4
-    c2 = 6.895
-
-    # approximate adjustment for isotropic hardening
-    # adjusted with the *n for spring-beam-spring stiffness adjustment
-    My = Fy * Zx * 1.17
-    thy = My/(6*Es*Iz/L)
-    Ke = My/thy*10
-    # consider using Lb = 0 for beams bc of slab?
-    Lb = L
-    kappa = 0.4
-
-    if d > 21.0:
-        Lam = (536*(htw)**(-1.26)*(bftf)**(-0.525)
-            *(Lb/ry)**(-0.130)*(c2*Fy/355)**(-0.291))
-        thp = (0.318*(htw)**(-0.550)*(bftf)**(-0.345)
-            *(Lb/ry)**(-0.0230)*(L/d)**(0.090)*(c1*d/533)**(-0.330)*
-            (c2*Fy/355)**(-0.130))
-        thpc = (7.50*(htw)**(-0.610)*(bftf)**(-0.710)
-            *(Lb/ry)**(-0.110)*(c1*d/533)**(-0.161)*
-            (c2*Fy/355)**(-0.320))
-    else:
-        Lam = 495*(htw)**(-1.34)*(bftf)**(-0.595)*(c2*Fy/355)**(-0.360)
-        thp = (0.0865*(htw)**(-0.365)*(bftf)**(-0.140)
-            *(L/d)**(0.340)*(c1*d/533)**(-0.721)*
-            (c2*Fy/355)**(-0.230))
-        thpc = (5.63*(htw)**(-0.565)*(bftf)**(-0.800)
-            *(c1*d/533)**(-0.280)*(c2*Fy/355)**(-0.430))
-        
-    thu = 0.2
-
-    return(Ke, My, Lam, thp, thpc, kappa, thu)
+# current MIK parameters come from the shared table used by the model builders
+def getModifiedIK(shape_name, member, L):
+    mik_row = get_mik_table(member, L).loc[shape_name]
+    return(tuple(float(mik_row[col]) for col in mik_columns))
 
 def getModifiedIK_old(shape, L):
     # reference Lignos & Krawinkler (2011)
@@ -229,7 +196,7 @@ ops.uniaxialMaterial('Fatigue', steel_mat_tag, steel_no_fatigue)
 cIK = 1.0
 DIK = 1.0
 (KeCol, MyCol, LamCol, 
- thpCol, thpcCol, kappaCol, thuCol) = getModifiedIK(selectedCol, h_story)
+ thpCol, thpcCol, kappaCol, thuCol) = getModifiedIK('W24X55', 'beam', h_story)
 
 # calculate modified section properties to account for spring stiffness being in series with the elastic element stiffness
 # Ibarra, L. F., and Krawinkler, H. (2005). "Global collapse of frame structures under seismic excitations,"